@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import io
+import pathlib
+import random
+import sys
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / 'scripts'))
+from util import panel_data
+
+
+# Approximate GRCh38 contig lengths used to place genes in proportion to contig size
+CONTIG_LENGTHS = {
+    'chr1': 248956422, 'chr2': 242193529, 'chr3': 198295559, 'chr4': 190214555, 'chr5': 181538259,
+    'chr6': 170805979, 'chr7': 159345973, 'chr8': 145138636, 'chr9': 138394717, 'chr10': 133797422,
+    'chr11': 135086622, 'chr12': 133275309, 'chr13': 114364328, 'chr14': 107043718, 'chr15': 101991189,
+    'chr16': 90338345, 'chr17': 83257441, 'chr18': 80373285, 'chr19': 58617616, 'chr20': 64444167,
+    'chr21': 46709983, 'chr22': 50818468, 'chrX': 156040895, 'chrY': 57227415, 'chrM': 16569,
+}
+
+# GENCODE v39 has roughly 61,500 genes, which is taken as genome scale
+GENES_GENOME_SCALE = 61500
+
+# RefSeq places a share of records on unplaced and alternate contigs, which are discarded on compile
+REFSEQ_ALT_CONTIG_FRACTION = 0.02
+
+APPRIS_HEADER = ('Gene name', 'Gene ID', 'Transcript ID', 'Protein ID', 'CCDS IDs', 'APPRIS Annotation')
+APPRIS_ANNOTATIONS = (
+    ('PRINCIPAL:1', 0.35),
+    ('PRINCIPAL:2', 0.05),
+    ('ALTERNATIVE:1', 0.10),
+    ('ALTERNATIVE:2', 0.05),
+    ('MINOR', 0.15),
+    ('', 0.30),
+)
+
+PANEL_HEADER = (
+    'ensembl_gene_symbol', 'ensembl_gene_id', 'hgnc_symbol', 'hgnc_id',
+    'refseq_gene_symbol', 'ncbi_gene_id', 'oncogene', 'tsgene',
+)
+
+
+class Gene:
+
+    def __init__(self, number, contig, start, end, strand, rng):
+        self.number = number
+        self.contig = contig
+        self.start = start
+        self.end = end
+        self.strand = strand
+
+        self.symbol = f'GENE{number}'
+        self.ensembl_id = f'ENSG{number:011d}.{rng.randint(1, 20)}'
+        self.ncbi_id = str(100000 + number)
+        self.hgnc_id = f'HGNC:{number}' if rng.random() < 0.65 else None
+        self.coding = rng.random() < 0.35
+
+        self.transcripts = list()
+        for i in range(rng.choice((1, 1, 2, 3, 4, 6, 9))):
+            self.transcripts.append(Transcript(self, i, rng))
+
+
+class Transcript:
+
+    def __init__(self, gene, index, rng):
+        self.ensembl_id = f'ENST{gene.number:09d}{index:02d}.{rng.randint(1, 12)}'
+        self.refseq_id = f'{"NM" if gene.coding else "NR"}_{gene.number:06d}{index}.{rng.randint(1, 6)}'
+        self.appris = rng.choices(*zip(*APPRIS_ANNOTATIONS))[0]
+
+        # Exons are spread across the gene with the transcript spanning first to last exon
+        exon_count = rng.randint(1, 12)
+        span = gene.end - gene.start + 1
+        exon_starts = sorted(rng.sample(range(gene.start, gene.end), min(exon_count, span - 1)))
+        self.exons = list()
+        for i, exon_start in enumerate(exon_starts):
+            exon_limit = exon_starts[i + 1] - 1 if i + 1 < len(exon_starts) else gene.end
+            exon_end = min(exon_limit, exon_start + rng.randint(50, 400))
+            if exon_end > exon_start:
+                self.exons.append((exon_start, exon_end))
+        if not self.exons:
+            self.exons.append((gene.start, gene.end))
+
+        self.start = self.exons[0][0]
+        self.end = self.exons[-1][1]
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output_dir', required=True, type=pathlib.Path)
+    parser.add_argument('--scale', default=0.1, type=float)
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--panel_genes', default=1000, type=int)
+
+    args = parser.parse_args()
+
+    if not 0 < args.scale <= 10:
+        parser.error(f'Got invalid scale, must be within (0, 10]: {args.scale}')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    generate_data(args.output_dir, args.scale, args.seed, args.panel_genes)
+
+
+def generate_data(output_dir, scale, seed=0, panel_genes=1000):
+    # All output is determined by the scale and seed
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    genes = generate_genes(scale, rng)
+    accessions = {contig: f'NC_{i:06d}.{rng.randint(10, 14)}' for i, contig in enumerate(CONTIG_LENGTHS, 1)}
+
+    write_gencode_gtf(output_dir / 'gencode.gtf.gz', genes, rng)
+    write_refseq_gtf(output_dir / 'refseq.gtf.gz', genes, accessions, rng)
+    write_appris(output_dir / 'appris.ensembl.tsv', genes, 'ensembl')
+    write_appris(output_dir / 'appris.refseq.tsv', genes, 'refseq')
+    write_contig_mapping(output_dir / 'refseq_contig_id_mapping.tsv', accessions)
+    write_gene_data(output_dir / 'ensembl_gene_data.tsv', genes, 'ensembl')
+    write_gene_data(output_dir / 'refseq_gene_data.tsv', genes, 'refseq')
+    write_panel(output_dir / 'final_panel.tsv', genes, panel_genes, rng)
+
+
+def generate_genes(scale, rng):
+    gene_count = max(len(CONTIG_LENGTHS), round(GENES_GENOME_SCALE * scale))
+    genome_length = sum(CONTIG_LENGTHS.values())
+
+    genes = list()
+    for contig, length in CONTIG_LENGTHS.items():
+        contig_gene_count = max(1, round(gene_count * length / genome_length))
+        starts = sorted(rng.randrange(1, max(2, length - 200000)) for _ in range(contig_gene_count))
+        for start in starts:
+            end = min(length, start + int(rng.lognormvariate(9.5, 1.2)) + 200)
+            genes.append(Gene(len(genes) + 1, contig, start, end, rng.choice('+-'), rng))
+    return genes
+
+
+def write_gencode_gtf(fp, genes, rng):
+    with open_gzip(fp) as fh:
+        fh.write('##description: evidence-based annotation of the human genome (GRCh38), version 39 (Ensembl 105)\n')
+        fh.write('##provider: GENCODE\n')
+        fh.write('##format: gtf\n')
+
+        for gene in genes:
+            gene_type = 'protein_coding' if gene.coding else 'lncRNA'
+            gene_attrs = [
+                f'gene_id "{gene.ensembl_id}"',
+                f'gene_type "{gene_type}"',
+                f'gene_name "{gene.symbol}"',
+                f'level {rng.randint(1, 3)}',
+            ]
+            if gene.hgnc_id:
+                gene_attrs.append(f'hgnc_id "{gene.hgnc_id}"')
+            gene_attrs.append(f'havana_gene "OTTHUMG{gene.number:011d}.1"')
+            write_gtf_line(fh, gene.contig, 'HAVANA', 'gene', gene.start, gene.end, gene.strand, gene_attrs)
+
+            for transcript in gene.transcripts:
+                transcript_attrs = [
+                    f'gene_id "{gene.ensembl_id}"',
+                    f'transcript_id "{transcript.ensembl_id}"',
+                    f'gene_type "{gene_type}"',
+                    f'gene_name "{gene.symbol}"',
+                    f'transcript_type "{gene_type}"',
+                    f'transcript_name "{gene.symbol}-{transcript.ensembl_id[-6:-3]}"',
+                    f'level {rng.randint(1, 3)}',
+                ]
+                if gene.hgnc_id:
+                    transcript_attrs.append(f'hgnc_id "{gene.hgnc_id}"')
+                transcript_attrs.extend(get_tags(rng))
+                write_transcript_lines(fh, gene.contig, 'HAVANA', gene, transcript, transcript_attrs)
+
+
+def write_refseq_gtf(fp, genes, accessions, rng):
+    with open_gzip(fp) as fh:
+        fh.write('#gtf-version 2.2\n')
+        fh.write('#!genome-build GRCh38.p14\n')
+        fh.write('#!genome-build-accession NCBI_Assembly:GCF_000001405.40\n')
+        fh.write('#!annotation-source NCBI RefSeq GCF_000001405.40-RS_2023_03\n')
+
+        for gene in genes:
+            if rng.random() < REFSEQ_ALT_CONTIG_FRACTION:
+                seqname = f'NT_{rng.randint(100000, 999999)}.1'
+            else:
+                seqname = accessions[gene.contig]
+
+            db_xrefs = [f'db_xref "GeneID:{gene.ncbi_id}"']
+            if gene.hgnc_id:
+                db_xrefs.append(f'db_xref "HGNC:{gene.hgnc_id}"')
+
+            gene_attrs = [
+                f'gene_id "{gene.symbol}"',
+                'transcript_id ""',
+                *db_xrefs,
+                f'description "synthetic gene {gene.number}"',
+                f'gbkey "Gene"',
+                f'gene "{gene.symbol}"',
+                f'gene_biotype "{"protein_coding" if gene.coding else "lncRNA"}"',
+            ]
+            if rng.random() < 0.02:
+                gene_attrs.append(f'gene_synonym "{gene.symbol}\\"ALT\\""')
+            write_gtf_line(fh, seqname, 'BestRefSeq', 'gene', gene.start, gene.end, gene.strand, gene_attrs)
+
+            for transcript in gene.transcripts:
+                transcript_attrs = [
+                    f'gene_id "{gene.symbol}"',
+                    f'transcript_id "{transcript.refseq_id}"',
+                    *db_xrefs,
+                    f'gbkey "{"mRNA" if gene.coding else "ncRNA"}"',
+                    f'gene "{gene.symbol}"',
+                    f'product "synthetic product {gene.number}; variant {transcript.refseq_id[-3]}"',
+                    f'transcript_biotype "{"mRNA" if gene.coding else "lnc_RNA"}"',
+                ]
+                transcript_attrs.extend(get_tags(rng))
+                write_transcript_lines(fh, seqname, 'BestRefSeq', gene, transcript, transcript_attrs)
+
+        fh.write('###\n')
+
+
+def write_transcript_lines(fh, seqname, source, gene, transcript, attrs):
+    write_gtf_line(fh, seqname, source, 'transcript', transcript.start, transcript.end, gene.strand, attrs)
+
+    exon_count = len(transcript.exons)
+    for i, (exon_start, exon_end) in enumerate(transcript.exons, 1):
+        exon_attrs = [*attrs, f'exon_number {i}']
+        write_gtf_line(fh, seqname, source, 'exon', exon_start, exon_end, gene.strand, exon_attrs)
+
+        if not gene.coding:
+            continue
+
+        # Terminal exons are split into UTR and CDS, with start and stop codons at either end
+        cds_start, cds_end = exon_start, exon_end
+        if i == 1 and exon_end - exon_start > 60:
+            cds_start = exon_start + 30
+            write_gtf_line(fh, seqname, source, 'UTR', exon_start, cds_start - 1, gene.strand, exon_attrs)
+            write_gtf_line(fh, seqname, source, 'start_codon', cds_start, cds_start + 2, gene.strand, exon_attrs)
+        if i == exon_count and cds_end - cds_start > 60:
+            cds_end = exon_end - 30
+            write_gtf_line(fh, seqname, source, 'CDS', cds_start, cds_end, gene.strand, exon_attrs, frame='0')
+            write_gtf_line(fh, seqname, source, 'stop_codon', cds_end + 1, cds_end + 3, gene.strand, exon_attrs)
+            write_gtf_line(fh, seqname, source, 'UTR', cds_end + 4, exon_end, gene.strand, exon_attrs)
+        else:
+            write_gtf_line(fh, seqname, source, 'CDS', cds_start, cds_end, gene.strand, exon_attrs, frame='0')
+
+
+def open_gzip(fp):
+    # NOTE(SW): gzip header timestamp is fixed so that output is identical across runs
+    return io.TextIOWrapper(gzip.GzipFile(fp, 'wb', compresslevel=4, mtime=0))
+
+
+def write_gtf_line(fh, seqname, source, feature, start, end, strand, attrs, frame='.'):
+    attr_str = ' '.join(f'{a};' for a in attrs)
+    fh.write(f'{seqname}\t{source}\t{feature}\t{start}\t{end}\t.\t{strand}\t{frame}\t{attr_str}\n')
+
+
+def get_tags(rng):
+    # Repeated keys as seen for GENCODE tags and RefSeq db_xrefs
+    tags = list()
+    for tag in ('basic', 'CCDS', 'MANE_Select', 'Ensembl_canonical', 'appris_principal_1'):
+        if rng.random() < 0.3:
+            tags.append(f'tag "{tag}"')
+    return tags
+
+
+def write_appris(fp, genes, source):
+    with fp.open('w') as fh:
+        print(*APPRIS_HEADER, sep='\t', file=fh)
+        for gene in genes:
+            for transcript in gene.transcripts:
+                # NOTE(SW): APPRIS has versioned transcripts for RefSeq but not Ensembl
+                if source == 'ensembl':
+                    gene_id = gene.ensembl_id.split('.')[0]
+                    transcript_id = transcript.ensembl_id.split('.')[0]
+                else:
+                    gene_id = gene.ncbi_id
+                    transcript_id = transcript.refseq_id
+                protein_id = f'P{transcript_id}' if gene.coding else '-'
+                print(gene.symbol, gene_id, transcript_id, protein_id, '-', transcript.appris, sep='\t', file=fh)
+
+
+def write_contig_mapping(fp, accessions):
+    with fp.open('w') as fh:
+        for contig, accession in accessions.items():
+            print(contig, accession, sep='\t', file=fh)
+
+
+def write_gene_data(fp, genes, source):
+    with fp.open('w') as fh:
+        if source == 'ensembl':
+            id_columns = ('ensembl_gene_id', 'symbol', 'ensembl_transcript_id')
+        else:
+            id_columns = ('ncbi_gene_id', 'symbol', 'mane_transcript_id')
+        print('hgnc_id', *id_columns, 'contig', 'start', 'end', 'strand', sep='\t', file=fh)
+
+        for gene in genes:
+            transcript = gene.transcripts[0]
+            if source == 'ensembl':
+                gene_id, transcript_id = gene.ensembl_id, transcript.ensembl_id
+            else:
+                gene_id, transcript_id = gene.ncbi_id, transcript.refseq_id
+            print(
+                gene.hgnc_id or 'NA', gene_id, gene.symbol, transcript_id,
+                gene.contig, gene.start, gene.end, gene.strand,
+                sep='\t', file=fh,
+            )
+
+
+def write_panel(fp, genes, panel_genes, rng):
+    # Panel genes must have CDS records in the compiled annotations, i.e. a coding gene with an HGNC
+    # ID and at least one APPRIS transcript. Genes expected to lack CDS records by the CDS BED script
+    # are excluded
+    candidates = list()
+    for gene in genes:
+        if not (gene.coding and gene.hgnc_id) or gene.hgnc_id in panel_data.CDS_SKIP_GENES:
+            continue
+        if not any(t.appris.startswith(('PRINCIPAL', 'ALTERNATIVE')) for t in gene.transcripts):
+            continue
+        candidates.append(gene)
+
+    selected = rng.sample(candidates, min(panel_genes, len(candidates)))
+    with fp.open('w') as fh:
+        print(*PANEL_HEADER, sep='\t', file=fh)
+        for gene in sorted(selected, key=lambda g: g.number):
+            role = rng.choice((('TRUE', 'FALSE'), ('FALSE', 'TRUE'), ('TRUE', 'TRUE'), ('NA', 'NA')))
+            print(
+                gene.symbol, gene.ensembl_id, gene.symbol, gene.hgnc_id,
+                gene.symbol, gene.ncbi_id, *role,
+                sep='\t', file=fh,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / 'scripts'))
+from util import intervals
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bed_fps', required=True, type=pathlib.Path, nargs='+')
+    parser.add_argument('--queries', default=1000000, type=int)
+    parser.add_argument('--linear_queries', default=1000, type=int)
+    parser.add_argument('--seed', default=0, type=int)
+
+    args = parser.parse_args()
+
+    for fp in args.bed_fps:
+        if not fp.exists():
+            parser.error(f'Input file {fp} does not exist')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    t0 = time.perf_counter()
+    index = intervals.IntervalIndex.from_bed(*args.bed_fps)
+    build_time = time.perf_counter() - t0
+    print(f'indexed {len(index)} intervals in {build_time:.2f}s', file=sys.stderr)
+
+    # Random positions spread over the span of each indexed contig
+    rng = random.Random(args.seed)
+    spans = [(contig, ivs[0].start, max_ends[-1]) for contig, (ivs, _, max_ends) in index.contigs.items()]
+    queries = list()
+    for _ in range(args.queries):
+        contig, start, end = rng.choice(spans)
+        queries.append((contig, rng.randrange(start, end)))
+
+    # Reference linear scan over a subset of queries, also used to check index results
+    all_intervals = [iv for ivs, _, _ in index.contigs.values() for iv in ivs]
+    linear_queries = queries[:args.linear_queries]
+    t0 = time.perf_counter()
+    linear_hits = [
+        [iv for iv in all_intervals if iv.contig == contig and iv.start <= position < iv.end]
+        for contig, position in linear_queries
+    ]
+    linear_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    point_hits = [index.query_point(contig, position) for contig, position in queries]
+    point_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch_hits = index.query_batch(queries)
+    batch_time = time.perf_counter() - t0
+
+    assert point_hits == batch_hits
+    assert point_hits[:len(linear_queries)] == linear_hits
+
+    print('method', 'queries', 'seconds', 'queries_per_second', sep='\t')
+    for name, count, seconds in (
+        ('linear_scan', len(linear_queries), linear_time),
+        ('query_point', len(queries), point_time),
+        ('query_batch', len(queries), batch_time),
+    ):
+        print(name, count, f'{seconds:.3f}', f'{count / seconds:.0f}', sep='\t')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import argparse
+import functools
+import gc
+import pathlib
+import sys
+import tracemalloc
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / 'scripts'))
+import compile_annotation_data as cad
+from util import transcripts
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', required=True, choices=('ensembl', 'refseq'))
+    parser.add_argument('--annotations_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--appris_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--contig_mapping_fp', type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    if not args.annotations_fp.exists():
+        parser.error(f'Input file {args.annotations_fp} does not exist')
+    if not args.appris_fp.exists():
+        parser.error(f'Input file {args.appris_fp} does not exist')
+    if args.source == 'refseq' and not args.contig_mapping_fp:
+        parser.error('--contig_mapping_fp is required for RefSeq annotations')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    appris_data = transcripts.read_appris(args.appris_fp)
+    if args.source == 'ensembl':
+        contig_data = None
+        configure_record = cad.configure_ensembl_record
+    elif args.source == 'refseq':
+        contig_data = cad.get_refseq_contig_data(args.contig_mapping_fp)
+        configure_record = functools.partial(cad.configure_refseq_record, contig_data=contig_data)
+    else:
+        assert False
+
+    # Memory held by selected records as full GTF records and as compact records
+    gtf_record_bytes, record_count = measure_records(
+        args.annotations_fp, appris_data, configure_record, contig_data, compact=False,
+    )
+    compact_record_bytes, _ = measure_records(
+        args.annotations_fp, appris_data, configure_record, contig_data, compact=True,
+    )
+
+    print('representation', 'records', 'bytes', 'bytes_per_record', sep='\t')
+    for name, nbytes in (('GtfRecord', gtf_record_bytes), ('AnnotationRecord', compact_record_bytes)):
+        print(name, record_count, nbytes, f'{nbytes / record_count:.1f}', sep='\t')
+    print(f'reduction: {gtf_record_bytes / compact_record_bytes:.1f}x', file=sys.stderr)
+
+
+def measure_records(fp, appris_data, configure_record, contig_data, compact):
+    gc.collect()
+    tracemalloc.start()
+
+    records = list()
+    line_filter = cad.get_line_filter(appris_data, contig_data)
+    for record in cad.gtf_record_iterator(fp, line_filter):
+
+        # Same selection as compile_annotation_data.select_annotations
+        if record.feature in cad.TRANSCRIPT_FEATURES:
+            if not (transcript_full_id := record.attribute_dict.get('transcript_id')):
+                continue
+            if not appris_data.is_appris(transcript_full_id[0]):
+                continue
+        elif record.feature != 'gene':
+            continue
+
+        configure_record(record)
+        records.append(cad.AnnotationRecord.from_gtf_record(record) if compact else record)
+
+    gc.collect()
+    nbytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return nbytes, len(records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARKS_DIR = pathlib.Path(__file__).resolve().parent
+REPO_DIR = BENCHMARKS_DIR.parent
+GENERATE_SCRIPT = BENCHMARKS_DIR / 'generate_data.py'
+COMPILE_SCRIPT = REPO_DIR / 'scripts' / 'compile_annotation_data.py'
+PANEL_SCRIPTS_DIR = REPO_DIR / 'somatic_panel' / '4_panel_data' / 'scripts'
+
+DEFAULT_BASELINE_FP = BENCHMARKS_DIR / 'baseline.json'
+
+# Timings may exceed the baseline by this many seconds regardless of tolerance, short cases and stages
+# are otherwise too noisy to compare against the baseline
+MIN_SECONDS = 0.1
+
+# NOTE(SW): ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+RSS_SCALE = 1 if sys.platform == 'darwin' else 1024
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', default=0.1, type=float)
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--repeats', default=3, type=int)
+    parser.add_argument('--work_dir', type=pathlib.Path)
+    parser.add_argument('--baseline_fp', default=DEFAULT_BASELINE_FP, type=pathlib.Path)
+    parser.add_argument('--update_baseline', action='store_true')
+    parser.add_argument('--time_tolerance', default=0.25, type=float)
+    parser.add_argument('--memory_tolerance', default=0.15, type=float)
+    parser.add_argument('--results_fp', type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    if not 0 < args.scale <= 10:
+        parser.error(f'Got invalid scale, must be in (0, 10]: {args.scale}')
+    if args.repeats < 1:
+        parser.error(f'Got invalid number of repeats: {args.repeats}')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or pathlib.Path(tmp_dir)
+        results = run_benchmarks(work_dir, args.scale, args.seed, args.repeats)
+
+    if args.results_fp:
+        with args.results_fp.open('w') as fh:
+            json.dump(results, fh, indent=2)
+            fh.write('\n')
+
+    # Store results as the new baseline for this scale, or compare against the existing baseline
+    baselines = read_baselines(args.baseline_fp)
+    scale_key = str(args.scale)
+    if args.update_baseline:
+        baselines[scale_key] = results
+        with args.baseline_fp.open('w') as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print_results(results)
+        print(f'\nWrote baseline for scale {scale_key} to {args.baseline_fp}')
+        return
+
+    if scale_key not in baselines:
+        print_results(results)
+        print(f'\nERROR: no baseline for scale {scale_key} in {args.baseline_fp}', file=sys.stderr)
+        sys.exit(1)
+
+    regressions = compare_results(
+        results,
+        baselines[scale_key],
+        args.time_tolerance,
+        args.memory_tolerance,
+    )
+    print_results(results, baselines[scale_key])
+
+    if regressions:
+        plurality = 'regressions' if len(regressions) > 1 else 'regression'
+        message = f'\nERROR: found {len(regressions)} performance {plurality} against {args.baseline_fp}:'
+        print(message, *[f'  - {r}' for r in regressions], sep='\n', file=sys.stderr)
+        sys.exit(1)
+    print('\nNo performance regressions found')
+
+
+def run_benchmarks(work_dir, scale, seed, repeats):
+    data_dir = work_dir / 'data'
+    output_dir = work_dir / 'output'
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # NOTE(SW): data are generated in a separate process. Peak RSS of a child carries over from the
+    # parent at fork, so the parent must stay small for child memory use to be measured accurately
+    start = time.perf_counter()
+    command = [sys.executable, GENERATE_SCRIPT, '--output_dir', data_dir, '--scale', scale, '--seed', seed]
+    subprocess.run([str(e) for e in command], check=True)
+    print(f'Generated data at scale {scale} in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+
+    cases = dict()
+    for name, command, report_fp in get_cases(data_dir, output_dir):
+        runs = [run_case(name, command, report_fp) for _ in range(repeats)]
+        cases[name] = summarise_runs(runs)
+
+    return {
+        'info': {
+            'scale': scale,
+            'seed': seed,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'cases': cases,
+    }
+
+
+def get_cases(data_dir, output_dir):
+    # Yields name, command and compile report path of each benchmark case. Panel cases consume the
+    # compile outputs and so must run after them
+    sources = {
+        'ensembl': [
+            '--annotations_fp', data_dir / 'gencode.gtf.gz',
+            '--appris_fp', data_dir / 'appris.ensembl.tsv',
+        ],
+        'refseq': [
+            '--annotations_fp', data_dir / 'refseq.gtf.gz',
+            '--appris_fp', data_dir / 'appris.refseq.tsv',
+            '--contig_mapping_fp', data_dir / 'refseq_contig_id_mapping.tsv',
+        ],
+    }
+
+    for source, source_args in sources.items():
+        for mode, mode_args in (('default', []), ('streaming', ['--streaming']), ('batch', ['--batch'])):
+            mode_dir = output_dir / mode
+            mode_dir.mkdir(exist_ok=True)
+            report_fp = mode_dir / f'{source}.report.json'
+            command = [
+                sys.executable, COMPILE_SCRIPT, source,
+                *source_args,
+                '--output_dir', mode_dir,
+                '--no_cache',
+                '--report_fp', report_fp,
+                *mode_args,
+            ]
+            yield f'compile_{source}_{mode}', command, report_fp
+
+    compile_dir = output_dir / 'default'
+    yield 'create_gene_bed', [
+        sys.executable, PANEL_SCRIPTS_DIR / 'create_gene_bed.py',
+        '--panel_fp', data_dir / 'final_panel.tsv',
+        '--ensembl_gene_data_fp', data_dir / 'ensembl_gene_data.tsv',
+        '--refseq_gene_data_fp', data_dir / 'refseq_gene_data.tsv',
+        '--output_fp', output_dir / 'gene_regions.bed',
+    ], None
+
+    yield 'create_cds_bed', [
+        sys.executable, PANEL_SCRIPTS_DIR / 'create_cds_bed.py',
+        '--panel_fp', data_dir / 'final_panel.tsv',
+        '--ensembl_cds_data_fp', compile_dir / 'ensembl.cds.bed',
+        '--refseq_cds_data_fp', compile_dir / 'refseq.cds.bed',
+        '--output_fp', output_dir / 'cds_regions.bed',
+    ], None
+
+
+def run_case(name, command, report_fp):
+    # NOTE(SW): the child is reaped with wait4 to get resource usage of that process alone rather than
+    # the maximum over all children
+    start = time.perf_counter()
+    process = subprocess.Popen([str(e) for e in command], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_seconds = time.perf_counter() - start
+    process.stderr.close()
+
+    returncode = os.waitstatus_to_exitcode(status)
+    if returncode != 0:
+        print(stderr.decode(), file=sys.stderr)
+        print(f'ERROR: benchmark case {name} failed with exit code {returncode}', file=sys.stderr)
+        sys.exit(1)
+
+    result = {
+        'wall_seconds': wall_seconds,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime,
+        'peak_rss_bytes': usage.ru_maxrss * RSS_SCALE,
+        'stages': dict(),
+    }
+
+    if report_fp:
+        with report_fp.open('r') as fh:
+            report = json.load(fh)
+        result['stages'] = {n: s['wall_seconds'] for n, s in report['stages'].items()}
+
+    print(f'{name}: {wall_seconds:.2f}s', file=sys.stderr)
+    return result
+
+
+def summarise_runs(runs):
+    # Fastest run of each timing and the largest memory use across repeats
+    stage_names = {n for r in runs for n in r['stages']}
+    return {
+        'wall_seconds': min(r['wall_seconds'] for r in runs),
+        'cpu_seconds': min(r['cpu_seconds'] for r in runs),
+        'peak_rss_bytes': max(r['peak_rss_bytes'] for r in runs),
+        'stages': {n: min(r['stages'][n] for r in runs if n in r['stages']) for n in sorted(stage_names)},
+    }
+
+
+def read_baselines(fp):
+    if not fp.exists():
+        return dict()
+    with fp.open('r') as fh:
+        return json.load(fh)
+
+
+def compare_results(results, baseline, time_tolerance, memory_tolerance):
+    regressions = list()
+    for name, case in results['cases'].items():
+        if name not in baseline['cases']:
+            continue
+        case_baseline = baseline['cases'][name]
+
+        time_limit = get_time_limit(case_baseline['wall_seconds'], time_tolerance)
+        if case['wall_seconds'] > time_limit:
+            regressions.append(get_regression_str(name, 'wall time', case['wall_seconds'], case_baseline['wall_seconds']))
+
+        memory_limit = case_baseline['peak_rss_bytes'] * (1 + memory_tolerance)
+        if case['peak_rss_bytes'] > memory_limit:
+            regressions.append(get_regression_str(name, 'peak RSS', case['peak_rss_bytes'], case_baseline['peak_rss_bytes']))
+
+        for stage, seconds in case['stages'].items():
+            stage_baseline = case_baseline['stages'].get(stage)
+            if not stage_baseline:
+                continue
+            if seconds > get_time_limit(stage_baseline, time_tolerance):
+                regressions.append(get_regression_str(f'{name}:{stage}', 'wall time', seconds, stage_baseline))
+
+    return regressions
+
+
+def get_time_limit(baseline_seconds, time_tolerance):
+    return max(baseline_seconds * (1 + time_tolerance), baseline_seconds + MIN_SECONDS)
+
+
+def get_regression_str(name, metric, value, baseline_value):
+    change = (value / baseline_value - 1) * 100
+    return f'{name} {metric} {format_value(metric, value)} vs baseline {format_value(metric, baseline_value)} (+{change:.0f}%)'
+
+
+def format_value(metric, value):
+    if metric == 'peak RSS':
+        return f'{value / 1024 ** 2:.1f}MB'
+    return f'{value:.2f}s'
+
+
+def print_results(results, baseline=None):
+    header = ('case', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'baseline_wall_seconds', 'baseline_peak_rss_mb')
+    print('\t'.join(header))
+    for name, case in results['cases'].items():
+        values = [
+            name,
+            f'{case["wall_seconds"]:.2f}',
+            f'{case["cpu_seconds"]:.2f}',
+            f'{case["peak_rss_bytes"] / 1024 ** 2:.1f}',
+        ]
+        if baseline and name in baseline['cases']:
+            case_baseline = baseline['cases'][name]
+            values.append(f'{case_baseline["wall_seconds"]:.2f}')
+            values.append(f'{case_baseline["peak_rss_bytes"] / 1024 ** 2:.1f}')
+        else:
+            values.extend(['NA', 'NA'])
+        print('\t'.join(values))
+
+
+if __name__ == '__main__':
+    main()
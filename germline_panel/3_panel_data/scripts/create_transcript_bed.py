@@ -3,6 +3,11 @@ import argparse
 import pathlib
 import sys
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3] / 'scripts'))
+from util import bgzf
+from util import panel_data
+from util import tables
+
 
 def get_arguments():
     parser = argparse.ArgumentParser()
@@ -23,35 +28,12 @@ def main():
     # Get command line arguments
     args = get_arguments()
 
-    # Read gene IDs for panel data
-    gene_ids = set()
-    with args.panel_fp.open('r') as fh:
-        header_tokens = fh.readline().rstrip().split('\t')
-
-        for line in fh:
-            data = line.rstrip().split('\t')
-            panel_record = {k: v for k, v in zip(header_tokens, data)}
-            gene_ids.add(panel_record['ensembl_gene_id'])
-
-    # Store transcript to print later
-    transcripts = list()
-    genes_seen = set()
-    header_tokens = ('chrom', 'start', 'stop', 'data_str', 'strand')
-    data_tokens = ('symbol', 'hgnc_id', 'gene_id', 'transcript_id')
-    with args.ensembl_transcript_data_fp.open('r') as fh:
-        for line in fh:
-            values = line.rstrip().split('\t')
-            record = {k: v for k, v in zip(header_tokens, values)}
-            record['data'] = {k: v for k, v in zip(data_tokens, record['data_str'].split(';'))}
-
-            if record['data']['gene_id'] not in gene_ids:
-                continue
-
-            genes_seen.add(record['data']['gene_id'])
-            transcripts.append(line.rstrip())
+    # Get transcripts of panel genes
+    panel = tables.read_panel(args.panel_fp)
+    transcripts = tables.read_region_bed(args.ensembl_transcript_data_fp)
+    data, genes_missed = panel_data.get_transcript_regions(panel, transcripts)
 
     # Check we have processed all genes
-    genes_missed = gene_ids - genes_seen
     if genes_missed:
         plurality = 'genes' if len(genes_missed) > 1 else 'gene'
         genes_missed_strs = [f'  - {n}' for n in genes_missed]
@@ -60,7 +42,7 @@ def main():
         sys.exit(1)
 
     # Print out transcripts
-    print(*transcripts, sep='\n')
+    bgzf.write_rows(sys.stdout, data)
 
 
 if __name__ == '__main__':
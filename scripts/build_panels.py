@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import re
+import subprocess
+import sys
+import threading
+import time
+
+
+REPO_DIR = pathlib.Path(__file__).resolve().parents[1]
+STATE_FP = REPO_DIR / 'build' / 'build_state.json'
+REPORT_FP = REPO_DIR / 'build' / 'build_report.json'
+
+
+class Step:
+
+    # NOTE(SW): command is run from the repository root with paths relative to it. Where stdout_fp is
+    # set, stdout is written to that file. Step dependencies are inferred by matching inputs to the
+    # outputs of other steps. Local outputs are those not committed, e.g. the large compiled CDS BEDs,
+    # which are not expected to exist where the step cannot be run
+    def __init__(self, name, command, inputs, outputs, stdout_fp=None, shell=False, local_outputs=()):
+        self.name = name
+        self.command = command
+        self.inputs = [pathlib.Path(p) for p in inputs]
+        self.outputs = [pathlib.Path(p) for p in outputs]
+        self.local_outputs = [pathlib.Path(p) for p in local_outputs]
+        self.stdout_fp = pathlib.Path(stdout_fp) if stdout_fp else None
+        self.shell = shell
+
+
+def get_steps():
+    python = sys.executable
+    util_fps = sorted(str(p.relative_to(REPO_DIR)) for p in (REPO_DIR / 'scripts' / 'util').glob('*.py'))
+
+    somatic_dn = 'somatic_panel/4_panel_data'
+    somatic_panel_fp = 'somatic_panel/3_final_panel/final_panel.tsv'
+    germline_dn = 'germline_panel/3_panel_data'
+    germline_panel_fp = 'germline_panel/2_final_panel/final_panel.tsv'
+    hartwig_panel_fp = 'somatic_panel/1_panel_sources/sources_dynamic/hmf/data/DriverGenePanel.38.tsv'
+
+    # NOTE(SW): the gene data TSVs (resources/{ensembl,refseq}_gene_data.tsv) are committed source
+    # resources that no step generates, so are inputs only and changes to compiled annotations do not
+    # propagate to them
+    compile_script = 'scripts/compile_annotation_data.py'
+    ensembl_outputs = [f'resources/ensembl.{s}' for s in ('genes.tsv', 'transcripts.bed', 'cds.bed')]
+    refseq_outputs = [f'resources/refseq.{s}' for s in ('genes.tsv', 'transcripts.bed', 'cds.bed')]
+
+    steps = [
+        Step(
+            'compile_ensembl',
+            [
+                python, compile_script, 'ensembl',
+                '--annotations_fp', 'resources/gencode.v39.annotation.gtf.gz',
+                '--appris_fp', 'resources/appris.e105v46.tsv',
+                '--output_dir', 'resources/',
+            ],
+            inputs=[compile_script, *util_fps, 'resources/gencode.v39.annotation.gtf.gz', 'resources/appris.e105v46.tsv'],
+            outputs=ensembl_outputs,
+            local_outputs=['resources/ensembl.cds.bed'],
+        ),
+        Step(
+            'compile_refseq',
+            [
+                python, compile_script, 'refseq',
+                '--annotations_fp', 'resources/GCF_000001405.40_GRCh38.p14_genomic.gtf.gz',
+                '--appris_fp', 'resources/appris.rs110v48.tsv',
+                '--contig_mapping_fp', 'resources/refseq_contig_id_mapping.tsv',
+                '--output_dir', 'resources/',
+            ],
+            inputs=[
+                compile_script,
+                *util_fps,
+                'resources/GCF_000001405.40_GRCh38.p14_genomic.gtf.gz',
+                'resources/appris.rs110v48.tsv',
+                'resources/refseq_contig_id_mapping.tsv',
+            ],
+            outputs=refseq_outputs,
+            local_outputs=['resources/refseq.cds.bed'],
+        ),
+        Step(
+            'somatic_gene_symbols_all',
+            ['awk', '-F\t', 'NR > 1 { print ($1 != "NA" ? $1 : $3)  }', somatic_panel_fp],
+            inputs=[somatic_panel_fp],
+            outputs=[f'{somatic_dn}/output/umccr_cancer_genes.gene_symbols.all.txt'],
+            stdout_fp=f'{somatic_dn}/output/umccr_cancer_genes.gene_symbols.all.txt',
+        ),
+        Step(
+            'somatic_gene_symbols_tsgenes',
+            ['awk', '-F\t', '$8 == "TRUE" { print ($1 != "NA" ? $1 : $3) }', somatic_panel_fp],
+            inputs=[somatic_panel_fp],
+            outputs=[f'{somatic_dn}/output/umccr_cancer_genes.gene_symbols.tsgenes.txt'],
+            stdout_fp=f'{somatic_dn}/output/umccr_cancer_genes.gene_symbols.tsgenes.txt',
+        ),
+        Step(
+            'somatic_gene_bed',
+            [
+                python, f'{somatic_dn}/scripts/create_gene_bed.py',
+                '--panel_fp', somatic_panel_fp,
+                '--ensembl_gene_data_fp', 'resources/ensembl_gene_data.tsv',
+                '--refseq_gene_data_fp', 'resources/refseq_gene_data.tsv',
+            ],
+            inputs=[
+                f'{somatic_dn}/scripts/create_gene_bed.py',
+                *util_fps,
+                somatic_panel_fp,
+                'resources/ensembl_gene_data.tsv',
+                'resources/refseq_gene_data.tsv',
+            ],
+            outputs=[f'{somatic_dn}/output/umccr_cancer_genes.gene_regions.bed'],
+            stdout_fp=f'{somatic_dn}/output/umccr_cancer_genes.gene_regions.bed',
+        ),
+        Step(
+            'somatic_cds_bed',
+            [
+                python, f'{somatic_dn}/scripts/create_cds_bed.py',
+                '--panel_fp', somatic_panel_fp,
+                '--ensembl_cds_data_fp', 'resources/ensembl.cds.bed',
+                '--refseq_cds_data_fp', 'resources/refseq.cds.bed',
+            ],
+            inputs=[
+                f'{somatic_dn}/scripts/create_cds_bed.py',
+                *util_fps,
+                somatic_panel_fp,
+                'resources/ensembl.cds.bed',
+                'resources/refseq.cds.bed',
+            ],
+            outputs=[f'{somatic_dn}/output/umccr_cancer_genes.cds_regions.bed'],
+            stdout_fp=f'{somatic_dn}/output/umccr_cancer_genes.cds_regions.bed',
+        ),
+        # NOTE(SW): the remaining hmftools data files are generated with gene-utils from this driver
+        # panel, see somatic_panel/4_panel_data/README.md
+        Step(
+            'somatic_hmftools_panel',
+            [
+                python, f'{somatic_dn}/scripts/create_hmftools_panel.py',
+                '--panel_fp', somatic_panel_fp,
+                '--hartwig_panel_fp', hartwig_panel_fp,
+            ],
+            inputs=[f'{somatic_dn}/scripts/create_hmftools_panel.py', *util_fps, somatic_panel_fp, hartwig_panel_fp],
+            outputs=[f'{somatic_dn}/output/hmftools/DriverGenePanel.38.tsv'],
+            stdout_fp=f'{somatic_dn}/output/hmftools/DriverGenePanel.38.tsv',
+        ),
+        Step(
+            'germline_gene_symbols',
+            f'cut -f2 -d$\'\\t\' {germline_panel_fp} | tail -n+2 | grep -v NA | sed \'s/\\..*$//\' | sort',
+            inputs=[germline_panel_fp],
+            outputs=[f'{germline_dn}/output/umccr_predisposition_genes.gene_symbols.txt'],
+            stdout_fp=f'{germline_dn}/output/umccr_predisposition_genes.gene_symbols.txt',
+            shell=True,
+        ),
+        Step(
+            'germline_transcript_bed',
+            [
+                python, f'{germline_dn}/scripts/create_transcript_bed.py',
+                '--panel_fp', germline_panel_fp,
+                '--ensembl_transcript_data_fp', 'resources/ensembl.transcripts.bed',
+            ],
+            inputs=[
+                f'{germline_dn}/scripts/create_transcript_bed.py',
+                *util_fps,
+                germline_panel_fp,
+                'resources/ensembl.transcripts.bed',
+            ],
+            outputs=[f'{germline_dn}/output/umccr_predisposition_genes.transcript_regions.bed'],
+            stdout_fp=f'{germline_dn}/output/umccr_predisposition_genes.transcript_regions.bed',
+        ),
+    ]
+
+    # NOTE(SW): compiled CDS BEDs are validated where present but are not inputs, as they are not committed
+    # and would otherwise block validation and release wherever the source annotations are absent. The
+    # report is written by the script rather than through stdout so that it is kept when validation fails
+    validate_script = 'scripts/validate_panel_data.py'
+    steps.append(Step(
+        'validate',
+        [python, validate_script, '--report_fp', 'build/validation_report.json'],
+        inputs=[
+            validate_script,
+            *util_fps,
+            'resources/ensembl_gene_data.tsv',
+            'resources/refseq_gene_data.tsv',
+            'resources/ensembl.genes.tsv',
+            'resources/refseq.genes.tsv',
+            'resources/ensembl.transcripts.bed',
+            'resources/refseq.transcripts.bed',
+            somatic_panel_fp,
+            germline_panel_fp,
+            f'{somatic_dn}/output/umccr_cancer_genes.gene_regions.bed',
+            f'{somatic_dn}/output/umccr_cancer_genes.cds_regions.bed',
+            f'{germline_dn}/output/umccr_predisposition_genes.transcript_regions.bed',
+        ],
+        outputs=['build/validation_report.json'],
+    ))
+
+    # Release assets depend on all panel outputs and validation
+    release_version = get_release_version()
+    release_dn = f'build/{release_version}'
+    steps.append(Step(
+        'release',
+        [python, 'scripts/build_release_assets.py'],
+        inputs=[
+            'scripts/build_release_assets.py',
+            *util_fps,
+            *(p for s in steps if not s.name.startswith('compile_') for p in s.outputs),
+            f'{somatic_dn}/output/',
+            f'{germline_dn}/output/',
+            'fusion_panel/1_panel_data/output/',
+            somatic_panel_fp,
+            germline_panel_fp,
+            'resources/hmftools_ensembl_data_cache/',
+        ],
+        outputs=[
+            f'{release_dn}/panel-data-v{release_version}.tar.gz',
+            f'{release_dn}/ensembl-data-cache-v{release_version}.tar.gz',
+            f'{release_dn}/somatic_panel-v{release_version}.tsv',
+            f'{release_dn}/germline_panel-v{release_version}.tsv',
+        ],
+    ))
+
+    return steps
+
+
+def get_release_version():
+    with (REPO_DIR / 'scripts' / 'build_release_assets.py').open('r') as fh:
+        [release_version] = re.findall(r"^RELEASE_VERSION = '(\S+)'$", fh.read(), re.MULTILINE)
+    return release_version
+
+
+def get_arguments():
+    steps = get_steps()
+    step_names = [s.name for s in steps]
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('targets', nargs='*', metavar='target')
+    parser.add_argument('--jobs', default=os.cpu_count(), type=int)
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--dry_run', action='store_true')
+    parser.add_argument('--list', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error(f'Got invalid number of jobs: {args.jobs}')
+    if (targets_unknown := [n for n in args.targets if n not in step_names]):
+        parser.error(f'Got unknown targets: {", ".join(targets_unknown)}')
+
+    # NOTE(SW): release assets are only built when explicitly requested
+    if not args.targets:
+        args.targets = [n for n in step_names if n != 'release']
+
+    return args, steps
+
+
+def main():
+    # Get command line arguments
+    args, steps = get_arguments()
+
+    if args.list:
+        for step in steps:
+            print(step.name, *(str(p) for p in step.outputs), sep='\t')
+        return
+
+    # Run steps and write report
+    dependencies = get_dependencies(steps)
+    selected = get_selected_steps(args.targets, dependencies)
+
+    runner = StepRunner(steps, dependencies, args.force, args.dry_run)
+    results = runner.run(selected, args.jobs)
+
+    print_summary(results)
+    if not args.dry_run:
+        write_report(results)
+
+    if any(r['status'] in {'failed', 'missing', 'skipped'} for r in results.values()):
+        sys.exit(1)
+
+
+def get_dependencies(steps):
+    producers = dict()
+    for step in steps:
+        for output_fp in step.outputs:
+            assert output_fp not in producers
+            producers[output_fp] = step.name
+
+    dependencies = dict()
+    for step in steps:
+        dependencies[step.name] = {producers[p] for p in step.inputs if p in producers}
+    return dependencies
+
+
+def get_selected_steps(targets, dependencies):
+    selected = set()
+    stack = list(targets)
+    while stack:
+        if (name := stack.pop()) in selected:
+            continue
+        selected.add(name)
+        stack.extend(dependencies[name])
+    return selected
+
+
+class StepRunner:
+
+    def __init__(self, steps, dependencies, force=False, dry_run=False):
+        self.steps = {s.name: s for s in steps}
+        self.dependencies = dependencies
+        self.force = force
+        self.dry_run = dry_run
+
+        self.state = read_state()
+        self.state_lock = threading.Lock()
+
+    def run(self, selected, jobs):
+        # Independent steps are run concurrently; each step runs as a subprocess so threads suffice
+        results = dict()
+        pending = set(selected)
+        running = dict()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+
+                # Skip steps with failed dependencies, repeated so that skips propagate to all dependents
+                while (skip_names := [n for n in pending if self.has_failed_dependency(n, results)]):
+                    for name in skip_names:
+                        results[name] = {'status': 'skipped', 'wall_time': 0.0, 'message': 'dependency failed'}
+                        pending.remove(name)
+
+                # Submit steps with all dependencies complete
+                for name in sorted(pending):
+                    if all(d in results for d in self.dependencies[name]):
+                        running[executor.submit(self.run_step, name)] = name
+                        pending.remove(name)
+
+                if not running:
+                    # NOTE(SW): steps can only remain pending with none running if there is a cycle
+                    assert not pending
+                    continue
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    print(f'{name}: {results[name]["status"]} ({results[name]["wall_time"]:.1f}s)', file=sys.stderr)
+
+        return results
+
+    def has_failed_dependency(self, name, results):
+        return any(results.get(d, {}).get('status') in {'failed', 'skipped'} for d in self.dependencies[name])
+
+    def run_step(self, name):
+        step = self.steps[name]
+        start_time = time.perf_counter()
+
+        # Steps that cannot be run are accepted if committed outputs already exist, e.g. compiled
+        # annotations where the source GTF has not been downloaded. Dependents then check their own inputs
+        if (missing_fps := [p for p in step.inputs if not (REPO_DIR / p).exists()]):
+            message = f'missing inputs: {", ".join(str(p) for p in missing_fps)}'
+            status = 'unavailable' if self.outputs_exist(step, committed_only=True) else 'missing'
+            return {'status': status, 'wall_time': 0.0, 'message': message}
+
+        input_digest = self.get_input_digest(step)
+        if not self.force and self.outputs_exist(step):
+            if self.state['steps'].get(name, {}).get('input_digest') == input_digest:
+                return {'status': 'up-to-date', 'wall_time': time.perf_counter() - start_time}
+
+        if self.dry_run:
+            return {'status': 'would run', 'wall_time': 0.0}
+
+        try:
+            execute_step(step)
+        except subprocess.CalledProcessError as exc:
+            # Retain only the end of stderr, which contains the error for failed scripts
+            message = '\n  '.join(exc.stderr.decode().strip().splitlines()[-10:]) if exc.stderr else str(exc)
+            return {'status': 'failed', 'wall_time': time.perf_counter() - start_time, 'message': message}
+
+        with self.state_lock:
+            self.state['steps'][name] = {'input_digest': input_digest}
+            write_state(self.state)
+
+        return {'status': 'built', 'wall_time': time.perf_counter() - start_time}
+
+    def outputs_exist(self, step, committed_only=False):
+        output_fps = [p for p in step.outputs if not (committed_only and p in step.local_outputs)]
+        return all((REPO_DIR / p).exists() for p in output_fps)
+
+    def get_input_digest(self, step):
+        h = hashlib.sha256()
+        h.update(json.dumps(step.command).encode())
+        for fp in expand_paths(step.inputs):
+            h.update(str(fp).encode())
+            h.update(self.get_file_digest(fp).encode())
+        return h.hexdigest()
+
+    def get_file_digest(self, fp):
+        # Reuse digests of unmodified files, hashing large annotation files is otherwise slow
+        stat = (REPO_DIR / fp).stat()
+        file_key = [stat.st_size, stat.st_mtime_ns]
+
+        with self.state_lock:
+            entry = self.state['files'].get(str(fp))
+        if entry and entry['stat'] == file_key:
+            return entry['digest']
+
+        h = hashlib.sha256()
+        with (REPO_DIR / fp).open('rb') as fh:
+            while (block := fh.read(1024 ** 2)):
+                h.update(block)
+
+        with self.state_lock:
+            self.state['files'][str(fp)] = {'stat': file_key, 'digest': h.hexdigest()}
+        return h.hexdigest()
+
+
+def execute_step(step):
+    # Write stdout to a temporary file so that failed steps do not leave partial outputs
+    for output_fp in step.outputs:
+        (REPO_DIR / output_fp).parent.mkdir(parents=True, exist_ok=True)
+
+    executable = '/bin/bash' if step.shell else None
+    if not step.stdout_fp:
+        subprocess.run(
+            step.command,
+            cwd=REPO_DIR,
+            shell=step.shell,
+            check=True,
+            stderr=subprocess.PIPE,
+            executable=executable,
+        )
+        return
+
+    stdout_fp = REPO_DIR / step.stdout_fp
+    stdout_tmp_fp = stdout_fp.with_name(f'.{stdout_fp.name}.tmp')
+    try:
+        with stdout_tmp_fp.open('wb') as fh:
+            subprocess.run(
+                step.command,
+                cwd=REPO_DIR,
+                shell=step.shell,
+                check=True,
+                stdout=fh,
+                stderr=subprocess.PIPE,
+                executable=executable,
+            )
+        stdout_tmp_fp.replace(stdout_fp)
+    finally:
+        stdout_tmp_fp.unlink(missing_ok=True)
+
+
+def expand_paths(fps):
+    # Directories are expanded to all contained files
+    for fp in fps:
+        if (REPO_DIR / fp).is_dir():
+            yield from sorted(p.relative_to(REPO_DIR) for p in (REPO_DIR / fp).rglob('*') if p.is_file())
+        else:
+            yield fp
+
+
+def read_state():
+    if not STATE_FP.exists():
+        return {'steps': dict(), 'files': dict()}
+    with STATE_FP.open('r') as fh:
+        return json.load(fh)
+
+
+def write_state(state):
+    STATE_FP.parent.mkdir(parents=True, exist_ok=True)
+    state_tmp_fp = STATE_FP.with_suffix('.tmp')
+    with state_tmp_fp.open('w') as fh:
+        json.dump(state, fh, indent=2)
+    state_tmp_fp.replace(STATE_FP)
+
+
+def print_summary(results):
+    for name, result in sorted(results.items()):
+        print(name, result['status'], f'{result["wall_time"]:.1f}s', sep='\t')
+        if result.get('message'):
+            print(f'  {result["message"]}')
+
+
+def write_report(results):
+    REPORT_FP.parent.mkdir(parents=True, exist_ok=True)
+    with REPORT_FP.open('w') as fh:
+        json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import json
+import os
+import pathlib
+import shutil
+import sys
+import time
+
+from util import archive
+
+
+RELEASE_VERSION = '24.08.0'
+
+REPO_DIR = pathlib.Path(__file__).resolve().parents[1]
+BUILD_DIR = REPO_DIR / 'build'
+CACHE_DIR = BUILD_DIR / 'asset_cache'
+DIGESTS_FP = CACHE_DIR / 'file_digests.json'
+
+# NOTE(SW): fusion panel is currently the somatic panel, so is skipped; the full fusion database is
+# excluded from panel data
+FUSION_EXCLUDE_NAMES = ('fusion_database.tsv', 'hmftools_fusion_data.subset.csv')
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', default=os.cpu_count(), type=int)
+    # NOTE(SW): archive mtimes default to zero unless set through SOURCE_DATE_EPOCH, as for other
+    # reproducible builds
+    parser.add_argument('--mtime', default=int(os.environ.get('SOURCE_DATE_EPOCH', 0)), type=int)
+    parser.add_argument('--force', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.threads < 1:
+        parser.error(f'Got invalid number of threads: {args.threads}')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    archives, files = get_assets(RELEASE_VERSION)
+    for source_fp in [*(s for _, sources in archives.values() for s, _, _ in sources), *files.values()]:
+        if not (REPO_DIR / source_fp).exists():
+            print(f'ERROR: release input {source_fp} does not exist', file=sys.stderr)
+            sys.exit(1)
+
+    # Archive manifests are built from file digests, which are reused for files unchanged since the
+    # previous build
+    archive_entries = dict()
+    for name, (root_dn, sources) in archives.items():
+        entries = [archive.ArchiveEntry(root_dn, None)]
+        for source_dp, archive_dn, exclude_names in sources:
+            archive_dp = f'{root_dn}/{archive_dn}' if archive_dn else root_dn
+            source_entries = archive.get_directory_entries(REPO_DIR / source_dp, archive_dp, exclude_names)
+            entries.extend(e for e in source_entries if e.name != root_dn)
+        archive_entries[name] = entries
+
+    source_fps = [e.source_fp for entries in archive_entries.values() for e in entries if e.source_fp]
+    digests = get_file_digests(source_fps, args.threads)
+
+    # Existing archives are reused where their manifest is unchanged; otherwise archives are built
+    # concurrently, each compressed with multiple threads
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_fps = dict()
+    build_names = list()
+    for name, entries in archive_entries.items():
+        manifest = archive.get_manifest(name, entries, args.mtime, digests)
+        manifest_digest = archive.get_manifest_digest(manifest)
+        cache_fps[name] = CACHE_DIR / f'{manifest_digest}.tar.gz'
+        with (CACHE_DIR / f'{manifest_digest}.json').open('w') as fh:
+            json.dump(manifest, fh, indent=2)
+        if args.force or not cache_fps[name].exists():
+            build_names.append(name)
+
+    with concurrent.futures.ThreadPoolExecutor(max(len(build_names), 1)) as executor:
+        futures = dict()
+        for name in build_names:
+            future = executor.submit(build_archive, cache_fps[name], archive_entries[name], args.mtime, args.threads)
+            futures[future] = name
+        for future in concurrent.futures.as_completed(futures):
+            print(f'{futures[future]}: built ({future.result():.1f}s)', file=sys.stderr)
+    for name in archive_entries.keys() - set(build_names):
+        print(f'{name}: reused {cache_fps[name].name}', file=sys.stderr)
+
+    # Replace release directory contents, linking archives from the cache
+    release_dp = BUILD_DIR / RELEASE_VERSION
+    if release_dp.exists():
+        shutil.rmtree(release_dp)
+    release_dp.mkdir(parents=True)
+    for name, cache_fp in cache_fps.items():
+        link_or_copy(cache_fp, release_dp / name)
+    for name, source_fp in files.items():
+        shutil.copyfile(REPO_DIR / source_fp, release_dp / name)
+
+    # Remove cached archives not part of this release
+    for fp in CACHE_DIR.glob('*.tar.gz'):
+        if fp not in cache_fps.values():
+            fp.unlink()
+            fp.with_suffix('').with_suffix('.json').unlink(missing_ok=True)
+
+
+def get_assets(release_version):
+    # Archives as a root directory and sources of (source directory, archive subdirectory, excluded
+    # names), and files copied as is; source paths are relative to the repository root
+    data_dn = f'panel-data-v{release_version}'
+    ensembl_dn = f'ensembl-data-cache-v{release_version}'
+    archives = {
+        f'{data_dn}.tar.gz': (data_dn, [
+            ('somatic_panel/4_panel_data/output', 'somatic', ()),
+            ('germline_panel/3_panel_data/output', 'germline', ()),
+            ('fusion_panel/1_panel_data/output', 'fusion', FUSION_EXCLUDE_NAMES),
+        ]),
+        # NOTE(SW): made available for download and construct UMCCR reference data
+        f'{ensembl_dn}.tar.gz': (ensembl_dn, [
+            ('resources/hmftools_ensembl_data_cache', None, ()),
+        ]),
+    }
+    files = {
+        f'somatic_panel-v{release_version}.tsv': 'somatic_panel/3_final_panel/final_panel.tsv',
+        f'germline_panel-v{release_version}.tsv': 'germline_panel/2_final_panel/final_panel.tsv',
+    }
+    return archives, files
+
+
+def get_file_digests(fps, threads):
+    # NOTE(SW): digests are cached by file size and mtime, hashing the Ensembl data cache is otherwise
+    # the slowest part of an unchanged build
+    cache = dict()
+    if DIGESTS_FP.exists():
+        with DIGESTS_FP.open('r') as fh:
+            cache = json.load(fh)
+
+    digests = dict()
+    hash_fps = list()
+    for fp in fps:
+        stat = fp.stat()
+        entry = cache.get(str(fp))
+        if entry and entry['stat'] == [stat.st_size, stat.st_mtime_ns]:
+            digests[fp] = entry['digest']
+        else:
+            hash_fps.append(fp)
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        for fp, digest in zip(hash_fps, executor.map(archive.get_file_digest, hash_fps)):
+            digests[fp] = digest
+
+    cache = dict()
+    for fp, digest in digests.items():
+        stat = fp.stat()
+        cache[str(fp)] = {'stat': [stat.st_size, stat.st_mtime_ns], 'digest': digest}
+    DIGESTS_FP.parent.mkdir(parents=True, exist_ok=True)
+    digests_tmp_fp = DIGESTS_FP.with_suffix('.tmp')
+    with digests_tmp_fp.open('w') as fh:
+        json.dump(cache, fh, indent=2)
+    digests_tmp_fp.replace(DIGESTS_FP)
+
+    return digests
+
+
+def build_archive(fp, entries, mtime, threads):
+    # Written to a temporary file so that failed builds do not leave partial archives in the cache
+    start_time = time.perf_counter()
+    tmp_fp = fp.with_name(f'.{fp.name}.tmp')
+    try:
+        archive.write_archive(tmp_fp, entries, mtime, threads)
+        tmp_fp.replace(fp)
+    finally:
+        tmp_fp.unlink(missing_ok=True)
+    return time.perf_counter() - start_time
+
+
+def link_or_copy(source_fp, output_fp):
+    try:
+        os.link(source_fp, output_fp)
+    except OSError:
+        shutil.copyfile(source_fp, output_fp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import pathlib
+import sys
+import time
+
+import compile_annotation_data
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--annotations_fps', required=True, type=pathlib.Path, nargs='+')
+    parser.add_argument('--max_mismatches', default=10, type=int)
+
+    args = parser.parse_args()
+
+    for fp in args.annotations_fps:
+        if not fp.exists():
+            parser.error(f'Input file {fp} does not exist')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Compare attribute dicts from both parsers for every line of every input file
+    mismatch_total = 0
+    for fp in args.annotations_fps:
+        counts = check_file(fp, args.max_mismatches)
+        mismatch_total += counts['mismatches']
+
+        print(
+            fp.name,
+            f'lines={counts["lines"]}',
+            f'mismatches={counts["mismatches"]}',
+            f'reference_time={counts["reference_time"]:.1f}s',
+            f'fast_time={counts["fast_time"]:.1f}s',
+            sep='\t',
+        )
+
+    if mismatch_total:
+        sys.exit(1)
+
+
+def check_file(fp, max_mismatches):
+    counts = {'lines': 0, 'mismatches': 0, 'reference_time': 0.0, 'fast_time': 0.0}
+    with gzip.open(fp, 'rt') as fh:
+        for line in fh:
+
+            # Skip header rows and the RefSeq terminal line
+            if line.startswith('#'):
+                continue
+
+            attribute = line.rstrip('\n').split('\t')[8]
+            counts['lines'] += 1
+
+            t0 = time.perf_counter()
+            attr_dict_reference = build_attribute_dict(compile_annotation_data.attr_string_parser(attribute))
+            t1 = time.perf_counter()
+            attr_dict_fast = build_attribute_dict(compile_annotation_data.attr_string_parser_fast(attribute))
+            t2 = time.perf_counter()
+
+            counts['reference_time'] += t1 - t0
+            counts['fast_time'] += t2 - t1
+
+            if attr_dict_reference == attr_dict_fast:
+                continue
+
+            counts['mismatches'] += 1
+            if counts['mismatches'] <= max_mismatches:
+                print(f'ERROR: attribute mismatch in {fp.name}:', attribute, sep='\n  ', file=sys.stderr)
+
+    return counts
+
+
+def build_attribute_dict(attrs):
+    # NOTE(SW): mirrors compile_annotation_data.prepare_record
+    attr_dict = dict()
+    for attr_name, attr_data in attrs:
+        if attr_name not in attr_dict:
+            attr_dict[attr_name] = list()
+        attr_dict[attr_name].append(attr_data)
+    return attr_dict
+
+
+if __name__ == '__main__':
+    main()
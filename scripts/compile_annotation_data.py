@@ -1,12 +1,65 @@
 #!/usr/bin/env python3
 import argparse
+import collections
+import concurrent.futures
+import functools
 import gzip
+import heapq
+import itertools
+import json
 import pathlib
 import re
+import struct
 import sys
+import tempfile
+import time
 
+from util import bgzf
+from util import cache
+from util import contigs
+from util import instrument
+from util import tables
+from util import transcripts
 
-CHROM_ORDER = [f'chr{e}' for e in [*range(1, 23), 'X', 'Y', 'M']]
+TRANSCRIPT_FEATURES = {'transcript', 'CDS', 'stop_codon'}
+TRANSCRIPT_ID_RE = re.compile(r'(?:^|; )transcript_id "([^";]*)";')
+
+# Attribute name with quoted or unquoted data followed by one space or the end of the string, where
+# quoted data may hold semicolons, spaces, and escaped characters. Any other character is captured by
+# the final group, marking the string as malformed
+ATTR_RE = re.compile(r'([^\s";\\]+) (?:"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s";\\]+));(?: |$)|(.)')
+
+# Lines per chunk for decompressed input and compressed bytes per chunk for BGZF input
+CHUNK_LINES = 20000
+CHUNK_BGZF_BYTES = 2 * 1024 * 1024
+
+# Decompressed bytes read for each batch of lines in batch mode, roughly 15,000 GENCODE lines
+BATCH_BYTES = 4 * 1024 * 1024
+
+# Record selection arguments for each worker process, set through the process pool initializer
+WORKER_ARGS = None
+
+# Parsed inputs used by more than one manifest entry, keyed by input type and path. Set once for each
+# manifest worker process through the process pool initializer
+SHARED_INPUTS = dict()
+
+# Manifest columns, contig mapping is required only for RefSeq entries and name is optional
+MANIFEST_COLUMNS = ('source', 'annotations_fp', 'appris_fp', 'contig_mapping_fp', 'output_dir')
+
+# Output file suffix, header, contig/start/end columns, and whether start is zero-based for each
+# annotation type
+GENE_HEADER = ['hgnc_id', 'gene_id', 'symbol', 'contig', 'start', 'end', 'strand']
+OUTPUTS = {
+    'genes': ('genes.tsv', GENE_HEADER, (3, 4, 5), False),
+    'transcripts': ('transcripts.bed', None, (0, 1, 2), True),
+    'cds': ('cds.bed', None, (0, 1, 2), True),
+}
+
+# Maximum records held in memory for each sorted run when input is not grouped by contig
+STREAM_RUN_RECORDS = 1000000
+
+# Version of cached annotation tables, must be incremented when record selection or configuration changes
+CACHE_VERSION = 1
 
 
 class GtfRecord:
@@ -36,6 +89,49 @@ class GtfRecord:
         self.transcript_id = str()
 
 
+class AnnotationRecord:
+
+    # NOTE(SW): compact representation of a selected record that retains only the data used by the
+    # write functions; identifiers and other repeated strings are interned so that they are shared
+    # across records, e.g. the transcript ID of each CDS record
+    __slots__ = (
+        'seqname',
+        'start',
+        'end',
+        'strand',
+        'feature',
+        'gene_name',
+        'hgnc_id',
+        'gene_id',
+        'transcript_id',
+    )
+
+    def __init__(self, seqname, start, end, strand, feature, gene_name, hgnc_id, gene_id, transcript_id):
+        self.seqname = seqname
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.feature = feature
+        self.gene_name = gene_name
+        self.hgnc_id = hgnc_id
+        self.gene_id = gene_id
+        self.transcript_id = transcript_id
+
+    @classmethod
+    def from_gtf_record(cls, record):
+        return cls(
+            sys.intern(record.seqname),
+            int(record.start),
+            int(record.end),
+            sys.intern(record.strand),
+            sys.intern(record.feature),
+            sys.intern(record.gene_name),
+            sys.intern(record.hgnc_id),
+            sys.intern(record.gene_id),
+            sys.intern(record.transcript_id),
+        )
+
+
 def get_arguments():
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(title='subcommand', dest='subcommand')
@@ -44,21 +140,109 @@ def get_arguments():
     parser_ensembl.add_argument('--annotations_fp', required=True, type=pathlib.Path)
     parser_ensembl.add_argument('--appris_fp', required=True, type=pathlib.Path)
     parser_ensembl.add_argument('--output_dir', required=True, type=pathlib.Path)
+    parser_ensembl.add_argument('--workers', default=1, type=int)
+    parser_ensembl.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser_ensembl.add_argument('--unknown_contigs', default='error', choices=contigs.UNKNOWN_CONTIG_MODES)
+    parser_ensembl.add_argument('--streaming', action='store_true')
+    parser_ensembl.add_argument('--batch', action='store_true')
+    parser_ensembl.add_argument('--bgzip', action='store_true')
+    parser_ensembl.add_argument('--store', action='store_true')
+    parser_ensembl.add_argument('--cache_dir', default=cache.DEFAULT_CACHE_DIR, type=pathlib.Path)
+    parser_ensembl.add_argument('--cache_max_bytes', default=cache.DEFAULT_CACHE_MAX_BYTES, type=int)
+    parser_ensembl.add_argument('--no_cache', action='store_true')
+    parser_ensembl.add_argument('--rebuild_cache', action='store_true')
+    parser_ensembl.add_argument('--report_fp', type=pathlib.Path)
+    parser_ensembl.add_argument('--profile', action='store_true')
 
     parser_refseq = subparsers.add_parser('refseq')
     parser_refseq.add_argument('--annotations_fp', required=True, type=pathlib.Path)
     parser_refseq.add_argument('--appris_fp', required=True, type=pathlib.Path)
     parser_refseq.add_argument('--contig_mapping_fp', required=True, type=pathlib.Path)
     parser_refseq.add_argument('--output_dir', required=True, type=pathlib.Path)
+    parser_refseq.add_argument('--workers', default=1, type=int)
+    parser_refseq.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser_refseq.add_argument('--unknown_contigs', default='error', choices=contigs.UNKNOWN_CONTIG_MODES)
+    parser_refseq.add_argument('--streaming', action='store_true')
+    parser_refseq.add_argument('--batch', action='store_true')
+    parser_refseq.add_argument('--bgzip', action='store_true')
+    parser_refseq.add_argument('--store', action='store_true')
+    parser_refseq.add_argument('--cache_dir', default=cache.DEFAULT_CACHE_DIR, type=pathlib.Path)
+    parser_refseq.add_argument('--cache_max_bytes', default=cache.DEFAULT_CACHE_MAX_BYTES, type=int)
+    parser_refseq.add_argument('--no_cache', action='store_true')
+    parser_refseq.add_argument('--rebuild_cache', action='store_true')
+    parser_refseq.add_argument('--report_fp', type=pathlib.Path)
+    parser_refseq.add_argument('--profile', action='store_true')
+
+    parser_manifest = subparsers.add_parser('manifest')
+    parser_manifest.add_argument('--manifest_fp', required=True, type=pathlib.Path)
+    parser_manifest.add_argument('--processes', default=1, type=int)
+    parser_manifest.add_argument('--workers', default=1, type=int)
+    parser_manifest.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser_manifest.add_argument('--unknown_contigs', default='error', choices=contigs.UNKNOWN_CONTIG_MODES)
+    parser_manifest.add_argument('--streaming', action='store_true')
+    parser_manifest.add_argument('--batch', action='store_true')
+    parser_manifest.add_argument('--bgzip', action='store_true')
+    parser_manifest.add_argument('--store', action='store_true')
+    parser_manifest.add_argument('--cache_dir', default=cache.DEFAULT_CACHE_DIR, type=pathlib.Path)
+    parser_manifest.add_argument('--cache_max_bytes', default=cache.DEFAULT_CACHE_MAX_BYTES, type=int)
+    parser_manifest.add_argument('--no_cache', action='store_true')
+    parser_manifest.add_argument('--rebuild_cache', action='store_true')
+    parser_manifest.add_argument('--summary_fp', type=pathlib.Path)
 
     args = parser.parse_args()
 
-    if not args.annotations_fp.exists():
-        parser.error(f'Input file {args.annotations_fp} does not exist')
-    if not args.appris_fp.exists():
-        parser.error(f'Input file {args.appris_fp} does not exist')
-    if not args.subcommand != 'refseq' and not args.contig_mapping_fp.exists():
-        parser.error(f'Input file {args.contig_mapping_fp} does not exist')
+    if args.subcommand == 'manifest':
+        if not args.manifest_fp.exists():
+            parser.error(f'Input file {args.manifest_fp} does not exist')
+        if args.processes < 1:
+            parser.error(f'Got invalid number of processes: {args.processes}')
+
+        manifest = tables.read_tsv(args.manifest_fp)
+        if (columns_missing := set(MANIFEST_COLUMNS) - set(manifest.columns)):
+            parser.error(f'Manifest {args.manifest_fp} is missing columns: {", ".join(sorted(columns_missing))}')
+
+        args.entries = list()
+        outputs_seen = set()
+        names_seen = set()
+        for record in manifest:
+            entry_args = get_manifest_entry_args(args, record)
+            if entry_args.subcommand not in {'ensembl', 'refseq'}:
+                parser.error(f'Got invalid source in manifest: {entry_args.subcommand}')
+
+            input_fps = [entry_args.annotations_fp, entry_args.appris_fp]
+            if entry_args.subcommand == 'refseq':
+                input_fps.append(entry_args.contig_mapping_fp)
+            for fp in input_fps:
+                if fp is None or not fp.exists():
+                    parser.error(f'Input file {fp} does not exist')
+
+            # Output filenames are set by source only
+            output_key = (entry_args.subcommand, entry_args.output_dir.resolve())
+            if output_key in outputs_seen:
+                message = f'Got multiple {entry_args.subcommand} entries for output directory {entry_args.output_dir}'
+                parser.error(message)
+            if entry_args.name in names_seen:
+                parser.error(f'Got duplicate name in manifest: {entry_args.name}')
+            outputs_seen.add(output_key)
+            names_seen.add(entry_args.name)
+
+            args.entries.append(entry_args)
+    else:
+        if not args.annotations_fp.exists():
+            parser.error(f'Input file {args.annotations_fp} does not exist')
+        if not args.appris_fp.exists():
+            parser.error(f'Input file {args.appris_fp} does not exist')
+        if not args.subcommand != 'refseq' and not args.contig_mapping_fp.exists():
+            parser.error(f'Input file {args.contig_mapping_fp} does not exist')
+
+    if args.contig_order_fp and not args.contig_order_fp.exists():
+        parser.error(f'Input file {args.contig_order_fp} does not exist')
+    if args.workers < 1:
+        parser.error(f'Got invalid number of workers: {args.workers}')
+    if args.no_cache and args.rebuild_cache:
+        parser.error('Cannot use --no_cache with --rebuild_cache')
+    if args.batch and args.workers > 1:
+        parser.error('Cannot use --batch with more than one worker')
 
     return args
 
@@ -67,93 +251,325 @@ def main():
     # Get command line arguments
     args = get_arguments()
 
-    # Get requested annotations
+    # Compile all releases of a manifest, each in full as for a single subcommand run
+    if args.subcommand == 'manifest':
+        compile_manifest(args)
+        return
+
+    # Collect stage timings and counts for the run report; per line timings are only collected when
+    # a report is written and are skipped when profiling so as not to distort the profile
+    report = instrument.RunReport(detailed=bool(args.report_fp) and not args.profile)
+    report.info.update({
+        'subcommand': args.subcommand,
+        'annotations_fp': str(args.annotations_fp),
+        'workers': args.workers,
+        'streaming': args.streaming,
+        'batch': args.batch,
+        'bgzip': args.bgzip,
+        'store': args.store,
+    })
+
+    if args.profile:
+        instrument.run_profiled(functools.partial(compile_annotations, args, report), report)
+    else:
+        compile_annotations(args, report)
+
+    if args.report_fp:
+        report.write(args.report_fp)
+
+
+def compile_annotations(args, report):
+    # Set contig order for sorting output
+    if args.contig_order_fp:
+        contig_order = contigs.ContigOrder.from_file(args.contig_order_fp, args.unknown_contigs)
+    else:
+        contig_order = contigs.ContigOrder(unknown=args.unknown_contigs)
+
+    # Get compile function for requested annotations and any processing required once records of a
+    # contig, or all records, have been compiled
     if args.subcommand == 'ensembl':
-        annotations = compile_ensembl_data(args)
+        compile_data = compile_ensembl_data
+        finalise_records = None
     elif args.subcommand == 'refseq':
-        annotations = compile_refseq_data(args)
+        compile_data = compile_refseq_data
+        finalise_records = functools.partial(assign_refseq_hgnc_ids, hgnc_ids=dict())
     else:
         assert False
 
-    # Write data
-    write_gene_data(annotations['genes'], args.subcommand, args.output_dir)
-    write_transcript_data(annotations['transcripts'], args.subcommand, args.output_dir)
-    write_cds_data(annotations['cds'], args.subcommand, args.output_dir)
+    # Use previously compiled annotations where all inputs are unchanged
+    if not args.no_cache:
+        with report.stage('cache_load'):
+            table_cache = cache.TableCache(args.cache_dir, args.cache_max_bytes)
+            cache_key = get_annotations_cache_key(args)
+            columns = None if args.rebuild_cache else table_cache.load(cache_key)
 
+        report.info['cache_hit'] = columns is not None
+    else:
+        columns = None
+
+    # Write cached annotations or otherwise compile and write data, streaming writes hold only a single
+    # contig in memory
+    # NOTE(SW): streamed annotations are not cached as that would require holding all records
+    if columns is not None:
+        print(f'using cached annotations {cache_key}', file=sys.stderr)
+        annotations = annotations_from_columns(columns)
+        write_annotations(annotations, args.subcommand, args.output_dir, contig_order, args.bgzip, report)
+    elif args.streaming:
+        with AnnotationStreamWriter(
+            args.subcommand, args.output_dir, contig_order, finalise_records, args.bgzip, report,
+        ) as writer:
+            compile_data(args, writer, report)
+    else:
+        annotations = {'genes': list(), 'transcripts': list(), 'cds': list()}
+        compile_data(args, annotations, report)
+
+        if finalise_records:
+            with report.stage('finalise_records'):
+                finalise_records(annotations)
+
+        if not args.no_cache:
+            with report.stage('cache_store'):
+                table_cache.store(cache_key, annotations_to_columns(annotations))
+
+        write_annotations(annotations, args.subcommand, args.output_dir, contig_order, args.bgzip, report)
+
+    # Pack written outputs into stores for fast lookups by the panel scripts
+    if args.store:
+        with report.stage('write_store'):
+            write_stores(args.subcommand, args.output_dir, args.bgzip)
+
+
+def get_manifest_entry_args(args, record):
+    # Arguments of a single source compile, with per-entry inputs from the manifest and all other
+    # options shared across entries
+    entry_args = argparse.Namespace(**{k: v for k, v in vars(args).items() if k != 'entries'})
+    entry_args.subcommand = record.source
+    entry_args.annotations_fp = pathlib.Path(record.annotations_fp)
+    entry_args.appris_fp = pathlib.Path(record.appris_fp)
+    entry_args.output_dir = pathlib.Path(record.output_dir)
+    entry_args.report_fp = None
+    entry_args.profile = False
+
+    if record.contig_mapping_fp in tables.MISSING_VALUES:
+        entry_args.contig_mapping_fp = None
+    else:
+        entry_args.contig_mapping_fp = pathlib.Path(record.contig_mapping_fp)
 
-def compile_ensembl_data(args):
-    # Read in APPRIS annotations and relevant annotations
-    appris_data = read_appris_data(args.appris_fp)
-    annotations = retrieve_relevant_annotations(appris_data, args.annotations_fp)
+    if (name := getattr(record, 'name', None)) in tables.MISSING_VALUES:
+        name = f'{record.source}:{entry_args.output_dir}'
+    entry_args.name = name
 
-    # Configure record attributes for generic write functions; modified inplace
-    for record in (r for rs in annotations.values() for r in rs):
-        [record.hgnc_id] = record.attribute_dict.get('hgnc_id', ['NA'])
-        [record.gene_id] = record.attribute_dict['gene_id']
-        [record.gene_name] = record.attribute_dict['gene_name']
-        [record.transcript_id] = record.attribute_dict.get('transcript_id', ['NA'])
+    return entry_args
+
+
+def compile_manifest(args):
+    # Entries are compiled concurrently across processes. Inputs used by more than one entry, e.g. an
+    # APPRIS release shared by two GTFs, are parsed once here and given to each process on start
+    start = time.perf_counter()
+    shared_inputs = read_shared_inputs(args.entries)
+
+    results = dict()
+    if args.processes == 1:
+        init_manifest_worker(shared_inputs)
+        for entry_args in args.entries:
+            results[entry_args.name] = run_manifest_entry(entry_args)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.processes,
+            initializer=init_manifest_worker,
+            initargs=(shared_inputs,),
+        ) as executor:
+            futures = {executor.submit(run_manifest_entry, e): e.name for e in args.entries}
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+
+    # Summarise all entries in manifest order
+    entries = list()
+    for entry_args in args.entries:
+        entries.append({
+            'name': entry_args.name,
+            'source': entry_args.subcommand,
+            'annotations_fp': str(entry_args.annotations_fp),
+            'output_dir': str(entry_args.output_dir),
+            **results[entry_args.name],
+        })
+
+    summary = {
+        'manifest_fp': str(args.manifest_fp),
+        'processes': args.processes,
+        'shared_inputs': [f'{k}:{fp}' for k, fp in shared_inputs],
+        'wall_seconds': time.perf_counter() - start,
+        'entries': entries,
+    }
+    print_manifest_summary(summary)
+
+    if args.summary_fp:
+        with args.summary_fp.open('w') as fh:
+            json.dump(summary, fh, indent=2)
+            fh.write('\n')
+
+    if (failed := [e['name'] for e in entries if e['status'] != 'ok']):
+        message = f'ERROR: failed to compile {len(failed)} of {len(entries)} entries:'
+        print(message, *[f'  - {n}' for n in failed], sep='\n', file=sys.stderr)
+        sys.exit(1)
+
+
+def read_shared_inputs(entries):
+    # Returns parsed inputs for those used by more than one entry
+    input_counts = collections.Counter()
+    for entry_args in entries:
+        input_counts[get_input_key('appris', entry_args.appris_fp)] += 1
+        if entry_args.subcommand == 'refseq':
+            input_counts[get_input_key('contig_mapping', entry_args.contig_mapping_fp)] += 1
+    return {k: read_input(*k) for k, count in input_counts.items() if count > 1}
+
+
+def init_manifest_worker(shared_inputs):
+    global SHARED_INPUTS
+    SHARED_INPUTS = shared_inputs
+
+
+def run_manifest_entry(entry_args):
+    # Errors are recorded rather than raised so that remaining entries are still compiled
+    report = instrument.RunReport()
+    report.info.update({'subcommand': entry_args.subcommand, 'annotations_fp': str(entry_args.annotations_fp)})
+    entry_args.output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        compile_annotations(entry_args, report)
+    except Exception as e:
+        print(f'ERROR: failed to compile {entry_args.name}: {e!r}', file=sys.stderr)
+        return {'status': 'failed', 'error': repr(e), 'report': report.to_dict()}
+    return {'status': 'ok', 'error': None, 'report': report.to_dict()}
+
+
+def print_manifest_summary(summary):
+    print('name', 'status', 'wall_seconds', 'records', sep='\t', file=sys.stderr)
+    for entry in summary['entries']:
+        report = entry['report']
+        records = sum(v for k, v in report['counters'].items() if k.startswith('kept.'))
+        print(entry['name'], entry['status'], f'{report["wall_seconds"]:.1f}', records, sep='\t', file=sys.stderr)
+    print(f'compiled {len(summary["entries"])} entries in {summary["wall_seconds"]:.1f}s', file=sys.stderr)
+
+
+def get_input_key(kind, fp):
+    return kind, str(fp.resolve())
+
+
+def read_input(kind, fp):
+    if kind == 'appris':
+        return transcripts.read_appris(pathlib.Path(fp))
+    elif kind == 'contig_mapping':
+        return get_refseq_contig_data(pathlib.Path(fp))
+    else:
+        assert False
+
+
+def get_shared_input(kind, fp):
+    # Use the input parsed once for all manifest entries where available
+    if (data := SHARED_INPUTS.get(get_input_key(kind, fp))) is not None:
+        return data
+    return read_input(kind, fp)
+
+
+def get_annotations_cache_key(args):
+    input_fps = [args.annotations_fp, args.appris_fp]
+    if args.subcommand == 'refseq':
+        input_fps.append(args.contig_mapping_fp)
+    return cache.get_cache_key(
+        CACHE_VERSION,
+        args.subcommand,
+        *(cache.get_file_digest(fp) for fp in input_fps),
+    )
+
+
+def annotations_to_columns(annotations):
+    # NOTE(SW): interned strings are shared objects and so are stored only once by pickle
+    columns = dict()
+    for key, records in annotations.items():
+        columns[key] = {f: [getattr(r, f) for r in records] for f in AnnotationRecord.__slots__}
+    return columns
 
+
+def annotations_from_columns(columns):
+    annotations = dict()
+    for key, column_data in columns.items():
+        values = (column_data[f] for f in AnnotationRecord.__slots__)
+        annotations[key] = [AnnotationRecord(*d) for d in zip(*values)]
     return annotations
 
 
-def compile_refseq_data(args):
+def compile_ensembl_data(args, annotations, report):
+    # Read in APPRIS annotations and relevant annotations
+    with report.stage('read_appris'):
+        appris_data = get_shared_input('appris', args.appris_fp)
+    retrieve_relevant_annotations(
+        appris_data,
+        args.annotations_fp,
+        configure_ensembl_record,
+        annotations,
+        workers=args.workers,
+        batch=args.batch,
+        report=report,
+    )
+
+
+def compile_refseq_data(args, annotations, report):
     # Read in APPRIS annotations, contig data, relevant annotations
-    appris_data = read_appris_data(args.appris_fp)
-    contig_data = get_refseq_contig_data(args.contig_mapping_fp)
-    annotations = retrieve_relevant_annotations(appris_data, args.annotations_fp)
+    # NOTE(SW): records on non-main contigs are discarded as lines are read
+    with report.stage('read_appris'):
+        appris_data = get_shared_input('appris', args.appris_fp)
+    contig_data = get_shared_input('contig_mapping', args.contig_mapping_fp)
+    retrieve_relevant_annotations(
+        appris_data,
+        args.annotations_fp,
+        functools.partial(configure_refseq_record, contig_data=contig_data),
+        annotations,
+        contig_data=contig_data,
+        workers=args.workers,
+        batch=args.batch,
+        report=report,
+    )
 
+
+def assign_refseq_hgnc_ids(annotations, hgnc_ids):
     # Similar to Ensembl annotations I want HGNC in associated with transcripts and CDS + stop
-    # codons, however RefSeq only provides this data in gene features. Here I lazily iterate the
-    # entire record set another time to collect all RefSeq HGNC tags so I can assign below
-    hgnc_ids = dict()
-    for record in (r for rs in annotations.values() for r in rs):
-        if (hgnc_id := get_refseq_dbxref_data(record, 'HGNC')) == 'NA':
+    # codons, however RefSeq only provides this data in gene features. HGNC IDs were collected per
+    # record during configuration and are assigned here by GeneID
+    #
+    # NOTE(SW): hgnc_ids persists across calls so that HGNC IDs are also available when records are
+    # processed one contig at a time; gene records always precede their transcripts in the GTF
+    for record in annotations['genes']:
+        if record.hgnc_id == 'NA':
             continue
 
-        # NOTE(SW): not assigning here for consistency, retrived again below
-        gene_id = get_refseq_dbxref_data(record, 'GeneID')
-
-        assert gene_id != 'NA'
-        if gene_id in hgnc_ids:
-            assert hgnc_ids[gene_id] == hgnc_id
+        assert record.gene_id != 'NA'
+        if record.gene_id in hgnc_ids:
+            assert hgnc_ids[record.gene_id] == record.hgnc_id
 
-        hgnc_ids[gene_id] = hgnc_id
+        hgnc_ids[record.gene_id] = record.hgnc_id
 
-    # Configure record attributes for generic write functions; modified inplace
     for record in (r for rs in annotations.values() for r in rs):
-        if not (seqname := contig_data.get(record.seqname)):
-            continue
-        record.seqname = seqname
-
-        record.gene_id = get_refseq_dbxref_data(record, 'GeneID')
-        [record.gene_name] = record.attribute_dict['gene']
-        record.transcript_id = record.attribute_dict.get('transcript_id')[0] or 'NA'
-
-        if not record.hgnc_id:
+        if record.hgnc_id == 'NA':
             record.hgnc_id = hgnc_ids.get(record.gene_id, 'NA')
 
-    # Another pass to exclude records that have non-main contigs
-    contigs = set(contig_data.values())
-    for key in annotations.keys():
-        annotations[key] = [r for r in annotations[key] if r.seqname in contigs]
-
-    return annotations
-
 
-def read_appris_data(fp):
-    records = dict()
-    with fp.open('r') as fh:
-        header_tokens = fh.readline().rstrip().split('\t')
-        for line in fh:
-            record = {k: v for k, v in zip(header_tokens, line.rstrip().split('\t'))}
+def configure_ensembl_record(record):
+    # Configure record attributes for generic write functions; modified inplace
+    [record.hgnc_id] = record.attribute_dict.get('hgnc_id', ['NA'])
+    [record.gene_id] = record.attribute_dict['gene_id']
+    [record.gene_name] = record.attribute_dict['gene_name']
+    [record.transcript_id] = record.attribute_dict.get('transcript_id', ['NA'])
 
-            if not (annotation := record.get('APPRIS Annotation')):
-                continue
 
-            if annotation.startswith('ALTERNATIVE') or annotation.startswith('PRINCIPAL'):
-                assert record['Transcript ID'] not in records
-                records[record['Transcript ID']] = record
-    return records
+def configure_refseq_record(record, contig_data):
+    # Configure record attributes for generic write functions; modified inplace
+    # NOTE(SW): HGNC IDs are only present in gene records and are assigned to all others after
+    # compiling all records
+    record.seqname = contig_data[record.seqname]
+    record.gene_id = get_refseq_dbxref_data(record, 'GeneID')
+    record.hgnc_id = get_refseq_dbxref_data(record, 'HGNC')
+    [record.gene_name] = record.attribute_dict['gene']
+    record.transcript_id = record.attribute_dict.get('transcript_id')[0] or 'NA'
 
 
 def get_refseq_contig_data(fp):
@@ -166,20 +582,91 @@ def get_refseq_contig_data(fp):
     return data
 
 
-def retrieve_relevant_annotations(appris_data, fp):
-    genes = list()
-    transcripts = list()
-    cds = list()
-    for i, record in enumerate(gtf_record_iterator(fp), 1):
+def retrieve_relevant_annotations(
+    appris_data, fp, configure_record, annotations, contig_data=None, workers=1, batch=False, report=None,
+):
+    # Selected records are configured with configure_record as they are read then added to
+    # annotations inplace. Where contig data is provided, lines on any other contig are discarded
+    if report is None:
+        report = instrument.RunReport()
+
+    # Skipped lines are counted by reason and feature type
+    skip_counts = collections.Counter()
+    kept_counts = collections.Counter()
+
+    selection_args = (appris_data, configure_record, contig_data)
+    other_seconds_start = get_other_stage_seconds(report)
+    with report.stage('read_gtf'):
+        if workers > 1:
+            # Chunk results are returned in input order and grouped by contig within each chunk, merging by
+            # extension retains serial ordering and gives the streaming writer one contig at a time
+            record_count = 0
+            for chunk_groups, chunk_skip_counts, chunk_kept_counts in process_gtf_parallel(
+                fp, selection_args, workers,
+            ):
+                for _, group in chunk_groups:
+                    for key, records in group.items():
+                        annotations[key].extend(records)
+                        record_count += len(records)
+                skip_counts.update(chunk_skip_counts)
+                kept_counts.update(chunk_kept_counts)
+                print(record_count, file=sys.stderr)
+        elif batch:
+            # Lines are filtered a batch at a time and only the remaining lines are parsed into records
+            records = gtf_batch_record_iterator(fp, appris_data, contig_data, skip_counts, report)
+            select_annotations(log_progress(records), appris_data, configure_record, annotations, kept_counts)
+        else:
+            # Discard irrelevant lines prior to record construction and attribute parsing
+            line_filter = report.timed_fn('read_gtf.line_filter', get_line_filter(appris_data, contig_data))
+            records = gtf_record_iterator(fp, line_filter, skip_counts, report)
+            select_annotations(log_progress(records), appris_data, configure_record, annotations, kept_counts)
+
+    # Time not spent reading, filtering, or parsing lines is record selection, i.e. the APPRIS lookup
+    # and record configuration. Streamed sorting and writing also occur while reading and are excluded
+    if report.detailed and workers == 1:
+        substages = (
+            'read_gtf.decompress',
+            'read_gtf.line_filter',
+            'read_gtf.batch_filter',
+            'read_gtf.prepare_record',
+        )
+        substage_seconds = sum(report.stages[n]['wall_seconds'] for n in substages if n in report.stages)
+        substage_seconds += get_other_stage_seconds(report) - other_seconds_start
+        report.add_time('read_gtf.select', report.stages['read_gtf']['wall_seconds'] - substage_seconds)
+
+    report.count('read_gtf.bytes', fp.stat().st_size)
+    report.count('read_gtf.records', sum(kept_counts.values()))
+    for key, count in kept_counts.items():
+        report.count(f'kept.{key}', count)
+    skip_reason_counts = collections.Counter()
+    for (reason, feature), count in skip_counts.items():
+        report.count(f'dropped.{reason}.{feature}', count)
+        skip_reason_counts[reason] += count
+
+    print(
+        f'skipped {skip_reason_counts["contig"]} lines by contig',
+        f'skipped {skip_reason_counts["feature"]} lines by feature type',
+        f'skipped {skip_reason_counts["transcript_id"]} lines by transcript ID',
+        sep='\n',
+        file=sys.stderr,
+    )
 
-        if i % 10000 == 0:
-            print(i, file=sys.stderr)
+
+def get_other_stage_seconds(report):
+    return sum(d['wall_seconds'] for n, d in report.stages.items() if not n.startswith('read_gtf'))
+
+
+def select_annotations(records, appris_data, configure_record, annotations, kept_counts=None):
+    # Records are added to annotations inplace, with selected records counted by feature type where
+    # kept_counts is provided
+    for record in records:
 
         # Get relevant features
         # NOTE(SW): start codons always fall within CDS; checked manually
         if record.feature == 'gene':
-            genes.append(record)
-        elif record.feature in {'transcript', 'CDS', 'stop_codon'}:
+            configure_record(record)
+            annotations['genes'].append(AnnotationRecord.from_gtf_record(record))
+        elif record.feature in TRANSCRIPT_FEATURES:
 
             # Select only APPRIS transcripts
             if not (transcript_full_id := record.attribute_dict.get('transcript_id')):
@@ -187,48 +674,349 @@ def retrieve_relevant_annotations(appris_data, fp):
 
             assert len(transcript_full_id) == 1
             [transcript_full_id] = transcript_full_id
-            transcript_id = re.sub(r'\.\d+$', '', transcript_full_id)
 
-            # NOTE(SW): APPRIS has versioned transcripts for RefSeq but not Ensembl, so I check both
-            if transcript_id not in appris_data and transcript_full_id not in appris_data:
+            if not appris_data.is_appris(transcript_full_id):
                 continue
 
+            configure_record(record)
             if record.feature == 'transcript':
-                transcripts.append(record)
+                annotations['transcripts'].append(AnnotationRecord.from_gtf_record(record))
             elif record.feature in {'CDS', 'stop_codon'}:
-                cds.append(record)
+                annotations['cds'].append(AnnotationRecord.from_gtf_record(record))
             else:
                 assert False
+        else:
+            continue
+
+        if kept_counts is not None:
+            kept_counts[record.feature] += 1
+
+
+def log_progress(records):
+    start = time.perf_counter()
+    for i, record in enumerate(records, 1):
+        if i % 10000 == 0:
+            print(f'{i} records ({i / (time.perf_counter() - start):.0f}/s)', file=sys.stderr)
+        yield record
+
+
+def get_line_filter(appris_data, contig_data=None):
+    # Returns the reason a raw GTF line can be skipped along with its feature type, otherwise None. Only
+    # definitive non-matches are skipped here, anything ambiguous is left for full record processing
+    def line_filter(line):
+        fields = line.split('\t', 8)
+        if len(fields) != 9:
+            return None
+
+        feature = fields[2]
+        if contig_data is not None and fields[0] not in contig_data:
+            return 'contig', feature
+
+        if feature == 'gene':
+            return None
+        elif feature not in TRANSCRIPT_FEATURES:
+            return 'feature', feature
+
+        # NOTE(SW): escaped data falls through to full attribute parsing
+        attribute = fields[8]
+        if '\\' in attribute or not (match := TRANSCRIPT_ID_RE.search(attribute)):
+            return None
+
+        if not appris_data.is_appris(match.group(1)):
+            return 'transcript_id', feature
 
-    return {'genes': genes, 'transcripts': transcripts, 'cds': cds}
+        return None
 
+    return line_filter
 
-def gtf_record_iterator(fp):
+
+def gtf_record_iterator(fp, line_filter=None, skip_counts=None, report=None):
+    with gzip.open(fp, 'rt') as fh:
+        lines = skip_header_iterator(fh)
+        prepare = prepare_record
+        if report and report.detailed:
+            lines = report.timed_iter('read_gtf.decompress', lines, count_bytes=True)
+            prepare = report.timed_fn('read_gtf.prepare_record', prepare_record)
+        yield from gtf_line_record_iterator(lines, line_filter, skip_counts, prepare)
+
+
+def skip_header_iterator(fh):
+    skip_header(fh)
+    yield from fh
+
+
+def skip_header(fh):
+    # Skip header rows, leaving the file handle at the first record line
+    start_pos = int()
+    while (line := fh.readline()):
+        if not line.startswith('#'):
+            break
+        start_pos = fh.tell()
+    fh.seek(start_pos)
+
+
+def gtf_batch_record_iterator(fp, appris_data, contig_data=None, skip_counts=None, report=None):
+    if report is None:
+        report = instrument.RunReport()
+
+    # NOTE(SW): records are prepared one at a time as they are consumed rather than for a whole batch,
+    # holding all records of a batch at once triggers repeated garbage collection passes
+    prepare = report.timed_fn('read_gtf.prepare_record', prepare_record_fields)
+    for lines in gtf_line_batch_iterator(fp, BATCH_BYTES, report):
+        with report.stage('read_gtf.batch_filter'):
+            rows = filter_gtf_batch(lines, appris_data, contig_data, skip_counts)
+        report.count('read_gtf.batch_filter.records', len(lines))
+        yield from map(prepare, rows)
+
+
+def gtf_line_batch_iterator(fp, batch_bytes, report):
+    # Yields lists of lines without line endings, each read from a single large block of decompressed
+    # text rather than line by line
     with gzip.open(fp, 'rt') as fh:
-        # Skip header rows
-        start_pos = int()
-        while (line := fh.readline()):
-            if not line.startswith('#'):
-                break
-            start_pos = fh.tell()
-        fh.seek(start_pos)
+        skip_header(fh)
+        line_partial = str()
+        while True:
+            with report.stage('read_gtf.decompress'):
+                if not (text := fh.read(batch_bytes)):
+                    break
+                lines = (line_partial + text).split('\n')
+                line_partial = lines.pop()
+            report.count('read_gtf.decompress.bytes', len(text))
+            yield lines
+
+    if line_partial:
+        yield [line_partial]
+
+
+def filter_gtf_batch(lines, appris_data, contig_data=None, skip_counts=None):
+    # Returns split fields of batch lines that pass the same checks as the line filter. The contig and
+    # feature columns are extracted for all lines and each check is made once per distinct value then
+    # applied to the whole column. Only lines that remain are fully split for the transcript ID check
+    #
+    # NOTE(SW): split fields are only held for the lines that remain, holding split fields of every line
+    # in the batch at once triggers repeated garbage collection passes
+    if skip_counts is None:
+        skip_counts = collections.Counter()
+
+    # The RefSeq GTF ends with a '###' line
+    if '###' in lines:
+        lines = [line for line in lines if line != '###']
+
+    # NOTE(SW): skipped lines are counted by feature type, so the feature column is extracted for all lines
+    features = [line.split('\t', 3)[2] for line in lines]
+    if contig_data is not None:
+        seqnames = [line.split('\t', 1)[0] for line in lines]
+        contig_mask = {c: c in contig_data for c in set(seqnames)}
+        if not all(contig_mask.values()):
+            skip_counts.update(('contig', f) for f, c in zip(features, seqnames) if not contig_mask[c])
+            mask = list(map(contig_mask.__getitem__, seqnames))
+            lines = list(itertools.compress(lines, mask))
+            features = list(itertools.compress(features, mask))
+
+    feature_mask = {f: f == 'gene' or f in TRANSCRIPT_FEATURES for f in set(features)}
+    rows = [line.split('\t', 8) for line in itertools.compress(lines, map(feature_mask.__getitem__, features))]
+    feature_counts = collections.Counter(features)
+    for feature, selectable in feature_mask.items():
+        if not selectable:
+            skip_counts['feature', feature] += feature_counts[feature]
+
+    for row in rows:
+        assert len(row) == 9
+
+    # NOTE(SW): transcript IDs are only checked for transcript features, RefSeq gene records carry an
+    # empty transcript ID
+    row_mask = map(functools.partial(is_selectable_row, appris_data=appris_data), rows)
+    rows_selected = list()
+    for row, selectable in zip(rows, row_mask):
+        if selectable:
+            rows_selected.append(row)
+        else:
+            skip_counts['transcript_id', row[2]] += 1
 
-        for line in fh:
+    return rows_selected
 
-            # NOTE(SW): the final line in the RefSeq GTF is '###', must handle here...
-            if line == '###\n':
-                continue
 
-            yield prepare_record(line)
+def is_selectable_row(row, appris_data):
+    # Transcript ID check of the line filter, with escaped data falling through to full attribute parsing
+    feature = row[2]
+    attribute = row[8]
+    if feature == 'gene' or '\\' in attribute or not (match := TRANSCRIPT_ID_RE.search(attribute)):
+        return True
+    return appris_data.is_appris(match.group(1))
+
+
+def gtf_line_record_iterator(lines, line_filter=None, skip_counts=None, prepare=None):
+    if prepare is None:
+        prepare = prepare_record
+
+    for line in lines:
+
+        # NOTE(SW): the final line in the RefSeq GTF is '###', must handle here...
+        if line == '###\n':
+            continue
+
+        if line_filter and (skip_key := line_filter(line)):
+            if skip_counts is not None:
+                skip_counts[skip_key] += 1
+            continue
+
+        yield prepare(line)
+
+
+def process_gtf_parallel(fp, selection_args, workers):
+    # Split input into line-aligned chunks in this process, or hand compressed BGZF blocks directly to
+    # workers so that decompression is also distributed
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(selection_args,),
+    ) as executor:
+        if is_bgzf(fp):
+            yield from process_bgzf_chunks(executor, fp, selection_args, workers)
+        else:
+            chunks = gtf_line_chunk_iterator(fp, CHUNK_LINES)
+            yield from ordered_map(executor, process_gtf_lines_worker, chunks, workers * 2)
+
+
+def process_bgzf_chunks(executor, fp, selection_args, workers):
+    # NOTE(SW): chunk boundaries split lines; the partial lines at each boundary are returned by workers
+    # as bytes and rejoined here, then processed ahead of the following chunk to retain input order
+    chunks = enumerate(bgzf_chunk_iterator(fp, CHUNK_BGZF_BYTES))
+    line_partial = bytes()
+    for head, chunk_result, tail in ordered_map(executor, process_bgzf_chunk_worker, chunks, workers * 2):
+        if chunk_result is None:
+            line_partial += head
+            continue
+
+        if (line := line_partial + head):
+            yield process_gtf_lines([line.decode()], *selection_args)
+        yield chunk_result
+        line_partial = tail
+
+    if line_partial:
+        yield process_gtf_lines([line_partial.decode()], *selection_args)
+
+
+def ordered_map(executor, fn, iterable, max_pending):
+    # Similar to Executor.map but with bounded submission so that the input is not read entirely
+    # into memory ahead of the workers
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def init_worker(selection_args):
+    global WORKER_ARGS
+    WORKER_ARGS = selection_args
+
+
+def process_gtf_lines_worker(lines):
+    return process_gtf_lines(lines, *WORKER_ARGS)
+
+
+def process_bgzf_chunk_worker(chunk):
+    # Returns partial leading line, result, and partial trailing line for the given chunk, with partial
+    # lines as bytes
+    #
+    # NOTE(SW): BGZF blocks are cut at fixed byte counts and so a multibyte character may span two
+    # chunks; lines are split before decoding so that only whole lines are decoded
+    index, data = chunk
+    data = gzip.decompress(data)
+
+    if index == 0:
+        head = bytes()
+    elif (head_end := data.find(b'\n') + 1) == 0:
+        return data, None, bytes()
+    else:
+        head = data[:head_end]
+        data = data[head_end:]
+
+    tail_start = data.rfind(b'\n') + 1
+    text = data[:tail_start].decode()
+    if index == 0:
+        text = skip_header_lines(text)
+    lines = text.split('\n')
+    lines = [f'{line}\n' for line in lines[:-1]]
+
+    return head, process_gtf_lines(lines, *WORKER_ARGS), data[tail_start:]
+
+
+def process_gtf_lines(lines, appris_data, configure_record, contig_data):
+    annotations = ContigGroupedAnnotations()
+    skip_counts = collections.Counter()
+    kept_counts = collections.Counter()
+
+    line_filter = get_line_filter(appris_data, contig_data)
+    records = gtf_line_record_iterator(lines, line_filter, skip_counts)
+    select_annotations(records, appris_data, configure_record, annotations, kept_counts)
+
+    return annotations.groups, skip_counts, kept_counts
+
+
+def skip_header_lines(text):
+    start_pos = int()
+    while text.startswith('#', start_pos):
+        if (start_pos := text.find('\n', start_pos) + 1) == 0:
+            return str()
+    return text[start_pos:]
+
+
+def is_bgzf(fp):
+    # BGZF blocks are gzip members with a 'BC' extra subfield, see SAM specification section 4.1
+    with fp.open('rb') as fh:
+        header = fh.read(16)
+    return len(header) == 16 and header[:4] == b'\x1f\x8b\x08\x04' and header[12:14] == b'BC'
+
+
+def bgzf_chunk_iterator(fp, chunk_bytes):
+    # Yield sets of whole BGZF blocks as raw compressed data
+    chunk = list()
+    chunk_size = 0
+    with fp.open('rb') as fh:
+        while (header := fh.read(18)):
+            assert len(header) == 18 and header[12:14] == b'BC'
+            [block_size] = struct.unpack('<H', header[16:18])
+            block = header + fh.read(block_size + 1 - 18)
+
+            chunk.append(block)
+            chunk_size += len(block)
+            if chunk_size >= chunk_bytes:
+                yield b''.join(chunk)
+                chunk = list()
+                chunk_size = 0
+
+    if chunk:
+        yield b''.join(chunk)
+
+
+def gtf_line_chunk_iterator(fp, chunk_lines):
+    with gzip.open(fp, 'rt') as fh:
+        chunk = list()
+        for line in skip_header_iterator(fh):
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = list()
+
+    if chunk:
+        yield chunk
 
 
 def prepare_record(line):
+    return prepare_record_fields(line.rstrip('\n').split('\t'))
+
+
+def prepare_record_fields(fields):
     # Create record and mapping for attribute data
-    # NOTE(SW): some wasted cycles for records that we discard
-    record = GtfRecord(line.rstrip('\n').split('\t'))
+    record = GtfRecord(fields)
 
     attr_dict = dict()
-    for attr_name, attr_data in attr_string_parser(record.attribute):
+    for attr_name, attr_data in attr_string_parser_fast(record.attribute):
 
         # NOTE(SW): use list types for all attribute values to implicitly handle duplicate names
         if attr_name not in attr_dict:
@@ -240,6 +1028,51 @@ def prepare_record(line):
     return record
 
 
+def attr_string_parser_fast(s):
+    # NOTE(SW): bulk tokenisation for well-formed attribute strings (i.e. 'key "value"; key value;' with
+    # one space after each semicolon), which is nearly all lines in GENCODE and RefSeq GTFs. Strings
+    # without escaped characters or quoted semicolons are split directly, which is fastest; RefSeq product
+    # and note values often hold quoted semicolons and these are tokenised with a single regex instead.
+    # Malformed strings are handed to the full token parser so that results are always identical
+    if '\\' in s:
+        return attr_string_parser_re(s)
+
+    # Quoted data are the odd-indexed tokens when splitting on double quotes. Without quoted semicolons
+    # the quotes themselves carry no meaning for tokenisation and can be dropped upfront
+    quote_tokens = s.split('"')
+    if ';' in ''.join(quote_tokens[1::2]):
+        return attr_string_parser_re(s)
+    s_unquoted = ''.join(quote_tokens)
+
+    # Data following the final semicolon is discarded by the full token parser too
+    attrs_str, sep, _ = s_unquoted.rpartition(';')
+    if not sep:
+        return list()
+
+    # Exactly one space is expected after each semicolon
+    tokens = attrs_str.split('; ')
+    if len(tokens) != attrs_str.count(';') + 1:
+        return list(attr_string_parser(s))
+
+    return [(attr_name, attr_data) for attr_name, _, attr_data in (t.partition(' ') for t in tokens)]
+
+
+def attr_string_parser_re(s):
+    # NOTE(SW): the full token parser drops every backslash and so differs from a regex for escaped
+    # backslashes; these and malformed strings are handed to it
+    if '\\\\' in s:
+        return list(attr_string_parser(s))
+
+    attrs = list()
+    for attr_name, attr_data_quoted, attr_data, malformed in ATTR_RE.findall(s):
+        if malformed:
+            return list(attr_string_parser(s))
+        if attr_data_quoted:
+            attr_data = attr_data_quoted.replace('\\', '') if '\\' in attr_data_quoted else attr_data_quoted
+        attrs.append((attr_name, attr_data))
+    return attrs
+
+
 def attr_string_parser(s):
     # NOTE(SW): custom token parser required to cover all following cases:
     #   * quoted data
@@ -297,61 +1130,291 @@ def get_refseq_dbxref_data(record, name):
     return data[0].replace(f'{name}:', '', 1) if data else 'NA'
 
 
-def write_gene_data(data, source, output_dir):
-    header = ['hgnc_id', 'gene_id', 'symbol', 'contig', 'start', 'end', 'strand']
-    with (output_dir / f'{source}.genes.tsv').open('w') as fh:
-        print(*header, sep='\t', file=fh)
-        for record in sorted(data, key=gtf_record_sort):
-            print(
-                record.hgnc_id,
-                record.gene_id,
-                record.gene_name,
-                record.seqname,
-                record.start,
-                record.end,
-                record.strand,
-                sep='\t',
-                file=fh,
-            )
-
-def write_transcript_data(data, source, output_dir):
-    with (output_dir / f'{source}.transcripts.bed').open('w') as fh:
-        for record in sorted(data, key=gtf_record_sort):
-
-            hgnc_id = '' if record.hgnc_id == 'NA' else record.hgnc_id
-            info_fields = [record.gene_name, hgnc_id, record.gene_id, record.transcript_id]
-
-            print(
-                record.seqname,
-                int(record.start)-1,
-                record.end,
-                ';'.join(info_fields),
-                record.strand,
-                sep='\t',
-                file=fh,
-            )
-
-
-def write_cds_data(data, source, output_dir):
-    with (output_dir / f'{source}.cds.bed').open('w') as fh:
-        for record in sorted(data, key=gtf_record_sort):
-
-            hgnc_id = '' if record.hgnc_id == 'NA' else record.hgnc_id
-            info_fields = [record.gene_name, hgnc_id, record.gene_id, record.transcript_id, record.feature]
-
-            print(
-                record.seqname,
-                int(record.start)-1,
-                record.end,
-                ';'.join(info_fields),
-                record.strand,
-                sep='\t',
-                file=fh,
-            )
-
-
-def gtf_record_sort(r):
-    return (CHROM_ORDER.index(r.seqname), int(r.start))
+class AnnotationStreamWriter:
+
+    # NOTE(SW): GTF records are grouped by contig and so only records of the current contig need to be
+    # buffered, sorted, and written. Where contigs of the input are not grouped or are out of order,
+    # the writer falls back to an external merge sort: records are written as sorted runs to disk and
+    # merged with previously written output once all input has been read
+    def __init__(
+        self,
+        source,
+        output_dir,
+        contig_order,
+        finalise_records=None,
+        bgzip=False,
+        report=None,
+        run_records=STREAM_RUN_RECORDS,
+    ):
+        self.source = source
+        self.output_dir = output_dir
+        self.contig_order = contig_order
+        self.finalise_records = finalise_records
+        self.bgzip = bgzip
+        self.report = report if report is not None else instrument.RunReport()
+        self.run_records = run_records
+
+        self.format_record = {
+            'genes': format_gene_record,
+            'transcripts': format_transcript_record,
+            'cds': format_cds_record,
+        }
+
+        self.sinks = {key: AnnotationSink(self, key) for key in OUTPUTS}
+        self.buffer = {key: list() for key in OUTPUTS}
+        self.buffer_size = 0
+
+        self.contig = None
+        self.contig_rank_last = None
+        self.contigs_written = set()
+
+        self.fhs = dict()
+        self.run_dir = None
+        self.run_count = 0
+
+    def __enter__(self):
+        for key, (_, header, _, _) in OUTPUTS.items():
+            self.fhs[key] = open_output(key, self.source, self.output_dir, self.bgzip)
+            if header:
+                print(*header, sep='\t', file=self.fhs[key])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                if self.run_dir:
+                    self.write_run()
+                    with self.report.stage('merge_runs'):
+                        self.merge_runs()
+                else:
+                    self.write_contig()
+        finally:
+            for fh in self.fhs.values():
+                fh.close()
+            if self.run_dir:
+                self.run_dir.cleanup()
+
+    def __getitem__(self, key):
+        return self.sinks[key]
+
+    def add(self, key, record):
+        if self.run_dir is None and record.seqname != self.contig:
+            self.write_contig()
+            self.contig = record.seqname
+
+        self.buffer[key].append(record)
+        self.buffer_size += 1
+
+        if self.run_dir and self.buffer_size >= self.run_records:
+            self.write_run()
+
+    def take_buffer(self):
+        buffer = self.buffer
+        self.buffer = {key: list() for key in OUTPUTS}
+        self.buffer_size = 0
+
+        if self.finalise_records:
+            with self.report.stage('finalise_records'):
+                self.finalise_records(buffer)
+
+        return buffer
+
+    def write_contig(self):
+        if not self.buffer_size:
+            return
+
+        # Switch to writing sorted runs if this contig must be placed before already written output
+        contig_rank = self.contig_order.rank(self.contig)
+        contig_rank_prior = self.contig_rank_last is not None and contig_rank <= self.contig_rank_last
+        if self.contig in self.contigs_written or contig_rank_prior:
+            print(f'contig {self.contig} is out of order, writing sorted runs', file=sys.stderr)
+            self.run_dir = tempfile.TemporaryDirectory(dir=self.output_dir)
+            self.write_run()
+            return
+
+        for key, records in self.take_buffer().items():
+            self.write_sorted(self.fhs[key], records, self.format_record[key])
+
+        self.contigs_written.add(self.contig)
+        self.contig_rank_last = contig_rank
+
+    def write_run(self):
+        for key, records in self.take_buffer().items():
+            with self.get_run_fp(key, self.run_count).open('w') as fh:
+                self.write_sorted(fh, records, self.format_record[key])
+        self.run_count += 1
+
+    def write_sorted(self, fh, records, format_record):
+        with self.report.stage('sort'):
+            records = sort_records(records, self.contig_order)
+        with self.report.stage('write'):
+            write_records(fh, records, format_record)
+        self.report.count('write.records', len(records))
+
+    def merge_runs(self):
+        # NOTE(SW): heapq.merge yields equal keys in order of the input iterables, and runs are in input
+        # order, so the result is identical to a stable sort of all records
+        for key, (_, header, columns, _) in OUTPUTS.items():
+            self.fhs[key].close()
+
+            output_fp = pathlib.Path(self.fhs[key].name)
+            run_fps = [self.get_run_fp(key, 'written')] + [self.get_run_fp(key, i) for i in range(self.run_count)]
+            output_fp.rename(run_fps[0])
+
+            run_fhs = [fp.open('r') for fp in run_fps[1:]]
+            run_fhs.insert(0, gzip.open(run_fps[0], 'rt') if self.bgzip else run_fps[0].open('r'))
+            if header:
+                run_fhs[0].readline()
+
+            def line_key(line):
+                tokens = line.split('\t', max(columns) + 1)
+                return self.contig_order.sort_key(tokens[columns[0]], int(tokens[columns[1]]), int(tokens[columns[2]]))
+
+            self.fhs[key] = open_output(key, self.source, self.output_dir, self.bgzip)
+            with self.fhs[key] as fh:
+                if header:
+                    print(*header, sep='\t', file=fh)
+                fh.writelines(heapq.merge(*run_fhs, key=line_key))
+
+            for run_fh in run_fhs:
+                run_fh.close()
+
+    def get_run_fp(self, key, run_id):
+        return pathlib.Path(self.run_dir.name) / f'{key}.{run_id}.tsv'
+
+
+class ContigGroupedAnnotations:
+
+    # Collects annotations as runs of consecutive records on the same contig, each with records of
+    # every annotation type. Chunk results extended in run order keep the contig order of the input
+    def __init__(self):
+        self.sinks = {key: AnnotationSink(self, key) for key in OUTPUTS}
+        self.groups = list()
+
+    def __getitem__(self, key):
+        return self.sinks[key]
+
+    def add(self, key, record):
+        if not self.groups or self.groups[-1][0] != record.seqname:
+            self.groups.append((record.seqname, {k: list() for k in OUTPUTS}))
+        self.groups[-1][1][key].append(record)
+
+
+class AnnotationSink:
+
+    def __init__(self, writer, key):
+        self.writer = writer
+        self.key = key
+
+    def append(self, record):
+        self.writer.add(self.key, record)
+
+    def extend(self, records):
+        for record in records:
+            self.writer.add(self.key, record)
+
+
+def write_annotations(annotations, source, output_dir, contig_order, bgzip=False, report=None):
+    if report is None:
+        report = instrument.RunReport()
+
+    with report.stage('sort'):
+        genes = sort_records(annotations['genes'], contig_order)
+        transcripts = sort_records(annotations['transcripts'], contig_order)
+        cds = sort_records(annotations['cds'], contig_order)
+
+    with report.stage('write'):
+        write_gene_data(genes, source, output_dir, bgzip)
+        write_transcript_data(transcripts, source, output_dir, bgzip)
+        write_cds_data(cds, source, output_dir, bgzip)
+
+    report.count('write.records', len(genes) + len(transcripts) + len(cds))
+
+
+def write_gene_data(data, source, output_dir, bgzip=False):
+    with open_output('genes', source, output_dir, bgzip) as fh:
+        print(*GENE_HEADER, sep='\t', file=fh)
+        write_records(fh, data, format_gene_record)
+
+
+def write_transcript_data(data, source, output_dir, bgzip=False):
+    with open_output('transcripts', source, output_dir, bgzip) as fh:
+        write_records(fh, data, format_transcript_record)
+
+
+def write_cds_data(data, source, output_dir, bgzip=False):
+    with open_output('cds', source, output_dir, bgzip) as fh:
+        write_records(fh, data, format_cds_record)
+
+
+def write_stores(source, output_dir, bgzip=False):
+    # NOTE(SW): stores are packed from the written outputs so that they hold exactly the same records
+    # regardless of whether annotations were compiled in memory, streamed, or loaded from cache
+    for key in OUTPUTS:
+        table = tables.read_resource(get_output_fp(key, source, output_dir, bgzip))
+        tables.write_resource_store(output_dir / f'{source}.{key}.store', table)
+
+
+def get_output_fp(key, source, output_dir, bgzip):
+    suffix = OUTPUTS[key][0]
+    return output_dir / (f'{source}.{suffix}.gz' if bgzip else f'{source}.{suffix}')
+
+
+def open_output(key, source, output_dir, bgzip):
+    # NOTE(SW): bgzipped output is written with a tabix index built in the same pass
+    _, header, columns, zero_based = OUTPUTS[key]
+    output_fp = get_output_fp(key, source, output_dir, bgzip)
+    if bgzip:
+        skip_lines = 1 if header else 0
+        return bgzf.TabixWriter(output_fp, columns, zero_based, skip_lines)
+    else:
+        return output_fp.open('w')
+
+
+def sort_records(data, contig_order):
+    return sorted(data, key=lambda r: contig_order.sort_key(r.seqname, r.start, r.end))
+
+
+def write_records(fh, records, format_record):
+    bgzf.write_rows(fh, map(format_record, records))
+
+
+def format_gene_record(record):
+    return (
+        record.hgnc_id,
+        record.gene_id,
+        record.gene_name,
+        record.seqname,
+        record.start,
+        record.end,
+        record.strand,
+    )
+
+
+def format_transcript_record(record):
+    hgnc_id = '' if record.hgnc_id == 'NA' else record.hgnc_id
+    info_fields = [record.gene_name, hgnc_id, record.gene_id, record.transcript_id]
+
+    return (
+        record.seqname,
+        record.start-1,
+        record.end,
+        ';'.join(info_fields),
+        record.strand,
+    )
+
+
+def format_cds_record(record):
+    hgnc_id = '' if record.hgnc_id == 'NA' else record.hgnc_id
+    info_fields = [record.gene_name, hgnc_id, record.gene_id, record.transcript_id, record.feature]
+
+    return (
+        record.seqname,
+        record.start-1,
+        record.end,
+        ';'.join(info_fields),
+        record.strand,
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import pathlib
+import sys
+
+from util import contigs
+from util import panel_data
+from util import tables
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--somatic_panel_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--germline_panel_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--hartwig_panel_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--ensembl_gene_data_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--refseq_gene_data_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--ensembl_cds_data_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--refseq_cds_data_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--ensembl_transcript_data_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--somatic_output_dir', required=True, type=pathlib.Path)
+    parser.add_argument('--germline_output_dir', required=True, type=pathlib.Path)
+    parser.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser.add_argument('--unknown_contigs', default='error', choices=contigs.UNKNOWN_CONTIG_MODES)
+    parser.add_argument('--bgzip', action='store_true')
+    parser.add_argument('--threads', default=1, type=int)
+
+    args = parser.parse_args()
+
+    input_fps = [
+        args.somatic_panel_fp,
+        args.germline_panel_fp,
+        args.hartwig_panel_fp,
+        args.ensembl_gene_data_fp,
+        args.refseq_gene_data_fp,
+        args.ensembl_cds_data_fp,
+        args.refseq_cds_data_fp,
+        args.ensembl_transcript_data_fp,
+    ]
+    if args.contig_order_fp:
+        input_fps.append(args.contig_order_fp)
+
+    for fp in input_fps:
+        if not fp.exists():
+            parser.error(f'Input file {fp} does not exist')
+    if args.threads < 1:
+        parser.error(f'Got invalid number of threads: {args.threads}')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Set contig order for sorting output
+    if args.contig_order_fp:
+        contig_order = contigs.ContigOrder.from_file(args.contig_order_fp, args.unknown_contigs)
+    else:
+        contig_order = contigs.ContigOrder(unknown=args.unknown_contigs)
+
+    # Read in panel and resource data once for all outputs
+    somatic_panel = tables.read_panel(args.somatic_panel_fp)
+    germline_panel = tables.read_panel(args.germline_panel_fp)
+    hartwig_panel = tables.read_panel(args.hartwig_panel_fp)
+    ensembl_genes = tables.read_gene_data(args.ensembl_gene_data_fp).unique_index('ensembl_gene_id')
+    refseq_genes = tables.read_gene_data(args.refseq_gene_data_fp).unique_index('ncbi_gene_id')
+    ensembl_cds = tables.read_region_bed(args.ensembl_cds_data_fp).index('hgnc_id')
+    refseq_cds = tables.read_region_bed(args.refseq_cds_data_fp).index('hgnc_id')
+    ensembl_transcripts = tables.read_region_bed(args.ensembl_transcript_data_fp)
+
+    # Check all germline genes have transcripts before writing any output
+    transcript_regions, genes_missed = panel_data.get_transcript_regions(germline_panel, ensembl_transcripts)
+    if genes_missed:
+        plurality = 'genes' if len(genes_missed) > 1 else 'gene'
+        genes_missed_strs = [f'  - {n}' for n in genes_missed]
+        message = f'ERROR: no transcripts found for the following {plurality}:'
+        print(message, *genes_missed_strs, sep='\n', file=sys.stderr)
+        sys.exit(1)
+
+    # Compile all outputs
+    bed_suffix = 'bed.gz' if args.bgzip else 'bed'
+    somatic_prefix = args.somatic_output_dir / 'umccr_cancer_genes'
+    germline_prefix = args.germline_output_dir / 'umccr_predisposition_genes'
+
+    somatic_symbols = panel_data.get_somatic_gene_symbols(somatic_panel)
+    somatic_tsgene_symbols = panel_data.get_somatic_gene_symbols(somatic_panel, tsgenes_only=True)
+    gene_regions = panel_data.get_gene_regions(somatic_panel, ensembl_genes, refseq_genes, contig_order)
+    cds_regions = panel_data.get_cds_regions(somatic_panel, ensembl_cds, refseq_cds, contig_order)
+    hmftools_panel = panel_data.get_hmftools_panel(somatic_panel, hartwig_panel)
+    germline_gene_ids = panel_data.get_germline_gene_ids(germline_panel)
+
+    writes = [
+        (panel_data.write_lines, f'{somatic_prefix}.gene_symbols.all.txt', somatic_symbols),
+        (panel_data.write_lines, f'{somatic_prefix}.gene_symbols.tsgenes.txt', somatic_tsgene_symbols),
+        (panel_data.write_table, f'{somatic_prefix}.gene_regions.{bed_suffix}', gene_regions),
+        (panel_data.write_table, f'{somatic_prefix}.cds_regions.{bed_suffix}', cds_regions),
+        (panel_data.write_lines, f'{germline_prefix}.gene_symbols.txt', germline_gene_ids),
+        (panel_data.write_table, f'{germline_prefix}.transcript_regions.{bed_suffix}', transcript_regions),
+    ]
+
+    hmftools_dir = args.somatic_output_dir / 'hmftools'
+    hmftools_dir.mkdir(parents=True, exist_ok=True)
+    args.germline_output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Write outputs, concurrently where requested
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+        futures = [executor.submit(write_fn, pathlib.Path(fp), data) for write_fn, fp, data in writes]
+        futures.append(executor.submit(
+            panel_data.write_table,
+            hmftools_dir / 'DriverGenePanel.38.tsv',
+            hmftools_panel,
+            header=hartwig_panel.columns,
+        ))
+
+        for future in futures:
+            future.result()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+
+from util import store
+from util import tables
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input_fps', required=True, type=pathlib.Path, nargs='+')
+    parser.add_argument('--output_dir', type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    for fp in args.input_fps:
+        if not fp.exists():
+            parser.error(f'Input file {fp} does not exist')
+        if store.is_store(fp):
+            parser.error(f'Input file {fp} is already a store')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Pack each gene data TSV or region BED alongside the input unless an output directory is given,
+    # e.g. resources/ensembl.cds.bed.gz -> resources/ensembl.cds.store
+    for input_fp in args.input_fps:
+        name = input_fp.stem if input_fp.suffix == '.gz' else input_fp.name
+        output_dir = args.output_dir or input_fp.parent
+        output_fp = output_dir / pathlib.Path(name).with_suffix('.store')
+        tables.write_resource_store(output_fp, tables.read_resource(input_fp))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import argparse
+import collections
+import contextlib
+import pathlib
+import sys
+
+from util import contigs
+from util import diff
+from util import tables
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--format', required=True, choices=diff.FORMATS)
+    parser.add_argument('--old_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--new_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--output_fp', type=pathlib.Path)
+    parser.add_argument('--report_fp', type=pathlib.Path)
+    parser.add_argument('--include_unchanged', action='store_true')
+    parser.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser.add_argument('--unknown_contigs', default='error', choices=contigs.UNKNOWN_CONTIG_MODES)
+
+    args = parser.parse_args()
+
+    if not args.old_fp.exists():
+        parser.error(f'Input file {args.old_fp} does not exist')
+    if not args.new_fp.exists():
+        parser.error(f'Input file {args.new_fp} does not exist')
+    if args.contig_order_fp and not args.contig_order_fp.exists():
+        parser.error(f'Input file {args.contig_order_fp} does not exist')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Set contig order matching that used to sort the inputs
+    if args.contig_order_fp:
+        contig_order = contigs.ContigOrder.from_file(args.contig_order_fp, args.unknown_contigs)
+    else:
+        contig_order = contigs.ContigOrder(unknown=args.unknown_contigs)
+
+    with contextlib.ExitStack() as stack:
+        old_fh = stack.enter_context(tables.open_text(args.old_fp))
+        new_fh = stack.enter_context(tables.open_text(args.new_fp))
+        old_columns, old_records = read_records(old_fh, args.format)
+        new_columns, new_records = read_records(new_fh, args.format)
+
+        if old_columns != new_columns:
+            print(f'ERROR: columns differ between {args.old_fp} and {args.new_fp}', file=sys.stderr)
+            sys.exit(1)
+
+        # Get format and the order in which records are compared
+        # NOTE(SW): panels are sorted by symbol rather than HGNC ID and are small enough to be sorted in
+        # memory, all other inputs are streamed in their existing contig and position order
+        if args.format == 'panel':
+            diff_format = diff.get_panel_format(old_columns)
+            order_key = diff_format.identity
+            partition_key = None
+            old_records = sorted(old_records, key=order_key)
+            new_records = sorted(new_records, key=order_key)
+        else:
+            diff_format = diff.FORMATS[args.format]
+            order_key = lambda r: contig_order.start_key(r.contig, r.start)
+            # Unmatched records are held only until both inputs have moved past their contig
+            partition_key = lambda k: k[:-1]
+
+        changes = diff.diff_records(old_records, new_records, diff_format, order_key, partition_key)
+
+        # Write machine readable changes and human readable report
+        output_fh = stack.enter_context(args.output_fp.open('w')) if args.output_fp else None
+        report_fh = stack.enter_context(args.report_fp.open('w')) if args.report_fp else sys.stdout
+        if output_fh:
+            header = ['change', 'key', 'fields', *(f'old_{c}' for c in old_columns), *(f'new_{c}' for c in new_columns)]
+            print(*header, sep='\t', file=output_fh)
+
+        change_counts = collections.Counter()
+        for change in changes:
+            change_counts[change.change] += 1
+            if change.change == 'unchanged' and not args.include_unchanged:
+                continue
+
+            if output_fh:
+                print(*format_change_row(change, len(old_columns)), sep='\t', file=output_fh)
+            print(f'{change.change:<18}  {change.key:<20}  {diff.format_change(change, diff_format)}', file=report_fh)
+
+        # Summarise counts of each change type
+        print(f'\n{args.old_fp} -> {args.new_fp}', file=report_fh)
+        for change_type in diff.CHANGE_TYPES:
+            print(f'  {change_type}: {change_counts[change_type]}', file=report_fh)
+
+
+def read_records(fh, format_name):
+    # Returns columns and a record iterator that reads from the file handle as consumed
+    if format_name == 'panel':
+        columns, _, records = tables.parse_tsv(fh)
+    elif format_name == 'genes':
+        columns, _, records = tables.parse_tsv(fh, int_columns=('start', 'end'))
+    else:
+        columns = tables.RegionRow._fields
+        records = tables.parse_region_bed(fh)
+    return tuple(columns), records
+
+
+def format_change_row(change, column_count):
+    old_values = change.old if change.old else [None] * column_count
+    new_values = change.new if change.new else [None] * column_count
+    values = [*old_values, *new_values]
+    return [change.change, change.key, ','.join(change.fields) or 'NA', *('NA' if v is None else v for v in values)]
+
+
+if __name__ == '__main__':
+    main()
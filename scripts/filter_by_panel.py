@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import pathlib
+import sys
+
+from util import bgzf
+from util import contigs
+from util import sweep
+from util import tables
+
+
+INPUT_FORMATS = ('vcf', 'bed')
+
+# Tabix columns of outputs, one-based VCF positions indexed by POS alone
+TABIX_COLUMNS = {
+    'vcf': ((0, 1, 1), False),
+    'bed': ((0, 1, 2), True),
+}
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--panel_fp', required=True, type=pathlib.Path)
+    parser.add_argument('--output_fp', type=pathlib.Path)
+    parser.add_argument('--format', choices=INPUT_FORMATS)
+    parser.add_argument('--filter', action='store_true')
+    parser.add_argument('--tag', action='store_true')
+    parser.add_argument('--tag_name', default='PANEL')
+    parser.add_argument('--padding', default=0, type=int)
+    parser.add_argument('--contig_order_fp', type=pathlib.Path)
+    # NOTE(SW): VCFs commonly carry alt and decoy contigs after the primary assembly, which do not
+    # overlap the panel and by default are placed after known contigs in input order
+    parser.add_argument('--unknown_contigs', default='input', choices=contigs.UNKNOWN_CONTIG_MODES)
+
+    args = parser.parse_args()
+
+    if not args.input_fp.exists():
+        parser.error(f'Input file {args.input_fp} does not exist')
+    if not args.panel_fp.exists():
+        parser.error(f'Input file {args.panel_fp} does not exist')
+    if args.contig_order_fp and not args.contig_order_fp.exists():
+        parser.error(f'Input file {args.contig_order_fp} does not exist')
+    if not (args.filter or args.tag):
+        parser.error('At least one of --filter and --tag must be given')
+    if args.padding < 0:
+        parser.error(f'Got invalid padding: {args.padding}')
+
+    if args.format is None:
+        args.format = get_input_format(args.input_fp)
+        if args.format is None:
+            parser.error(f'Could not determine format of {args.input_fp}, please set --format')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Set contig order matching that used to sort the input and panel
+    if args.contig_order_fp:
+        contig_order = contigs.ContigOrder.from_file(args.contig_order_fp, args.unknown_contigs)
+    else:
+        contig_order = contigs.ContigOrder(unknown=args.unknown_contigs)
+
+    # Stream input and panel together, holding only panel intervals near the current record
+    panel_sweep = sweep.PanelSweep(tables.iter_region_bed(args.panel_fp), contig_order, args.padding)
+    columns, zero_based = TABIX_COLUMNS[args.format]
+    with tables.open_text(args.input_fp) as input_fh:
+        output_fh = bgzf.open_output(args.output_fp, columns, zero_based)
+        try:
+            if args.format == 'vcf':
+                lines = process_vcf(input_fh, panel_sweep, args.filter, args.tag, args.tag_name, args.panel_fp)
+            else:
+                lines = process_bed(input_fh, panel_sweep, args.filter, args.tag)
+            write_lines(output_fh, lines)
+        finally:
+            if output_fh is not sys.stdout:
+                output_fh.close()
+
+
+def process_vcf(fh, panel_sweep, filter_records, tag_records, tag_name, panel_fp):
+    # Yields header and record lines, records are tagged in the INFO column with overlapping panel genes
+    for line in fh:
+        if not line.startswith('#'):
+            break
+        if tag_records and line.startswith('#CHROM'):
+            description = f'Panel genes overlapping the variant, from {panel_fp.name}'
+            yield f'##INFO=<ID={tag_name},Number=.,Type=String,Description="{description}">\n'
+        yield line
+    else:
+        return
+
+    # NOTE(SW): only the leading columns are split unless the record is tagged. Records that lie before
+    # the next panel interval, as for most of a genome, are passed without querying the sweep
+    clear_contig, clear_start, clear_end = None, 0, 0
+    for line in itertools.chain([line], fh):
+        contig, position, _, ref, _ = line.split('\t', 4)
+        start = int(position) - 1
+        end = start + len(ref)
+
+        if contig == clear_contig and clear_start <= start and end <= clear_end:
+            hits = None
+            clear_start = start
+        else:
+            hits = panel_sweep.query(contig, start, end)
+            clear_contig, clear_start, clear_end = contig, start, panel_sweep.get_clear_end()
+
+        if not hits:
+            if not filter_records:
+                yield line
+            continue
+
+        if tag_records:
+            tokens = line.rstrip('\n').split('\t')
+            tag = f'{tag_name}={get_hit_symbols(hits)}'
+            tokens[7] = tag if tokens[7] == '.' else f'{tokens[7]};{tag}'
+            line = '\t'.join(tokens) + '\n'
+        yield line
+
+
+def process_bed(fh, panel_sweep, filter_records, tag_records):
+    # Yields BED lines, records are tagged with an additional column of overlapping panel genes
+    clear_contig, clear_start, clear_end = None, 0, 0
+    for line in fh:
+        if line.startswith(('#', 'track', 'browser')):
+            yield line
+            continue
+
+        contig, start, end, *_ = line.split('\t', 3)
+        start = int(start)
+        end = int(end)
+
+        # Records before the next panel interval are passed without querying the sweep, as for VCFs
+        if contig == clear_contig and clear_start <= start and end <= clear_end:
+            hits = None
+            clear_start = start
+        else:
+            hits = panel_sweep.query(contig, start, end)
+            clear_contig, clear_start, clear_end = contig, start, panel_sweep.get_clear_end()
+
+        if not hits and filter_records:
+            continue
+        if tag_records:
+            tag = get_hit_symbols(hits) if hits else '.'
+            line = line.rstrip('\n') + f'\t{tag}\n'
+        yield line
+
+
+def get_hit_symbols(hits):
+    # Unique gene symbols in panel order
+    symbols = dict.fromkeys(iv.symbol or 'NA' for iv in hits)
+    return ','.join(symbols)
+
+
+def write_lines(fh, lines, batch_lines=bgzf.WRITE_BATCH_LINES):
+    # Lines are joined and written in batches
+    batch = list()
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_lines:
+            fh.write(''.join(batch))
+            batch.clear()
+    if batch:
+        fh.write(''.join(batch))
+
+
+def get_input_format(fp):
+    suffixes = fp.suffixes[-2:] if fp.suffix == '.gz' else fp.suffixes[-1:]
+    if suffixes and suffixes[0] in {'.vcf', '.bed'}:
+        return suffixes[0][1:]
+    return None
+
+
+if __name__ == '__main__':
+    main()
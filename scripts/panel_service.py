@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+import argparse
+import http.server
+import json
+import pathlib
+import re
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+
+from util import lookup
+
+
+REPO_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+DEFAULT_INPUT_FPS = {
+    'somatic_panel_fp': REPO_DIR / 'somatic_panel/3_final_panel/final_panel.tsv',
+    'germline_panel_fp': REPO_DIR / 'germline_panel/2_final_panel/final_panel.tsv',
+    'ensembl_gene_data_fp': REPO_DIR / 'resources/ensembl_gene_data.tsv',
+    'refseq_gene_data_fp': REPO_DIR / 'resources/refseq_gene_data.tsv',
+    'gene_regions_fp': REPO_DIR / 'somatic_panel/4_panel_data/output/umccr_cancer_genes.gene_regions.bed',
+    'cds_regions_fp': REPO_DIR / 'somatic_panel/4_panel_data/output/umccr_cancer_genes.cds_regions.bed',
+    'transcript_regions_fp': REPO_DIR / 'germline_panel/3_panel_data/output/umccr_predisposition_genes.transcript_regions.bed',
+    'fusion_data_fp': REPO_DIR / 'fusion_panel/1_panel_data/output/fusion_database.tsv',
+}
+
+# Region strings given as query parameters, e.g. chr1:100-200, with zero-based, half-open coordinates
+REGION_RE = re.compile(r'^(.+):(\d+)-(\d+)$')
+
+# Maximum number of identifiers or regions in a single request
+MAX_BATCH_SIZE = 100000
+
+
+class LookupState:
+
+    # NOTE(SW): inputs are polled for changes by a background thread. A new lookup is built from the
+    # changed files while requests continue to be answered from the current one, and is then swapped
+    # in whole. Where inputs change again during the build, e.g. a release being written, the build
+    # is discarded and retried at the next poll
+    def __init__(self, input_fps, cache_size, reload_seconds):
+        self.input_fps = input_fps
+        self.cache_size = cache_size
+        self.reload_seconds = reload_seconds
+        self.reload_count = 0
+        self.signature = get_input_signature(input_fps)
+        self.lookup = self.build()
+
+    def build(self):
+        start = time.perf_counter()
+        panel_lookup = lookup.PanelLookup(self.input_fps, self.cache_size)
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - start
+        print(f'loaded lookup data in {self.load_seconds:.2f}s', file=sys.stderr)
+        return panel_lookup
+
+    def start_reload_thread(self):
+        if self.reload_seconds > 0:
+            threading.Thread(target=self.poll_inputs, daemon=True).start()
+
+    def poll_inputs(self):
+        while True:
+            time.sleep(self.reload_seconds)
+            try:
+                self.reload_changed()
+            except Exception as e:
+                print(f'ERROR: failed to reload lookup data, continuing with previous data: {e!r}', file=sys.stderr)
+
+    def reload_changed(self):
+        if (signature := get_input_signature(self.input_fps)) == self.signature:
+            return
+
+        print('inputs changed, reloading lookup data', file=sys.stderr)
+        panel_lookup = self.build()
+        if get_input_signature(self.input_fps) != signature:
+            print('inputs changed during reload, retrying', file=sys.stderr)
+            return
+
+        self.lookup = panel_lookup
+        self.signature = signature
+        self.reload_count += 1
+
+    def get_status(self):
+        return {
+            'status': 'ok',
+            'inputs': {k: str(fp) for k, fp in self.input_fps.items()},
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'reload_count': self.reload_count,
+            'cache': self.lookup.cache_info(),
+        }
+
+
+class LookupRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    # Endpoints accept identifiers or regions as repeated query parameters with GET, or as a JSON list
+    # with POST for batches: {"ids": [...]} or {"regions": [[contig, start, end], ...]}
+    state = None
+    quiet = False
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        if url.path == '/health':
+            self.send_json(200, self.state.get_status())
+        else:
+            self.handle_query(url.path, {'ids': params.get('id', list()), 'regions': params.get('region', list())})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            assert isinstance(body, dict)
+        except (ValueError, AssertionError):
+            self.send_json(400, {'error': 'Request body must be a JSON object'})
+            return
+        self.handle_query(url.path, body)
+
+    def handle_query(self, path, body):
+        # NOTE(SW): the lookup is taken once per request so that a concurrent reload cannot give a
+        # response built from two versions of the data
+        panel_lookup = self.state.lookup
+        try:
+            if path == '/genes':
+                results = panel_lookup.resolve(get_identifiers(body))
+            elif path == '/regions':
+                results = panel_lookup.regions(get_identifiers(body))
+            elif path == '/overlaps':
+                results = panel_lookup.overlaps(get_regions(body))
+            else:
+                self.send_json(404, {'error': f'Unknown endpoint: {path}'})
+                return
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(200, {'results': results})
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def server_bind(self):
+        # Set attributes expected by the request handler that are otherwise set for TCP servers
+        super().server_bind()
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', default=8765, type=int)
+    parser.add_argument('--socket_fp', type=pathlib.Path)
+    parser.add_argument('--cache_size', default=4096, type=int)
+    parser.add_argument('--reload_seconds', default=5, type=float)
+    parser.add_argument('--quiet', action='store_true')
+    for key, fp in DEFAULT_INPUT_FPS.items():
+        parser.add_argument(f'--{key}', default=fp, type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    for key, required in lookup.LOOKUP_INPUTS.items():
+        fp = getattr(args, key)
+        if fp.exists():
+            continue
+        if required or fp != DEFAULT_INPUT_FPS[key]:
+            parser.error(f'Input file {fp} does not exist')
+        # NOTE(SW): optional panel outputs may not have been generated yet, these are skipped
+        setattr(args, key, None)
+    if args.cache_size < 1:
+        parser.error(f'Got invalid cache size: {args.cache_size}')
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    # Load lookup data and start watching inputs for changes
+    input_fps = {k: getattr(args, k) for k in lookup.LOOKUP_INPUTS if getattr(args, k) is not None}
+    state = LookupState(input_fps, args.cache_size, args.reload_seconds)
+    state.start_reload_thread()
+
+    LookupRequestHandler.state = state
+    LookupRequestHandler.quiet = args.quiet
+
+    # Serve on a Unix socket where given, otherwise on a local TCP port
+    if args.socket_fp:
+        args.socket_fp.unlink(missing_ok=True)
+        server = UnixHTTPServer(str(args.socket_fp), LookupRequestHandler)
+        address = args.socket_fp
+    else:
+        server = http.server.ThreadingHTTPServer((args.host, args.port), LookupRequestHandler)
+        address = f'http://{args.host}:{server.server_port}'
+
+    print(f'serving panel lookups on {address}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket_fp:
+            args.socket_fp.unlink(missing_ok=True)
+
+
+def get_input_signature(input_fps):
+    signature = list()
+    for fp in input_fps.values():
+        try:
+            stat = fp.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return signature
+
+
+def get_identifiers(body):
+    identifiers = body.get('ids', list())
+    if not isinstance(identifiers, list) or not all(isinstance(i, str) for i in identifiers):
+        raise ValueError('Identifiers must be given as a list of strings')
+    check_batch_size(identifiers)
+    return identifiers
+
+
+def get_regions(body):
+    if not isinstance(body.get('regions', list()), list):
+        raise ValueError('Regions must be given as a list')
+
+    regions = list()
+    for region in body.get('regions', list()):
+        if isinstance(region, str) and (match := REGION_RE.match(region)):
+            contig, start, end = match.group(1), int(match.group(2)), int(match.group(3))
+        elif isinstance(region, list) and len(region) == 3:
+            contig, start, end = region
+        else:
+            raise ValueError(f'Got invalid region: {region}')
+        # NOTE(SW): bools are ints in Python and so are excluded explicitly
+        if not isinstance(contig, str) or any(not isinstance(v, int) or isinstance(v, bool) for v in (start, end)):
+            raise ValueError(f'Got invalid region: {region}')
+        if start >= end:
+            raise ValueError(f'Got invalid region: {region}')
+        regions.append((contig, start, end))
+    check_batch_size(regions)
+    return regions
+
+
+def check_batch_size(queries):
+    if len(queries) > MAX_BATCH_SIZE:
+        raise ValueError(f'Got {len(queries)} queries, more than the maximum of {MAX_BATCH_SIZE}')
+
+
+if __name__ == '__main__':
+    main()
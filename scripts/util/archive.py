@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import pathlib
+import tarfile
+
+from . import bgzf
+
+
+# Increment when archive layout or compression changes so that cached archives are rebuilt
+ARCHIVE_FORMAT_VERSION = 1
+
+READ_SIZE = 1024 ** 2
+
+
+class ArchiveEntry:
+
+    # NOTE(SW): source_fp is None for directories
+    def __init__(self, name, source_fp):
+        self.name = name
+        self.source_fp = source_fp
+
+
+def get_directory_entries(source_dir, archive_dir, exclude_names=()):
+    # Directories and files under source_dir in sorted order, placed under archive_dir. Excluded names
+    # are matched at any depth
+    entries = [ArchiveEntry(archive_dir, None)]
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = sorted(n for n in dirnames if n not in exclude_names)
+        dirpath = pathlib.Path(dirpath)
+        archive_dirpath = pathlib.PurePosixPath(archive_dir, dirpath.relative_to(source_dir))
+        for dirname in dirnames:
+            entries.append(ArchiveEntry(str(archive_dirpath / dirname), None))
+        for filename in sorted(filenames):
+            if filename in exclude_names:
+                continue
+            entries.append(ArchiveEntry(str(archive_dirpath / filename), dirpath / filename))
+    return entries
+
+
+def get_manifest(name, entries, mtime, digests):
+    # Archive content as names, modes, and file digests; archives with equal manifests are identical
+    files = list()
+    for entry in entries:
+        if entry.source_fp is None:
+            files.append([entry.name, get_mode(None), None])
+        else:
+            files.append([entry.name, get_mode(entry.source_fp), digests.get(entry.source_fp)])
+    return {'name': name, 'format': ARCHIVE_FORMAT_VERSION, 'mtime': mtime, 'files': files}
+
+
+def get_manifest_digest(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+
+def get_file_digest(fp):
+    h = hashlib.sha256()
+    with pathlib.Path(fp).open('rb') as fh:
+        while (block := fh.read(READ_SIZE)):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_mode(fp):
+    # NOTE(SW): modes are normalised so that archives do not depend on the umask of the checkout
+    if fp is None or os.stat(fp).st_mode & 0o111:
+        return 0o755
+    return 0o644
+
+
+def write_archive(fp, entries, mtime, threads=1):
+    # Writes a gzipped tar with fixed ownership and mtimes in entry order, so that the same entries
+    # always give identical bytes. Compressed as BGZF, which gzip and tar read as standard gzip
+    with bgzf.BgzfWriter(fp, threads=threads) as fh:
+        with tarfile.open(fileobj=fh, mode='w', format=tarfile.GNU_FORMAT) as tar:
+            for entry in entries:
+                tarinfo = tarfile.TarInfo(entry.name)
+                tarinfo.mtime = mtime
+                tarinfo.mode = get_mode(entry.source_fp)
+                tarinfo.uid = tarinfo.gid = 0
+                tarinfo.uname = tarinfo.gname = ''
+                if entry.source_fp is None:
+                    tarinfo.type = tarfile.DIRTYPE
+                    tar.addfile(tarinfo)
+                    continue
+                tarinfo.size = os.stat(entry.source_fp).st_size
+                with open(entry.source_fp, 'rb') as source_fh:
+                    tar.addfile(tarinfo, source_fh)
@@ -0,0 +1,307 @@
+import collections
+import concurrent.futures
+import pathlib
+import struct
+import sys
+import zlib
+
+
+# Uncompressed bytes per BGZF block, as used by htslib
+BLOCK_SIZE = 0xff00
+
+BLOCK_HEADER = struct.Struct('<4BI2BH2BHH')
+BLOCK_FOOTER = struct.Struct('<2I')
+EOF_BLOCK = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+# Tabix binning scheme: 16 kb linear index windows and a six level bin hierarchy
+TABIX_LINEAR_SHIFT = 14
+TABIX_MAX_BIN = 37450
+TABIX_FORMAT_GENERIC = 0
+TABIX_FORMAT_ZERO_BASED = 0x10000
+
+# Lines formatted and written together
+WRITE_BATCH_LINES = 10000
+
+# Blocks compressed together by each worker when writing with multiple threads
+THREAD_BATCH_BLOCKS = 64
+
+
+class BgzfWriter:
+
+    # NOTE(SW): data is compressed into independent blocks so that any line can be reached through a
+    # virtual offset, i.e. the compressed offset of its block shifted left 16 bits plus the offset
+    # of the line within the uncompressed block. As blocks are independent they can also be compressed
+    # concurrently, zlib releasing the GIL, and output is identical for any number of threads
+    def __init__(self, fp, compresslevel=6, threads=1):
+        self.fh = pathlib.Path(fp).open('wb')
+        self.compresslevel = compresslevel
+        self.buffer = bytearray()
+        self.block_address = 0
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(threads) if threads > 1 else None
+        self.threads = threads
+        self.batch = list()
+        self.pending = collections.deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data):
+        self.buffer.extend(data)
+        while len(self.buffer) >= BLOCK_SIZE:
+            self.write_block(bytes(self.buffer[:BLOCK_SIZE]))
+            del self.buffer[:BLOCK_SIZE]
+
+    def tell(self):
+        # Block addresses are only known once preceding blocks are written
+        assert not self.batch and not self.pending
+        return (self.block_address << 16) | len(self.buffer)
+
+    def write_block(self, data):
+        if self.executor is None:
+            self.write_compressed(compress_block(data, self.compresslevel))
+            return
+
+        # Batches of blocks are compressed by workers and written in order, bounding those in flight
+        self.batch.append(data)
+        if len(self.batch) >= THREAD_BATCH_BLOCKS:
+            self.submit_batch()
+
+    def submit_batch(self):
+        self.pending.append(self.executor.submit(compress_blocks, self.batch, self.compresslevel))
+        self.batch = list()
+        while len(self.pending) > self.threads * 2:
+            self.write_compressed(self.pending.popleft().result())
+
+    def write_compressed(self, blocks):
+        self.fh.write(blocks)
+        self.block_address += len(blocks)
+
+    def close(self):
+        if self.fh.closed:
+            return
+        if self.buffer:
+            self.write_block(bytes(self.buffer))
+            self.buffer.clear()
+        if self.executor is not None:
+            if self.batch:
+                self.submit_batch()
+            while self.pending:
+                self.write_compressed(self.pending.popleft().result())
+            self.executor.shutdown()
+        self.fh.write(EOF_BLOCK)
+        self.fh.close()
+
+
+class TabixWriter:
+
+    # NOTE(SW): a text file handle replacement that writes BGZF and builds a tabix index from each
+    # complete line as it is written; the index is written to <fp>.tbi on close. Input must be
+    # sorted by position with each contig in a single block of lines. Columns are zero-based indices
+    def __init__(self, fp, columns, zero_based, skip_lines=0, meta_char='#'):
+        self.name = str(fp)
+        self.bgzf = BgzfWriter(fp)
+        self.index = TabixIndex(columns, zero_based, skip_lines, meta_char)
+        self.columns = columns
+        self.zero_based = zero_based
+        self.skip_lines = skip_lines
+        self.meta_char = meta_char.encode()
+        self.line_count = 0
+        self.pending = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self.bgzf.fh.closed
+
+    def write(self, text):
+        lines = (self.pending + text.encode()).split(b'\n')
+        self.pending = lines.pop()
+        for line in lines:
+            self.write_line(line)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def write_line(self, line):
+        offset_start = self.bgzf.tell()
+        self.bgzf.write(line + b'\n')
+        self.line_count += 1
+
+        if self.line_count <= self.skip_lines or line.startswith(self.meta_char):
+            return
+
+        col_seq, col_beg, col_end = self.columns
+        tokens = line.split(b'\t', max(self.columns) + 1)
+        start = int(tokens[col_beg])
+        end = int(tokens[col_end])
+        if not self.zero_based:
+            start -= 1
+        self.index.add(tokens[col_seq].decode(), start, end, offset_start, self.bgzf.tell())
+
+    def close(self):
+        if self.closed:
+            return
+        if self.pending:
+            self.write_line(self.pending)
+            self.pending = b''
+        self.bgzf.close()
+        self.index.write(f'{self.name}.tbi')
+
+
+class TabixIndex:
+
+    def __init__(self, columns, zero_based, skip_lines=0, meta_char='#'):
+        self.columns = columns
+        self.zero_based = zero_based
+        self.skip_lines = skip_lines
+        self.meta_char = meta_char
+
+        self.contigs = dict()
+        self.contig = None
+        self.start_last = None
+
+    def add(self, contig, start, end, offset_start, offset_end):
+        if contig != self.contig:
+            if contig in self.contigs:
+                raise ValueError(f'Got contig {contig} in more than one block of lines, input must be sorted')
+            self.contigs[contig] = {'bins': dict(), 'linear': list(), 'offsets': [offset_start, offset_end], 'count': 0}
+            self.contig = contig
+            self.start_last = None
+        elif start < self.start_last:
+            raise ValueError(f'Got unsorted position on {contig}: {start} after {self.start_last}')
+        self.start_last = start
+
+        # NOTE(SW): zero-length regions are indexed as a single base, as in htslib
+        end = max(end, start + 1)
+
+        data = self.contigs[contig]
+        data['offsets'][1] = offset_end
+        data['count'] += 1
+
+        # Chunks of a bin are extended while lines are contiguous in the file
+        chunks = data['bins'].setdefault(reg2bin(start, end), list())
+        if chunks and chunks[-1][1] == offset_start:
+            chunks[-1][1] = offset_end
+        else:
+            chunks.append([offset_start, offset_end])
+
+        # Lowest offset of any line overlapping each linear index window
+        linear = data['linear']
+        window_last = (end - 1) >> TABIX_LINEAR_SHIFT
+        if len(linear) <= window_last:
+            linear.extend([None] * (window_last + 1 - len(linear)))
+        for window in range(start >> TABIX_LINEAR_SHIFT, window_last + 1):
+            if linear[window] is None:
+                linear[window] = offset_start
+
+    def write(self, fp):
+        file_format = TABIX_FORMAT_GENERIC
+        if self.zero_based:
+            file_format |= TABIX_FORMAT_ZERO_BASED
+
+        names = b''.join(contig.encode() + b'\0' for contig in self.contigs)
+        col_seq, col_beg, col_end = self.columns
+
+        data = bytearray(b'TBI\1')
+        data += struct.pack(
+            '<8i',
+            len(self.contigs),
+            file_format,
+            col_seq + 1,
+            col_beg + 1,
+            col_end + 1,
+            ord(self.meta_char),
+            self.skip_lines,
+            len(names),
+        )
+        data += names
+
+        for contig_data in self.contigs.values():
+            bins = contig_data['bins']
+            data += struct.pack('<i', len(bins) + 1)
+            for bin_number, chunks in bins.items():
+                data += struct.pack('<Ii', bin_number, len(chunks))
+                for chunk in chunks:
+                    data += struct.pack('<2Q', *chunk)
+
+            # Pseudo-bin holding the offset span and number of records of the contig
+            data += struct.pack('<Ii', TABIX_MAX_BIN, 2)
+            data += struct.pack('<4Q', *contig_data['offsets'], contig_data['count'], 0)
+
+            # Windows without lines take the offset of the nearest preceding window
+            linear = contig_data['linear']
+            offset = contig_data['offsets'][0]
+            data += struct.pack('<i', len(linear))
+            for window_offset in linear:
+                if window_offset is not None:
+                    offset = window_offset
+                data += struct.pack('<Q', offset)
+
+        # Number of records without coordinates
+        data += struct.pack('<Q', 0)
+
+        with BgzfWriter(fp) as fh:
+            fh.write(data)
+
+
+def compress_block(data, compresslevel):
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+
+    # Gzip header with the BGZF extra subfield holding the total block size minus one
+    block_size = BLOCK_HEADER.size + len(cdata) + BLOCK_FOOTER.size
+    header = BLOCK_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord('B'), ord('C'), 2, block_size - 1)
+    footer = BLOCK_FOOTER.pack(zlib.crc32(data), len(data))
+    return header + cdata + footer
+
+
+def compress_blocks(blocks, compresslevel):
+    return b''.join(compress_block(data, compresslevel) for data in blocks)
+
+
+def reg2bin(start, end):
+    # Smallest bin fully containing the zero-based, half-open region
+    end -= 1
+    if start >> 14 == end >> 14:
+        return ((1 << 15) - 1) // 7 + (start >> 14)
+    if start >> 17 == end >> 17:
+        return ((1 << 12) - 1) // 7 + (start >> 17)
+    if start >> 20 == end >> 20:
+        return ((1 << 9) - 1) // 7 + (start >> 20)
+    if start >> 23 == end >> 23:
+        return ((1 << 6) - 1) // 7 + (start >> 23)
+    if start >> 26 == end >> 26:
+        return ((1 << 3) - 1) // 7 + (start >> 26)
+    return 0
+
+
+def open_output(fp, columns, zero_based, skip_lines=0):
+    # Writes to stdout when no path is given, and to BGZF with a tabix index for .gz paths
+    if fp is None:
+        return sys.stdout
+    elif pathlib.Path(fp).suffix == '.gz':
+        return TabixWriter(fp, columns, zero_based, skip_lines)
+    else:
+        return pathlib.Path(fp).open('w')
+
+
+def write_rows(fh, rows):
+    # Formats and writes rows in batches rather than with a print call per row
+    batch = list()
+    for row in rows:
+        batch.append('\t'.join(map(str, row)))
+        if len(batch) >= WRITE_BATCH_LINES:
+            fh.write('\n'.join(batch) + '\n')
+            batch.clear()
+    if batch:
+        fh.write('\n'.join(batch) + '\n')
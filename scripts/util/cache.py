@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+import zlib
+
+
+DEFAULT_CACHE_DIR = pathlib.Path(os.environ.get('XDG_CACHE_HOME', pathlib.Path.home() / '.cache')) / 'umccr_gene_panels'
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+class TableCache:
+
+    # NOTE(SW): entries are keyed by the content hash of all inputs, so a changed input is never
+    # matched to a stale entry. Least recently used entries are evicted once the cache exceeds the
+    # size limit
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def load(self, key):
+        # NOTE(SW): entries may be evicted by another process at any point, and an entry that cannot be
+        # read, e.g. truncated by a full disk, is removed so that it is rebuilt; both are misses
+        fp = self.get_entry_fp(key)
+        try:
+            with gzip.open(fp, 'rb') as fh:
+                data = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except (EOFError, OSError, pickle.UnpicklingError, zlib.error) as e:
+            print(f'removing unreadable cache entry {fp.name}: {e!r}', file=sys.stderr)
+            fp.unlink(missing_ok=True)
+            return None
+
+        # Mark as recently used, without recreating an entry evicted since it was read
+        try:
+            os.utime(fp)
+        except FileNotFoundError:
+            pass
+
+        return data
+
+    def store(self, key, data):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so that partially written entries are never loaded
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as tmp_fh:
+            with gzip.open(tmp_fh, 'wb', compresslevel=1) as fh:
+                pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        pathlib.Path(tmp_fh.name).replace(self.get_entry_fp(key))
+
+        self.evict()
+
+    def evict(self):
+        # NOTE(SW): several processes may share a cache, e.g. when compiling a manifest, and so entries
+        # can be removed by another process at any point
+        entries = list()
+        for fp in self.cache_dir.glob('*.pkl.gz'):
+            try:
+                entries.append((fp.stat(), fp))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda d: d[0].st_mtime, reverse=True)
+
+        # NOTE(SW): the most recent entry is always retained
+        total_bytes = 0
+        for i, (stat, fp) in enumerate(entries):
+            total_bytes += stat.st_size
+            if i > 0 and total_bytes > self.max_bytes:
+                print(f'evicting cache entry {fp.name}', file=sys.stderr)
+                fp.unlink(missing_ok=True)
+
+    def get_entry_fp(self, key):
+        return self.cache_dir / f'{key}.pkl.gz'
+
+
+def get_cache_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def get_file_digest(fp, block_size=1024 ** 2):
+    h = hashlib.sha256()
+    with open(fp, 'rb') as fh:
+        while (block := fh.read(block_size)):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,79 @@
+import pathlib
+
+
+DEFAULT_CONTIGS = [f'chr{e}' for e in [*range(1, 23), 'X', 'Y', 'M']]
+
+# Handling of contigs absent from the given order:
+#   * error: raise an exception
+#   * name: place after known contigs, sorted by name
+#   * input: place after known contigs, in the order they are first seen
+UNKNOWN_CONTIG_MODES = ('error', 'name', 'input')
+
+
+class ContigOrder:
+
+    def __init__(self, contigs=None, unknown='error'):
+        assert unknown in UNKNOWN_CONTIG_MODES
+
+        if contigs is None:
+            contigs = DEFAULT_CONTIGS
+
+        self.ranks = dict()
+        for contig in contigs:
+            if contig in self.ranks:
+                raise ValueError(f'Got duplicate contig in contig order: {contig}')
+            self.ranks[contig] = len(self.ranks)
+
+        self.unknown = unknown
+        self.unknown_rank = len(self.ranks)
+        self.unknown_seen = dict()
+
+    @classmethod
+    def from_file(cls, fp, unknown='error'):
+        return cls(read_contig_names(fp), unknown)
+
+    def rank(self, contig):
+        # NOTE(SW): returns a tuple so that unknown contigs can be ordered by name
+        if (rank := self.ranks.get(contig)) is not None:
+            return (rank, '')
+        elif self.unknown == 'name':
+            return (self.unknown_rank, contig)
+        elif self.unknown == 'input':
+            if contig not in self.unknown_seen:
+                self.unknown_seen[contig] = self.unknown_rank + len(self.unknown_seen)
+            return (self.unknown_seen[contig], '')
+        else:
+            raise ValueError(f'Got contig not present in contig order: {contig}')
+
+    def sort_key(self, contig, start, end):
+        # NOTE(SW): start and end must be integers. Records sharing a start are ordered by end so that
+        # output does not depend on input order
+        return (*self.rank(contig), start, end)
+
+    def start_key(self, contig, start):
+        # Order required of inputs, which may have been written with records sharing a start in any order
+        return (*self.rank(contig), start)
+
+    def __contains__(self, contig):
+        return contig in self.ranks
+
+
+def read_contig_names(fp):
+    # Accepts a FASTA index (.fai), sequence dictionary (.dict), or a plain list with one contig per
+    # line; for .fai and plain lists the contig name is taken from the first column
+    fp = pathlib.Path(fp)
+    contigs = list()
+    with fp.open('r') as fh:
+        for line in fh:
+            if not (line := line.rstrip('\n')):
+                continue
+
+            if fp.suffix == '.dict':
+                if not line.startswith('@SQ'):
+                    continue
+                [contig] = [t[3:] for t in line.split('\t') if t.startswith('SN:')]
+            else:
+                contig = line.split('\t')[0]
+
+            contigs.append(contig)
+    return contigs
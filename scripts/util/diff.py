@@ -0,0 +1,196 @@
+import collections
+import itertools
+
+from . import transcripts
+
+
+CHANGE_TYPES = ('added', 'removed', 'coordinate_changed', 'id_changed', 'attribute_changed', 'unchanged')
+
+Change = collections.namedtuple('Change', ('change', 'key', 'fields', 'old', 'new'))
+
+
+class DiffFormat:
+
+    # Records are paired across versions first by position and identity, then by position alone, and
+    # finally by identity alone. Identity fields have any version removed so that, e.g., a gene with a
+    # new Ensembl version is still matched. Formats without position fields are paired by identity only
+    def __init__(self, identity_fields, position_fields, id_fields, attribute_fields=()):
+        self.identity_fields = identity_fields
+        self.position_fields = position_fields
+        self.id_fields = id_fields
+        self.attribute_fields = attribute_fields
+
+    def identity(self, record):
+        return tuple(transcripts.strip_version(getattr(record, f) or '') for f in self.identity_fields)
+
+    def position(self, record):
+        return tuple(getattr(record, f) for f in self.position_fields)
+
+    def get_key(self, record):
+        return ';'.join(self.identity(record))
+
+    def compare(self, old, new):
+        # Returns the change type and differing fields of two paired records
+        fields_position = [f for f in self.position_fields if getattr(old, f) != getattr(new, f)]
+        fields_id = [f for f in self.id_fields if getattr(old, f) != getattr(new, f)]
+        fields_attribute = [f for f in self.attribute_fields if getattr(old, f) != getattr(new, f)]
+
+        if fields_position:
+            change = 'coordinate_changed'
+        elif fields_id:
+            change = 'id_changed'
+        elif fields_attribute:
+            change = 'attribute_changed'
+        else:
+            change = 'unchanged'
+        return change, (*fields_position, *fields_id, *fields_attribute)
+
+
+PANEL_ID_FIELDS = (
+    'ensembl_gene_symbol',
+    'ensembl_gene_id',
+    'hgnc_symbol',
+    'hgnc_id',
+    'refseq_gene_symbol',
+    'ncbi_gene_id',
+)
+
+REGION_ID_FIELDS = ('symbol', 'hgnc_id', 'gene_id', 'transcript_id')
+
+FORMATS = {
+    # NOTE(SW): panel attribute fields are set from the panel header, see get_panel_format
+    'panel': DiffFormat(('hgnc_id',), (), PANEL_ID_FIELDS),
+    'genes': DiffFormat(('gene_id',), ('contig', 'start', 'end', 'strand'), ('hgnc_id', 'gene_id', 'symbol')),
+    'transcripts': DiffFormat(('transcript_id',), ('contig', 'start', 'end', 'strand'), REGION_ID_FIELDS),
+    'cds': DiffFormat(
+        ('transcript_id', 'feature'),
+        ('contig', 'start', 'end', 'strand', 'feature'),
+        REGION_ID_FIELDS,
+    ),
+}
+
+
+def get_panel_format(columns):
+    # All panel columns other than gene identifiers, e.g. oncogene and tsgene, are compared as attributes
+    diff_format = FORMATS['panel']
+    attribute_fields = tuple(c for c in columns if c not in diff_format.id_fields)
+    return DiffFormat(diff_format.identity_fields, diff_format.position_fields, diff_format.id_fields, attribute_fields)
+
+
+def diff_records(old_records, new_records, diff_format, order_key, partition_key=None):
+    # Yields changes between two record streams sorted by order_key, e.g. contig and start. Records
+    # sharing an order key are paired as they are read so that only records without a match at the same
+    # position are held, and these are paired by identity once both streams have passed their partition,
+    # e.g. contig, or are exhausted. Without a partition key, unmatched records are held until the end
+    old_groups = itertools.groupby(check_sorted(old_records, order_key, 'old'), key=order_key)
+    new_groups = itertools.groupby(check_sorted(new_records, order_key, 'new'), key=order_key)
+
+    pending_old = collections.defaultdict(collections.deque)
+    pending_new = collections.defaultdict(collections.deque)
+    partition = None
+
+    old_group = next(old_groups, None)
+    new_group = next(new_groups, None)
+    while old_group is not None or new_group is not None:
+        # NOTE(SW): groups are taken in order across both streams, so once a group of a later partition
+        # is reached no further records of earlier partitions remain. Records moved across partitions,
+        # e.g. a gene placed on another contig, are then reported as removed and added
+        old_first = new_group is None or (old_group is not None and old_group[0] < new_group[0])
+        group_key = old_group[0] if old_first else new_group[0]
+        if partition_key is not None and (group_partition := partition_key(group_key)) != partition:
+            yield from pair_pending(pending_old, pending_new, diff_format, order_key)
+            partition = group_partition
+
+        if old_first:
+            for record in old_group[1]:
+                pending_old[diff_format.identity(record)].append(record)
+            old_group = next(old_groups, None)
+        elif old_group is None or new_group[0] < old_group[0]:
+            for record in new_group[1]:
+                pending_new[diff_format.identity(record)].append(record)
+            new_group = next(new_groups, None)
+        else:
+            yield from diff_group(list(old_group[1]), list(new_group[1]), diff_format, pending_old, pending_new)
+            old_group = next(old_groups, None)
+            new_group = next(new_groups, None)
+
+    yield from pair_pending(pending_old, pending_new, diff_format, order_key)
+
+
+def pair_pending(pending_old, pending_new, diff_format, order_key):
+    # Pair held records by identity, these have moved or otherwise have no counterpart. Held records are
+    # cleared once paired
+    changes = list()
+    for identity, old_records_pending in pending_old.items():
+        new_records_pending = pending_new.get(identity, collections.deque())
+        while old_records_pending and new_records_pending:
+            old = old_records_pending.popleft()
+            new = new_records_pending.popleft()
+            change, fields = diff_format.compare(old, new)
+            changes.append(Change(change, diff_format.get_key(new), fields, old, new))
+        for old in old_records_pending:
+            changes.append(Change('removed', diff_format.get_key(old), (), old, None))
+    for new_records_pending in pending_new.values():
+        for new in new_records_pending:
+            changes.append(Change('added', diff_format.get_key(new), (), None, new))
+    pending_old.clear()
+    pending_new.clear()
+
+    changes.sort(key=lambda c: order_key(c.new or c.old))
+    yield from changes
+
+
+def diff_group(old_records, new_records, diff_format, pending_old, pending_new):
+    # Pair records of a single order key on position and identity, then on position alone
+    new_remaining = list(new_records)
+    old_remaining = list()
+    for old in old_records:
+        key = (diff_format.position(old), diff_format.identity(old))
+        for i, new in enumerate(new_remaining):
+            if (diff_format.position(new), diff_format.identity(new)) == key:
+                change, fields = diff_format.compare(old, new)
+                yield Change(change, diff_format.get_key(new), fields, old, new)
+                del new_remaining[i]
+                break
+        else:
+            old_remaining.append(old)
+
+    for old in old_remaining:
+        position = diff_format.position(old)
+        for i, new in enumerate(new_remaining):
+            if position and diff_format.position(new) == position:
+                change, fields = diff_format.compare(old, new)
+                yield Change('id_changed', diff_format.get_key(new), fields, old, new)
+                del new_remaining[i]
+                break
+        else:
+            pending_old[diff_format.identity(old)].append(old)
+
+    for new in new_remaining:
+        pending_new[diff_format.identity(new)].append(new)
+
+
+def check_sorted(records, order_key, label):
+    # Passes through records, raising an error where the input is not sorted
+    previous_key = None
+    for i, record in enumerate(records, 1):
+        key = order_key(record)
+        if previous_key is not None and key < previous_key:
+            raise ValueError(f'Records of {label} input are not sorted, see record {i}: {record}')
+        previous_key = key
+        yield record
+
+
+def format_change(change, diff_format):
+    # Human readable description of a change
+    if change.change in {'added', 'removed'}:
+        return describe_record(change.new or change.old, diff_format)
+    return ', '.join(f'{f}: {getattr(change.old, f)} -> {getattr(change.new, f)}' for f in change.fields)
+
+
+def describe_record(record, diff_format):
+    description = ' '.join(str(getattr(record, f)) for f in diff_format.id_fields[:1])
+    if diff_format.position_fields:
+        contig, start, end, strand, *other = diff_format.position(record)
+        description = f'{contig}:{start}-{end}:{strand} {description}'
+    return description
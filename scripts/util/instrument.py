@@ -0,0 +1,187 @@
+import cProfile
+import collections
+import contextlib
+import json
+import linecache
+import pathlib
+import platform
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+
+
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_TOP_ALLOCATIONS = 10
+
+
+class RunReport:
+
+    # NOTE(SW): stages record wall and CPU time. Fine-grained stages are timed per call and so record
+    # wall time only; these are collected only for a detailed report as timing each line of input
+    # has a measurable cost
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.stages = dict()
+        self.counters = collections.Counter()
+        self.info = dict()
+        self.profile = None
+
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def add_time(self, name, wall_seconds, cpu_seconds=None, calls=1):
+        if name not in self.stages:
+            self.stages[name] = {'wall_seconds': 0.0, 'cpu_seconds': None, 'calls': 0}
+        stage = self.stages[name]
+        stage['wall_seconds'] += wall_seconds
+        stage['calls'] += calls
+        if cpu_seconds is not None:
+            stage['cpu_seconds'] = (stage['cpu_seconds'] or 0.0) + cpu_seconds
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def timed_iter(self, name, iterable, count_bytes=False):
+        # Times retrieval of each item, counting items as records and optionally their length as bytes
+        if not self.detailed:
+            yield from iterable
+            return
+
+        perf_counter = time.perf_counter
+        wall_seconds = 0.0
+        item_count = 0
+        byte_count = 0
+        iterator = iter(iterable)
+        try:
+            while True:
+                t0 = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    wall_seconds += perf_counter() - t0
+                    break
+                wall_seconds += perf_counter() - t0
+                item_count += 1
+                if count_bytes:
+                    byte_count += len(item)
+                yield item
+        finally:
+            self.add_time(name, wall_seconds, calls=item_count)
+            self.count(f'{name}.records', item_count)
+            if count_bytes:
+                self.count(f'{name}.bytes', byte_count)
+
+    def timed_fn(self, name, fn):
+        # Returns fn wrapped to accumulate time of each call
+        if not self.detailed:
+            return fn
+
+        perf_counter = time.perf_counter
+        stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': None, 'calls': 0})
+
+        def timed(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stage['wall_seconds'] += perf_counter() - t0
+                stage['calls'] += 1
+
+        return timed
+
+    def get_rates(self):
+        # Throughput of each stage for counters named <stage>.records and <stage>.bytes
+        rates = dict()
+        for name, stage in self.stages.items():
+            if not stage['wall_seconds']:
+                continue
+            for unit in ('records', 'bytes'):
+                if (count := self.counters.get(f'{name}.{unit}')) is not None:
+                    rates[f'{name}.{unit}_per_second'] = count / stage['wall_seconds']
+        return rates
+
+    def to_dict(self):
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        # NOTE(SW): ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        rss_scale = 1 if sys.platform == 'darwin' else 1024
+
+        return {
+            'info': {
+                **self.info,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'wall_seconds': time.perf_counter() - self.wall_start,
+            'cpu_seconds': time.process_time() - self.cpu_start,
+            'children_cpu_seconds': usage_children.ru_utime + usage_children.ru_stime,
+            'peak_rss_bytes': usage_self.ru_maxrss * rss_scale,
+            'children_peak_rss_bytes': usage_children.ru_maxrss * rss_scale,
+            'stages': self.stages,
+            'counters': dict(sorted(self.counters.items())),
+            'rates': self.get_rates(),
+            'profile': self.profile,
+        }
+
+    def write(self, fp):
+        with pathlib.Path(fp).open('w') as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+            fh.write('\n')
+
+
+def run_profiled(fn, report):
+    # Runs fn under cProfile and tracemalloc, printing the hottest functions and largest allocation
+    # sites to stderr and storing both in the report
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        profiler.runcall(fn)
+    finally:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+        allocations = list()
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            allocations.append({
+                'location': f'{frame.filename}:{frame.lineno}',
+                'line': linecache.getline(frame.filename, frame.lineno).strip(),
+                'bytes': stat.size,
+                'count': stat.count,
+            })
+            print(f'{stat.size} bytes in {stat.count} blocks: {frame.filename}:{frame.lineno}', file=sys.stderr)
+
+        report.profile = {
+            'functions': get_top_functions(stats),
+            'traced_peak_bytes': peak_bytes,
+            'allocations': allocations,
+        }
+
+
+def get_top_functions(stats):
+    functions = list()
+    for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        functions.append({
+            'function': f'{filename}:{lineno}({name})',
+            'calls': ncalls,
+            'total_seconds': tottime,
+            'cumulative_seconds': cumtime,
+        })
+    functions.sort(key=lambda d: d['cumulative_seconds'], reverse=True)
+    return functions[:PROFILE_TOP_FUNCTIONS]
@@ -0,0 +1,94 @@
+import bisect
+import collections
+
+from . import tables
+
+
+class IntervalIndex:
+
+    # NOTE(SW): intervals are held per contig sorted by start with a running maximum of end
+    # positions; a query bisects on the query end then walks back only while the running maximum
+    # can still reach the query start. Coordinates are zero-based and half-open as in BED
+    def __init__(self, intervals):
+        intervals_contig = collections.defaultdict(list)
+        for interval in intervals:
+            intervals_contig[interval.contig].append(interval)
+
+        self.contigs = dict()
+        for contig, contig_intervals in intervals_contig.items():
+            contig_intervals.sort(key=lambda iv: (iv.start, iv.end))
+
+            starts = [iv.start for iv in contig_intervals]
+            max_ends = list()
+            max_end = None
+            for interval in contig_intervals:
+                if max_end is None or interval.end > max_end:
+                    max_end = interval.end
+                max_ends.append(max_end)
+
+            self.contigs[contig] = (contig_intervals, starts, max_ends)
+
+    @classmethod
+    def from_bed(cls, *fps):
+        # Intervals are region BED rows, see tables.RegionRow
+        return cls(row for fp in fps for row in tables.read_region_bed(fp))
+
+    def __len__(self):
+        return sum(len(intervals) for intervals, _, _ in self.contigs.values())
+
+    def query_point(self, contig, position):
+        return self.query_range(contig, position, position + 1)
+
+    def query_range(self, contig, start, end):
+        if contig not in self.contigs:
+            return list()
+        intervals, starts, max_ends = self.contigs[contig]
+
+        hits = list()
+        i = bisect.bisect_left(starts, end) - 1
+        while i >= 0 and max_ends[i] > start:
+            if intervals[i].end > start:
+                hits.append(intervals[i])
+            i -= 1
+
+        # Return hits in index order
+        hits.reverse()
+        return hits
+
+    def query_points(self, contig, positions):
+        # NOTE(SW): same search as query_range with lookups bound locally, avoiding per-position
+        # call overhead. Results are returned in the input order
+        if contig not in self.contigs:
+            return [list() for _ in positions]
+        intervals, starts, max_ends = self.contigs[contig]
+
+        bisect_right = bisect.bisect_right
+        hits = list()
+        for position in positions:
+            position_hits = list()
+            i = bisect_right(starts, position) - 1
+            while i >= 0 and max_ends[i] > position:
+                if intervals[i].end > position:
+                    position_hits.append(intervals[i])
+                i -= 1
+            position_hits.reverse()
+            hits.append(position_hits)
+        return hits
+
+    def query_batch(self, queries):
+        # Accepts (contig, position) pairs, grouped by contig
+        positions_contig = collections.defaultdict(list)
+        for k, (contig, position) in enumerate(queries):
+            positions_contig[contig].append((k, position))
+
+        hits = [None] * len(queries)
+        for contig, entries in positions_contig.items():
+            contig_hits = self.query_points(contig, [position for _, position in entries])
+            for (k, _), entry_hits in zip(entries, contig_hits):
+                hits[k] = entry_hits
+        return hits
+
+    def query_ranges(self, queries):
+        # Accepts (contig, start, end) triples
+        return [self.query_range(*query) for query in queries]
+
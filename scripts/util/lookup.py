@@ -0,0 +1,223 @@
+import collections
+import functools
+import pathlib
+
+from . import intervals
+from . import tables
+from . import transcripts
+
+
+# Panel columns holding gene identifiers, any of which can be used to look up a panel gene
+PANEL_ID_COLUMNS = (
+    'hgnc_id',
+    'ensembl_gene_id',
+    'ncbi_gene_id',
+    'ensembl_gene_symbol',
+    'hgnc_symbol',
+    'refseq_gene_symbol',
+)
+
+# Gene data columns used to look up genes absent from the panels, in order of precedence
+ENSEMBL_ID_COLUMNS = ('hgnc_id', 'ensembl_gene_id', 'symbol')
+REFSEQ_ID_COLUMNS = ('hgnc_id', 'ncbi_gene_id', 'symbol')
+
+# Input files and whether each must be given
+LOOKUP_INPUTS = {
+    'somatic_panel_fp': True,
+    'germline_panel_fp': True,
+    'ensembl_gene_data_fp': True,
+    'refseq_gene_data_fp': True,
+    'gene_regions_fp': False,
+    'cds_regions_fp': False,
+    'transcript_regions_fp': False,
+    'fusion_data_fp': False,
+}
+
+REGION_SOURCES = ('gene_regions', 'cds_regions', 'transcript_regions')
+
+
+class PanelLookup:
+
+    # NOTE(SW): all inputs are read once on construction. Expanded per-gene results are held in an LRU
+    # cache since callers repeatedly ask about the same few hundred panel genes; a lookup is discarded
+    # as a whole on reload and so cached results never outlive the data they were built from
+    def __init__(self, input_fps, cache_size=4096):
+        self.input_fps = {k: pathlib.Path(fp) for k, fp in input_fps.items() if fp is not None}
+        for key, required in LOOKUP_INPUTS.items():
+            assert key in self.input_fps or not required
+
+        self.somatic_panel = tables.read_panel(self.input_fps['somatic_panel_fp'])
+        self.germline_panel = tables.read_panel(self.input_fps['germline_panel_fp'])
+        self.ensembl_genes = tables.read_gene_data(self.input_fps['ensembl_gene_data_fp'])
+        self.refseq_genes = tables.read_gene_data(self.input_fps['refseq_gene_data_fp'])
+
+        # Panel genes are keyed by HGNC ID, any identifier of a panel gene maps to that key
+        self.panel_ids = dict()
+        self.somatic_records = self.index_panel(self.somatic_panel)
+        self.germline_records = self.index_panel(self.germline_panel)
+
+        # NOTE(SW): Ensembl gene data IDs are versioned, unversioned IDs are mapped to the versioned ID
+        self.ensembl_unversioned = dict()
+        for record in self.ensembl_genes:
+            self.ensembl_unversioned[transcripts.strip_version(record.ensembl_gene_id)] = record.ensembl_gene_id
+
+        # Panel regions are indexed by position and grouped by gene; gene region BEDs carry only symbols
+        self.region_indexes = dict()
+        self.regions_gene = dict()
+        for source in REGION_SOURCES:
+            if (fp := self.input_fps.get(f'{source}_fp')) is None:
+                continue
+            index = intervals.IntervalIndex.from_bed(fp)
+            regions_gene = collections.defaultdict(list)
+            for contig_intervals, _, _ in index.contigs.values():
+                for interval in contig_intervals:
+                    regions_gene[interval.hgnc_id or interval.symbol].append(interval)
+            self.region_indexes[source] = index
+            self.regions_gene[source] = regions_gene
+
+        self.fusions_gene = collections.defaultdict(list)
+        if (fp := self.input_fps.get('fusion_data_fp')) is not None:
+            for record in tables.read_tsv(fp):
+                # NOTE(SW): promiscuous entries have only a five or three prime gene
+                fusion = {
+                    'type': record.Type,
+                    'five_gene': record.FiveGene or None,
+                    'three_gene': record.ThreeGene or None,
+                }
+                for symbol in {record.FiveGene, record.ThreeGene} - {''}:
+                    self.fusions_gene[symbol].append(fusion)
+
+        self.get_gene = functools.lru_cache(maxsize=cache_size)(self.expand_gene)
+        self.get_gene_regions = functools.lru_cache(maxsize=cache_size)(self.expand_gene_regions)
+
+    def index_panel(self, panel):
+        records = dict()
+        for record in panel:
+            records[record.hgnc_id] = record
+            for column in PANEL_ID_COLUMNS:
+                if (value := getattr(record, column)) in tables.MISSING_VALUES:
+                    continue
+                self.panel_ids.setdefault(value, record.hgnc_id)
+                if column == 'ensembl_gene_id':
+                    self.panel_ids.setdefault(transcripts.strip_version(value), record.hgnc_id)
+        return records
+
+    def resolve(self, identifiers):
+        return [self.get_gene(i) for i in identifiers]
+
+    def regions(self, identifiers):
+        return [self.get_gene_regions(i) for i in identifiers]
+
+    def overlaps(self, queries):
+        # Accepts (contig, start, end) triples with zero-based, half-open coordinates
+        results = list()
+        for contig, start, end in queries:
+            result = {'query': [contig, start, end], 'genes': set()}
+            for source, index in self.region_indexes.items():
+                hits = index.query_range(contig, start, end)
+                result[source] = [format_interval(iv) for iv in hits]
+                result['genes'].update(iv.symbol for iv in hits if iv.symbol)
+            result['genes'] = sorted(result['genes'])
+            results.append(result)
+        return results
+
+    def cache_info(self):
+        return {'genes': self.get_gene.cache_info()._asdict(), 'regions': self.get_gene_regions.cache_info()._asdict()}
+
+    def expand_gene(self, identifier):
+        # Identifiers, panel membership, selected transcripts, and fusions of a single gene
+        ensembl_record, refseq_record, panel_key = self.find_gene(identifier)
+        if ensembl_record is None and refseq_record is None and panel_key is None:
+            return {'query': identifier, 'found': False}
+
+        somatic_record = self.somatic_records.get(panel_key)
+        germline_record = self.germline_records.get(panel_key)
+        panel_record = somatic_record or germline_record
+
+        result = {
+            'query': identifier,
+            'found': True,
+            'hgnc_id': get_value(panel_record, ensembl_record, refseq_record, column='hgnc_id'),
+            'symbol': get_value(panel_record, ensembl_record, refseq_record, column='symbol'),
+            'ensembl_gene_id': get_value(panel_record, ensembl_record, column='ensembl_gene_id'),
+            'ncbi_gene_id': get_value(panel_record, refseq_record, column='ncbi_gene_id'),
+            'somatic_panel': somatic_record is not None,
+            'germline_panel': germline_record is not None,
+            'oncogene': somatic_record.oncogene == 'TRUE' if somatic_record else None,
+            'tsgene': somatic_record.tsgene == 'TRUE' if somatic_record else None,
+            'ensembl_transcript_id': get_value(ensembl_record, column='ensembl_transcript_id'),
+            'mane_transcript_id': get_value(refseq_record, column='mane_transcript_id'),
+        }
+        result['fusions'] = self.fusions_gene.get(result['symbol'], list())
+        return result
+
+    def expand_gene_regions(self, identifier):
+        # Panel regions of a single gene, matched by HGNC ID or, for gene regions, by symbol
+        gene = self.get_gene(identifier)
+        result = {'query': identifier, 'found': gene['found']}
+        if not gene['found']:
+            return result
+
+        result.update({'hgnc_id': gene['hgnc_id'], 'symbol': gene['symbol']})
+        for source, regions_gene in self.regions_gene.items():
+            hits = regions_gene.get(gene['hgnc_id']) or regions_gene.get(gene['symbol'], list())
+            result[source] = [format_interval(iv) for iv in hits]
+        return result
+
+    def find_gene(self, identifier):
+        # Returns Ensembl and RefSeq gene data records along with the panel key of a gene
+        panel_key = self.panel_ids.get(identifier)
+        panel_record = self.somatic_records.get(panel_key) or self.germline_records.get(panel_key)
+
+        if panel_record:
+            ensembl_record = find_record(self.ensembl_genes, {'ensembl_gene_id': panel_record.ensembl_gene_id})
+            refseq_record = find_record(self.refseq_genes, {'ncbi_gene_id': panel_record.ncbi_gene_id})
+        else:
+            identifier = self.ensembl_unversioned.get(identifier, identifier)
+            ensembl_record = find_record(self.ensembl_genes, {c: identifier for c in ENSEMBL_ID_COLUMNS})
+            refseq_record = find_record(self.refseq_genes, {c: identifier for c in REFSEQ_ID_COLUMNS})
+
+            # Match gene data records across sources through the HGNC ID
+            if ensembl_record and not refseq_record:
+                refseq_record = find_record(self.refseq_genes, {'hgnc_id': ensembl_record.hgnc_id})
+            elif refseq_record and not ensembl_record:
+                ensembl_record = find_record(self.ensembl_genes, {'hgnc_id': refseq_record.hgnc_id})
+
+        return ensembl_record, refseq_record, panel_key
+
+
+def find_record(table, values):
+    # First record matching any column and value, in the given order
+    for column, value in values.items():
+        if value in tables.MISSING_VALUES:
+            continue
+        if (records := table.index(column).get(value)):
+            return records[0]
+    return None
+
+
+def get_value(*records, column):
+    # First non-missing value of a column across records, where panels give the symbol per source
+    for record in records:
+        if record is None:
+            continue
+        if column == 'symbol' and not hasattr(record, 'symbol'):
+            value = record.ensembl_gene_symbol if record.ensembl_gene_symbol != 'NA' else record.hgnc_symbol
+        else:
+            value = getattr(record, column, None)
+        if value not in tables.MISSING_VALUES:
+            return value
+    return None
+
+
+def format_interval(interval):
+    return {
+        'contig': interval.contig,
+        'start': interval.start,
+        'end': interval.end,
+        'symbol': interval.symbol,
+        'hgnc_id': interval.hgnc_id,
+        'transcript_id': interval.transcript_id,
+        'feature': interval.feature,
+        'strand': interval.strand,
+    }
@@ -0,0 +1,303 @@
+import itertools
+
+from . import bgzf
+
+
+# Regions are merged within each gene or across all panel genes
+MERGE_MODES = ('gene', 'panel')
+
+# Some genes do not have CDS records or are completely absent from Ensembl 105 and RefSeq 110
+CDS_SKIP_GENES = {
+    'HGNC:3082',  # DUX4L1
+    'HGNC:4713',  # H19
+    'HGNC:5477',  # IGH
+    'HGNC:5715',  # IGK
+    'HGNC:5853',  # IGL
+    'HGNC:9709',  # PVT1
+    'HGNC:11727', # TERC
+    'HGNC:12027', # TRA
+    'HGNC:12155', # TRB
+    'HGNC:31530', # MIR143
+    'HGNC:37054', # VTRNA2-1
+    'HGNC:43959', # PTCSC3
+}
+
+
+def get_somatic_gene_symbols(panel, tsgenes_only=False):
+    # Ensembl symbol where available, otherwise the HGNC symbol
+    symbols = list()
+    for record in panel:
+        if tsgenes_only and record.tsgene != 'TRUE':
+            continue
+        symbols.append(record.ensembl_gene_symbol if record.ensembl_gene_symbol != 'NA' else record.hgnc_symbol)
+    return symbols
+
+
+def get_germline_gene_ids(panel):
+    # Unversioned Ensembl gene IDs, sorted
+    return sorted(r.ensembl_gene_id.split('.')[0] for r in panel if r.ensembl_gene_id != 'NA')
+
+
+def get_gene_regions(panel, ensembl_genes, refseq_genes, contig_order):
+    # Gene data are given as unique indexes of Ensembl and NCBI gene IDs
+    data = list()
+    seen_records = {'gene_records': set(), 'gene_ids': set()}
+    for panel_record in panel:
+
+        # Get Ensembl gene record where available, otherwise get RefSeq/NCBI record
+        if panel_record.ensembl_gene_id != 'NA':
+            gene_id = panel_record.ensembl_gene_id
+            gene_record = ensembl_genes[gene_id]
+        else:
+            gene_id = panel_record.ncbi_gene_id
+            gene_record = refseq_genes[gene_id]
+
+        # Sanity check
+        assert gene_record not in seen_records['gene_records']
+        assert gene_id not in seen_records['gene_ids']
+        seen_records['gene_records'].add(gene_record)
+        seen_records['gene_ids'].add(gene_id)
+
+        data.append((
+            gene_record.contig,
+            # NOTE(SW): BED start position is 0-based
+            gene_record.start - 1,
+            gene_record.end,
+            gene_record.symbol,
+        ))
+
+    # Sort data by chromosome and location
+    return sorted(data, key=lambda k: contig_order.sort_key(k[0], k[1], k[2]))
+
+
+def get_cds_regions(panel, ensembl_cds, refseq_cds, contig_order):
+    # CDS data are given as indexes of HGNC IDs
+    data = list()
+    seen_ids = set()
+    for panel_record in panel:
+
+        if panel_record.hgnc_id in CDS_SKIP_GENES:
+            assert panel_record.hgnc_id not in ensembl_cds
+            assert panel_record.hgnc_id not in refseq_cds
+            continue
+
+        assert panel_record.hgnc_id not in seen_ids
+        seen_ids.add(panel_record.hgnc_id)
+
+        if panel_record.hgnc_id in ensembl_cds:
+            cds_records = ensembl_cds[panel_record.hgnc_id]
+        elif panel_record.hgnc_id in refseq_cds:
+            # NOTE(SW): there are currently no entries where RefSeq but not Ensembl has CDS annotations
+            cds_records = refseq_cds[panel_record.hgnc_id]
+        else:
+            assert False
+
+        assert len({r.hgnc_id for r in cds_records}) == 1
+        data.extend(cds_records)
+
+    # Sort by chromosome and location then format
+    records = sorted(data, key=lambda r: contig_order.sort_key(r.contig, r.start, r.end))
+    return [format_cds_record(r) for r in records]
+
+
+def format_cds_record(record):
+    return (
+        record.contig,
+        # NOTE(SW): BED start position is already adjusted to 0-base in input
+        record.start,
+        record.end,
+        record.name,
+        '.', # BED score field
+        record.strand,
+    )
+
+
+def merge_regions(rows, merge_mode, padding=0):
+    # Merges overlapping or book-ended BED rows either within each gene or across the panel, with each
+    # region first padded on both sides. Rows must be sorted by contig and start, as returned by
+    # get_gene_regions and get_cds_regions, and merged rows are returned in the same order. Merged
+    # rows carry the union of each name field, e.g. all transcript IDs, and a strand only where shared
+    assert merge_mode in MERGE_MODES
+    if not rows:
+        return list()
+
+    merged = list()
+    open_regions = dict()
+    contig = None
+    for row in rows:
+        if row[0] != contig:
+            merged.extend(open_regions.values())
+            open_regions = dict()
+            contig = row[0]
+
+        name_fields = row[3].split(';')
+        key = (name_fields[1] if len(name_fields) > 1 else name_fields[0]) if merge_mode == 'gene' else None
+        start = max(row[1] - padding, 0)
+        end = row[2] + padding
+        strand = row[5] if len(row) > 5 else None
+
+        region = open_regions.get(key)
+        if region is not None and start <= region['end']:
+            region['end'] = max(region['end'], end)
+        else:
+            if region is not None:
+                merged.append(region)
+            region = {'contig': contig, 'start': start, 'end': end, 'names': list(), 'strands': dict()}
+            open_regions[key] = region
+
+        region['names'].append(name_fields)
+        region['strands'][strand] = None
+    merged.extend(open_regions.values())
+
+    # NOTE(SW): regions of different genes close in different order to that in which they open, and so
+    # are sorted by start again within each contig; contigs are already in order
+    contig_ranks = {c: i for i, c in enumerate(dict.fromkeys(row[0] for row in rows))}
+    merged.sort(key=lambda r: (contig_ranks[r['contig']], r['start'], r['end']))
+    return [format_merged_region(r, len(rows[0])) for r in merged]
+
+
+def format_merged_region(region, row_size):
+    name_fields = list()
+    for values in itertools.zip_longest(*region['names'], fillvalue=''):
+        name_fields.append(','.join(v for v in dict.fromkeys(values) if v))
+    row = [region['contig'], region['start'], region['end'], ';'.join(name_fields)]
+
+    # BED score and strand of CDS rows
+    if row_size > 4:
+        strands = list(region['strands'])
+        row.extend(['.', strands[0] if len(strands) == 1 else '.'])
+    return tuple(row)
+
+
+def get_region_stats(rows):
+    # Number of regions and their total length in bases, where overlapping bases are counted repeatedly
+    return len(rows), sum(row[2] - row[1] for row in rows)
+
+
+def get_merged_regions(rows, merge_mode, padding=0):
+    # Merged regions along with a message reporting target size before and after merging
+    region_count, base_count = get_region_stats(rows)
+    merged = merge_regions(rows, merge_mode, padding)
+    region_merged_count, base_merged_count = get_region_stats(merged)
+    message = (
+        f'merged {region_count} regions ({base_count} bp) into {region_merged_count} regions '
+        f'({base_merged_count} bp) by {merge_mode} with {padding} bp padding'
+    )
+    return merged, message
+
+
+def add_merge_arguments(parser):
+    parser.add_argument('--merge', choices=MERGE_MODES)
+    parser.add_argument('--padding', default=0, type=int)
+
+
+def check_merge_arguments(parser, args):
+    if args.padding < 0:
+        parser.error(f'Got invalid padding: {args.padding}')
+    if args.padding and not args.merge:
+        parser.error('Padding requires --merge')
+
+
+def get_hmftools_panel(panel, hartwig_panel):
+    # NOTE(SW): records that are not present in Ensembl 105 have no symbol and are not indexed
+    # Currently: TRA, TRB, IGH, IGK, IGL
+    hartwig_genes = hartwig_panel.unique_index('gene')
+    umccr_genes = dict(panel.unique_index('ensembl_gene_symbol'))
+
+    # Prepare then format data
+    umccr_genes = prepare_hmftools_data(umccr_genes, hartwig_genes)
+    return format_hmftools_data(umccr_genes)
+
+
+def prepare_hmftools_data(umccr_genes, hartwig_genes):
+    # For UMCCR genes with ambiguous role, use the role set by Hartwig where available otherwise
+    # set role as tsgene for now. Some UMCCR genes will have no role, also set role as tsgene for now
+    #
+    # NOTE(SW): using tsgene as default is fine for now since it only impacts the likelihood
+    # calculation, which we are not currently using in our curation process
+    #
+    # Records are replaced inplace
+    for symbol, record in umccr_genes.items():
+        role_none = record.oncogene in {'NA', 'FALSE'} and record.tsgene in {'NA', 'FALSE'}
+        role_ambiguous = record.oncogene == 'TRUE' and record.tsgene == 'TRUE'
+        assert not (role_none and role_ambiguous)
+
+        # Skip resolved gene role
+        if not (role_none or role_ambiguous):
+            continue
+
+        # Default to tsgene if no further information available from Hartwig
+        if record.ensembl_gene_symbol not in hartwig_genes:
+            umccr_genes[symbol] = record._replace(oncogene='FALSE', tsgene='TRUE')
+            continue
+
+        # Apply information from Hartwig
+        hartwig_gene_role = hartwig_genes[record.ensembl_gene_symbol].likelihoodType
+        if hartwig_gene_role == 'ONCO':
+            umccr_genes[symbol] = record._replace(oncogene='TRUE', tsgene='FALSE')
+        elif hartwig_gene_role == 'TSG':
+            umccr_genes[symbol] = record._replace(oncogene='FALSE', tsgene='TRUE')
+        else:
+            assert False
+
+    # NOTE(SW): returning for clarity
+    return umccr_genes
+
+
+def format_hmftools_data(umccr_genes):
+    reportable_somatic_columns = ['true'] * 7
+    reportable_germline_columns = ['ANY'] * 4
+
+    data = list()
+    for record in umccr_genes.values():
+        assert not (record.oncogene == 'TRUE' and record.tsgene == 'TRUE')
+        if record.oncogene == 'TRUE':
+            likelihood_type = 'ONCO'
+        elif record.tsgene == 'TRUE':
+            likelihood_type = 'TSG'
+        else:
+            assert False
+
+        data.append((
+            record.ensembl_gene_symbol,
+            *reportable_somatic_columns,
+            likelihood_type,
+            *reportable_germline_columns,
+            '',
+            'false',
+        ))
+
+    return data
+
+
+def get_transcript_regions(panel, transcripts):
+    # Returns transcripts of panel genes in input order along with any panel genes lacking transcripts
+    gene_ids = {r.ensembl_gene_id for r in panel}
+
+    data = list()
+    genes_seen = set()
+    for record in transcripts.select('gene_id', gene_ids):
+        genes_seen.add(record.gene_id)
+        data.append((record.contig, record.start, record.end, record.name, record.strand))
+
+    return data, gene_ids - genes_seen
+
+
+def write_lines(fp, lines):
+    with fp.open('w') as fh:
+        for line in lines:
+            fh.write(f'{line}\n')
+
+
+def write_table(fp, rows, header=None):
+    # Writes BED and TSV tables, bgzipped with a tabix index for .gz paths
+    if fp.suffix == '.gz':
+        assert header is None
+        fh = bgzf.open_output(fp, columns=(0, 1, 2), zero_based=True)
+    else:
+        fh = fp.open('w')
+
+    with fh:
+        if header:
+            bgzf.write_rows(fh, [header])
+        bgzf.write_rows(fh, rows)
@@ -0,0 +1,270 @@
+import array
+import bisect
+import collections
+import json
+import mmap
+import os
+import pathlib
+import struct
+import sys
+
+
+STORE_MAGIC = b'GPSTORE\0'
+STORE_VERSION = 1
+
+# Columns given a sorted key array for lookups where present in a table
+KEY_COLUMNS = ('hgnc_id', 'gene_id', 'ensembl_gene_id', 'ncbi_gene_id', 'symbol', 'transcript_id')
+
+# String ID of absent values, e.g. the feature field of transcript BED rows
+NONE_ID = 2 ** 32 - 1
+
+# Sections are aligned so that each can be cast to its array type in place. Integer columns and string
+# offsets are 32-bit where values allow
+SECTION_ALIGNMENT = 8
+
+HEADER_PREFIX = struct.Struct('<8sI')
+
+
+class Store:
+
+    # NOTE(SW): a store is a read-only packed table: fixed-width integer columns, string columns as
+    # IDs into a single sorted string table, and for each key column the row numbers sorted by value.
+    # The file is mapped into memory and sections are used in place, so opening a store reads only
+    # the header and processes opening the same store share its pages. Rows are built only when
+    # returned by a lookup or iteration
+    def __init__(self, fp):
+        self.fp = pathlib.Path(fp)
+        with self.fp.open('rb') as fh:
+            self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = HEADER_PREFIX.unpack_from(self.mm)
+        if magic != STORE_MAGIC:
+            raise ValueError(f'Not a resource store: {self.fp}')
+        header = json.loads(self.mm[HEADER_PREFIX.size:HEADER_PREFIX.size + header_size])
+        if header['version'] != STORE_VERSION:
+            raise ValueError(f'Got unsupported store version {header["version"]}, expected {STORE_VERSION}: {self.fp}')
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f'Store was written with {header["byteorder"]} byte order: {self.fp}')
+
+        view = memoryview(self.mm)
+        self.sections = dict()
+        for name, (offset, size, typecode) in header['sections'].items():
+            self.sections[name] = view[offset:offset + size].cast(typecode)
+
+        self.columns = tuple(header['columns'])
+        self.int_columns = set(header['int_columns'])
+        self.duplicate_keys = header['duplicate_keys']
+        self.row_count = header['row_count']
+        self.row_type = collections.namedtuple('Row', self.columns, rename=True)
+        self.indexes = dict()
+
+        self.column_data = [(self.sections[f'column:{c}'], c in self.int_columns) for c in self.columns]
+        self.string_offsets = self.sections['string_offsets']
+        self.strings_start = header['sections']['strings'][0]
+        self.string_count = len(self.string_offsets) - 1
+        self.strings = dict()
+
+    def __iter__(self):
+        return map(self.get_row, range(self.row_count))
+
+    def __len__(self):
+        return self.row_count
+
+    def index(self, column):
+        # Maps each value to all rows containing it, in input order
+        key = (column, False)
+        if key not in self.indexes:
+            self.indexes[key] = StoreIndex(self, column, unique=False)
+        return self.indexes[key]
+
+    def unique_index(self, column):
+        # Maps each value to the single row containing it
+        key = (column, True)
+        if key not in self.indexes:
+            if (value := self.duplicate_keys.get(column)) is not None:
+                raise ValueError(f'Got duplicate value in {column} column: {value}')
+            self.indexes[key] = StoreIndex(self, column, unique=True)
+        return self.indexes[key]
+
+    def select(self, column, values):
+        # Returns rows with any of the given values in input order
+        index = self.index(column)
+        row_numbers = list()
+        for value in values:
+            start, end = index.find(value)
+            row_numbers.extend(index.row_numbers[start:end])
+        return [self.get_row(n) for n in sorted(row_numbers)]
+
+    def get_row(self, row_number):
+        values = list()
+        for data, is_int in self.column_data:
+            values.append(data[row_number] if is_int else self.get_string(data[row_number]))
+        return self.row_type._make(values)
+
+    def get_string(self, string_id):
+        # NOTE(SW): decoded strings are kept so that rows share a single object for repeated values
+        if string_id == NONE_ID:
+            return None
+        if (value := self.strings.get(string_id)) is None:
+            value = self.get_string_bytes(string_id).decode()
+            self.strings[string_id] = value
+        return value
+
+    def get_string_bytes(self, string_id):
+        start = self.strings_start + self.string_offsets[string_id]
+        end = self.strings_start + self.string_offsets[string_id + 1]
+        return self.mm[start:end]
+
+    def find_string(self, value):
+        # Returns the ID of a string by binary search of the sorted string table, or None if absent
+        if not isinstance(value, str):
+            return None
+        value_bytes = value.encode()
+        i = bisect.bisect_left(range(self.string_count), value_bytes, key=self.get_string_bytes)
+        if i < self.string_count and self.get_string_bytes(i) == value_bytes:
+            return i
+        return None
+
+
+class StoreIndex:
+
+    # Lookups bisect the row numbers of a key column, which are sorted by string ID and so by value
+    def __init__(self, store, column, unique):
+        if f'key:{column}' not in store.sections:
+            raise ValueError(f'Column {column} is not a key column of store {store.fp}')
+        self.store = store
+        self.column = column
+        self.unique = unique
+        self.row_numbers = store.sections[f'key:{column}']
+        self.column_ids = store.sections[f'column:{column}']
+
+    def __contains__(self, value):
+        start, end = self.find(value)
+        return start < end
+
+    def __getitem__(self, value):
+        start, end = self.find(value)
+        if start == end:
+            raise KeyError(value)
+        if self.unique:
+            return self.store.get_row(self.row_numbers[start])
+        return [self.store.get_row(self.row_numbers[i]) for i in range(start, end)]
+
+    def get(self, value, default=None):
+        try:
+            return self[value]
+        except KeyError:
+            return default
+
+    def find(self, value):
+        if (string_id := self.store.find_string(value)) is None:
+            return 0, 0
+        start = bisect.bisect_left(self.row_numbers, string_id, key=self.column_ids.__getitem__)
+        end = bisect.bisect_right(self.row_numbers, string_id, lo=start, key=self.column_ids.__getitem__)
+        return start, end
+
+
+def open_store(fp):
+    return Store(fp)
+
+
+def is_store(fp):
+    return pathlib.Path(fp).suffix == '.store'
+
+
+def write_store(fp, table, key_columns=KEY_COLUMNS, missing_values=()):
+    # Packs a table into a store. Columns holding only integers are stored as integers and all others
+    # as strings. Key values in missing_values are not indexed, matching Table.index
+    assert array.array('i').itemsize == array.array('I').itemsize == 4
+    fp = pathlib.Path(fp)
+    columns = tuple(table.columns)
+    rows = list(table)
+    key_columns = [c for c in key_columns if c in columns]
+
+    int_columns = list()
+    for i, column in enumerate(columns):
+        if rows and all(isinstance(row[i], int) for row in rows):
+            int_columns.append(column)
+
+    # NOTE(SW): strings are sorted so that string IDs order as their values, and UTF-8 byte order
+    # matches code point order
+    strings = sorted({row[i] for row in rows for i, c in enumerate(columns) if c not in int_columns} - {None})
+    string_ids = {s: i for i, s in enumerate(strings)}
+    string_bytes = [s.encode() for s in strings]
+
+    string_offsets = [0]
+    for value in string_bytes:
+        string_offsets.append(string_offsets[-1] + len(value))
+    string_offsets = array.array('I' if string_offsets[-1] < 2 ** 32 else 'Q', string_offsets)
+
+    sections = {'string_offsets': string_offsets, 'strings': array.array('B', b''.join(string_bytes))}
+    for i, column in enumerate(columns):
+        if column in int_columns:
+            values = [row[i] for row in rows]
+            typecode = 'i' if -2 ** 31 <= min(values) and max(values) < 2 ** 31 else 'q'
+            sections[f'column:{column}'] = array.array(typecode, values)
+        else:
+            sections[f'column:{column}'] = array.array('I', (get_string_id(row[i], string_ids) for row in rows))
+
+    duplicate_keys = dict()
+    for column in key_columns:
+        column_ids = sections[f'column:{column}']
+        row_numbers = [n for n, row in enumerate(rows) if row[columns.index(column)] not in missing_values]
+        row_numbers.sort(key=column_ids.__getitem__)
+        sections[f'key:{column}'] = array.array('I', row_numbers)
+        duplicate_keys[column] = get_first_duplicate(row_numbers, column_ids, strings)
+
+    # Set section offsets after the header, which is padded to the section alignment
+    header = {
+        'version': STORE_VERSION,
+        'byteorder': sys.byteorder,
+        'columns': columns,
+        'int_columns': int_columns,
+        'row_count': len(rows),
+        'duplicate_keys': duplicate_keys,
+        'sections': dict(),
+    }
+    header_size = get_header_size(header, sections)
+    offset = header_size
+    for name, data in sections.items():
+        size = len(data) * data.itemsize
+        header['sections'][name] = (offset, size, data.typecode)
+        offset = align(offset + size)
+    header_bytes = json.dumps(header).encode().ljust(header_size - HEADER_PREFIX.size)
+    assert HEADER_PREFIX.size + len(header_bytes) == header_size
+
+    # Write to a temporary file first so that readers never open a partially written store
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fp = fp.with_name(f'.{fp.name}.{os.getpid()}.tmp')
+    with tmp_fp.open('wb') as fh:
+        fh.write(HEADER_PREFIX.pack(STORE_MAGIC, len(header_bytes)))
+        fh.write(header_bytes)
+        for name, data in sections.items():
+            offset = header['sections'][name][0]
+            fh.write(b'\0' * (offset - fh.tell()))
+            data.tofile(fh)
+    tmp_fp.replace(fp)
+
+
+def get_header_size(header, sections):
+    # NOTE(SW): header size depends on the section offsets it records, so offsets are first set with
+    # placeholder values at least as wide as any final offset
+    placeholder_header = dict(header, sections={n: (2 ** 63, 2 ** 63, d.typecode) for n, d in sections.items()})
+    return align(HEADER_PREFIX.size + len(json.dumps(placeholder_header).encode()))
+
+
+def get_string_id(value, string_ids):
+    return NONE_ID if value is None else string_ids[value]
+
+
+def get_first_duplicate(row_numbers, column_ids, strings):
+    # Value of the earliest row repeating a value of a previous row, as reported by Table.unique_index
+    duplicate_row_numbers = list()
+    for row_number_a, row_number_b in zip(row_numbers, row_numbers[1:]):
+        if column_ids[row_number_a] == column_ids[row_number_b]:
+            duplicate_row_numbers.append(row_number_b)
+    return strings[column_ids[min(duplicate_row_numbers)]] if duplicate_row_numbers else None
+
+
+def align(offset):
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
@@ -0,0 +1,80 @@
+import sys
+
+
+class PanelSweep:
+
+    # NOTE(SW): panel intervals are read from a sorted stream in step with sorted queries. Intervals
+    # are taken from the stream once they start before the end of a query and are dropped once they
+    # end before the start of a query, so only intervals near the current position are held. Queries
+    # and intervals must be sorted by the same contig order and then by start. Coordinates are
+    # zero-based and half-open
+    def __init__(self, panel_intervals, contig_order, padding=0):
+        self.panel_intervals = iter(panel_intervals)
+        self.contig_order = contig_order
+        self.padding = padding
+
+        self.contig = None
+        self.contig_rank = None
+        self.query_start = None
+        self.active = list()
+
+        self.next_interval = None
+        self.next_rank = None
+        self.advance()
+
+    def advance(self):
+        # Takes the next panel interval from the stream, applying padding and checking order
+        previous_key = (self.next_rank, self.next_interval.start) if self.next_interval else None
+
+        if (interval := next(self.panel_intervals, None)) is None:
+            self.next_interval = None
+            return
+
+        if self.padding:
+            interval = interval._replace(start=max(interval.start - self.padding, 0), end=interval.end + self.padding)
+
+        self.next_interval = interval
+        self.next_rank = self.contig_order.rank(interval.contig)
+        if previous_key and (self.next_rank, interval.start) < previous_key:
+            raise ValueError(f'Panel intervals are not sorted, see {interval.contig}:{interval.start}')
+
+    def query(self, contig, start, end):
+        # Returns panel intervals overlapping the query in panel order
+        if contig != self.contig:
+            self.set_contig(contig)
+        elif start < self.query_start:
+            raise ValueError(f'Input is not sorted, see {contig}:{start}')
+        self.query_start = start
+
+        # Take intervals starting before the query end, skipping those of preceding contigs
+        while self.next_interval is not None and self.next_rank <= self.contig_rank:
+            if self.next_rank == self.contig_rank:
+                if self.next_interval.start >= end:
+                    break
+                self.active.append(self.next_interval)
+            self.advance()
+
+        if not self.active:
+            return list()
+
+        # Drop intervals that no later query can reach
+        if any(iv.end <= start for iv in self.active):
+            self.active = [iv for iv in self.active if iv.end > start]
+        return [iv for iv in self.active if iv.start < end]
+
+    def set_contig(self, contig):
+        contig_rank = self.contig_order.rank(contig)
+        if self.contig_rank is not None and contig_rank <= self.contig_rank:
+            raise ValueError(f'Input is not sorted by contig, got {contig} after {self.contig}')
+        self.contig = contig
+        self.contig_rank = contig_rank
+        self.active = list()
+
+    def get_clear_end(self):
+        # End of the span following the last query over which no panel interval lies, allowing callers
+        # to skip queries for records within it. Must be called directly after a query
+        if self.active:
+            return self.query_start
+        if self.next_interval is None or self.next_rank != self.contig_rank:
+            return sys.maxsize
+        return self.next_interval.start
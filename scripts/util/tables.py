@@ -0,0 +1,191 @@
+import collections
+import gzip
+import pathlib
+import sys
+
+from . import store
+
+
+# Values treated as absent when building indexes
+MISSING_VALUES = {'NA', '', None}
+
+# Region BEDs carry gene/transcript details in the name column as
+# symbol;hgnc_id;gene_id;transcript_id[;feature]
+REGION_BED_COLUMNS = ('contig', 'start', 'end', 'name', 'strand')
+REGION_NAME_FIELDS = ('symbol', 'hgnc_id', 'gene_id', 'transcript_id', 'feature')
+
+# Leading lines of BEDs from other sources, e.g. track lines for genome browsers
+BED_HEADER_PREFIXES = ('#', 'track', 'browser')
+
+# Columns with few distinct values, interned so that rows share a single string object
+INTERN_COLUMNS = {'contig', 'strand', 'oncogene', 'tsgene', 'feature'}
+
+RegionRow = collections.namedtuple('RegionRow', (*REGION_BED_COLUMNS, *REGION_NAME_FIELDS))
+
+
+class Table:
+
+    # NOTE(SW): rows are stored as namedtuples, which hold far less memory than one dict per row.
+    # Indexes are built on first use and kept for subsequent lookups
+    def __init__(self, columns, rows, row_type=None):
+        self.columns = tuple(columns)
+        self.row_type = row_type or collections.namedtuple('Row', self.columns, rename=True)
+        self.rows = rows
+        self.indexes = dict()
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def index(self, column):
+        # Maps each value to all rows containing it, in input order
+        key = (column, False)
+        if key not in self.indexes:
+            index = dict()
+            for row in self.rows:
+                value = getattr(row, column)
+                if value in MISSING_VALUES:
+                    continue
+                if value not in index:
+                    index[value] = list()
+                index[value].append(row)
+            self.indexes[key] = index
+        return self.indexes[key]
+
+    def select(self, column, values):
+        # Returns rows with any of the given values in input order
+        values = set(values)
+        return [row for row in self.rows if getattr(row, column) in values]
+
+    def unique_index(self, column):
+        # Maps each value to the single row containing it
+        key = (column, True)
+        if key not in self.indexes:
+            index = dict()
+            for row in self.rows:
+                value = getattr(row, column)
+                if value in MISSING_VALUES:
+                    continue
+                if value in index:
+                    raise ValueError(f'Got duplicate value in {column} column: {value}')
+                index[value] = row
+            self.indexes[key] = index
+        return self.indexes[key]
+
+
+def read_tsv(fp, int_columns=()):
+    # Reads a TSV with a header line, converting the given columns to integers
+    with open_text(fp) as fh:
+        columns, row_type, rows = parse_tsv(fh, int_columns)
+        return Table(columns, list(rows), row_type)
+
+
+def parse_tsv(fh, int_columns=()):
+    # Returns columns and row type from the header line along with an iterator over rows, which are
+    # read from the file handle only as consumed
+    columns = fh.readline().rstrip('\n').split('\t')
+    row_type = collections.namedtuple('Row', columns, rename=True)
+    converters = get_converters(columns, int_columns)
+
+    def row_iterator():
+        for line in fh:
+            values = line.rstrip('\n').split('\t')
+            assert len(values) == len(columns)
+            yield row_type._make(convert_values(values, converters))
+
+    return columns, row_type, row_iterator()
+
+
+def read_panel(fp):
+    return read_tsv(fp)
+
+
+def read_gene_data(fp):
+    if store.is_store(fp):
+        return store.open_store(fp)
+    return read_tsv(fp, int_columns=('start', 'end'))
+
+
+def read_region_bed(fp):
+    # Reads the transcript and CDS BEDs written by compile_annotation_data.py and the panel scripts.
+    # Coordinates are kept as zero-based, half-open BED positions
+    if store.is_store(fp):
+        return store.open_store(fp)
+    rows = list(iter_region_bed(fp))
+    return Table(RegionRow._fields, rows, RegionRow)
+
+
+def iter_region_bed(fp):
+    # Yields region BED rows as read, for streaming consumers
+    with open_text(fp) as fh:
+        yield from parse_region_bed(fh)
+
+
+def parse_region_bed(fh):
+    # Yields region BED rows from the file handle as consumed. Header and blank lines are skipped, and
+    # name and strand are optional for BEDs from other sources
+    converters = get_converters(RegionRow._fields, ('start', 'end'))
+    for line in fh:
+        if line.startswith(BED_HEADER_PREFIXES) or not (line := line.rstrip('\n')):
+            continue
+
+        # NOTE(SW): strand is the fifth column for transcript BEDs and the sixth for CDS BEDs, where the
+        # fifth column is the BED score. A final column not holding a strand is a score
+        contig, start, end, *other = line.split('\t')
+        name = other[0] if other else None
+        strand = other[-1] if len(other) > 1 and other[-1] in {'+', '-'} else None
+
+        name_fields = name.split(';')[:len(REGION_NAME_FIELDS)] if name else list()
+        name_fields.extend([None] * (len(REGION_NAME_FIELDS) - len(name_fields)))
+
+        values = (contig, start, end, name, strand, *name_fields)
+        yield RegionRow._make(convert_values(values, converters))
+
+
+def read_resource(fp):
+    # Reads gene data TSVs and region BEDs by file suffix
+    fp = pathlib.Path(fp)
+    suffix = pathlib.Path(fp.stem).suffix if fp.suffix == '.gz' else fp.suffix
+    if store.is_store(fp):
+        return store.open_store(fp)
+    elif suffix == '.bed':
+        return read_region_bed(fp)
+    elif suffix == '.tsv':
+        return read_gene_data(fp)
+    else:
+        raise ValueError(f'Got unsupported resource file type: {fp}')
+
+
+def write_resource_store(fp, table):
+    store.write_store(fp, table, missing_values=MISSING_VALUES)
+
+
+def open_text(fp):
+    # Bgzipped outputs can be read directly with gzip
+    fp = pathlib.Path(fp)
+    return gzip.open(fp, 'rt') if fp.suffix == '.gz' else fp.open('r')
+
+
+def get_converters(columns, int_columns):
+    for column in int_columns:
+        assert column in columns
+
+    converters = list()
+    for column in columns:
+        if column in int_columns:
+            converters.append(int)
+        elif column in INTERN_COLUMNS:
+            converters.append(intern_value)
+        else:
+            converters.append(None)
+    return converters
+
+
+def convert_values(values, converters):
+    return [v if c is None else c(v) for v, c in zip(values, converters)]
+
+
+def intern_value(value):
+    return value if value is None else sys.intern(value)
@@ -0,0 +1,119 @@
+import collections
+import sys
+
+from . import tables
+
+
+# APPRIS annotation classes of transcripts retained for annotation compilation
+APPRIS_SELECTED_CLASSES = ('PRINCIPAL', 'ALTERNATIVE')
+
+TranscriptInfo = collections.namedtuple('TranscriptInfo', ('transcript_id', 'gene_id', 'appris', 'mane_select'))
+
+
+class TranscriptIndex:
+
+    # NOTE(SW): transcripts are keyed by ID exactly as given in each source. APPRIS has versioned
+    # transcripts for RefSeq but not Ensembl, so a lookup first tries the form that most stored IDs take
+    # and only strips or keeps the version as a fallback. For either source most lookups need one probe
+    def __init__(self):
+        self.records = dict()
+        self.versioned_count = 0
+        self.unversioned_first = False
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, transcript_id):
+        return self.get(transcript_id) is not None
+
+    def get(self, transcript_id):
+        # Matches on either the given ID or the ID with any version removed
+        records = self.records
+        if self.unversioned_first:
+            return records.get(strip_version(transcript_id)) or records.get(transcript_id)
+        return records.get(transcript_id) or records.get(strip_version(transcript_id))
+
+    def add(self, transcript_id, **attributes):
+        # Sets the given attributes, retaining any previously set from other sources
+        if (record := self.records.get(transcript_id)) is None:
+            record = TranscriptInfo(sys.intern(transcript_id), None, None, False)
+            if strip_version(transcript_id) != transcript_id:
+                self.versioned_count += 1
+            self.unversioned_first = self.versioned_count * 2 < len(self.records) + 1
+
+        self.records[transcript_id] = record._replace(**attributes)
+
+    def is_appris(self, transcript_id):
+        return (record := self.get(transcript_id)) is not None and record.appris is not None
+
+    def is_mane_select(self, transcript_id):
+        return (record := self.get(transcript_id)) is not None and record.mane_select
+
+
+def strip_version(transcript_id):
+    # Equivalent to removing r'\.\d+$'
+    base, sep, version = transcript_id.rpartition('.')
+    return base if sep and version.isdecimal() else transcript_id
+
+
+def read_appris(fp, index=None):
+    # Adds principal and alternative APPRIS transcripts with their annotation, e.g. PRINCIPAL:1
+    if index is None:
+        index = TranscriptIndex()
+
+    seen = set()
+    with tables.open_text(fp) as fh:
+        header_tokens = fh.readline().rstrip().split('\t')
+        transcript_column = header_tokens.index('Transcript ID')
+        annotation_column = header_tokens.index('APPRIS Annotation')
+
+        for line in fh:
+            tokens = line.rstrip().split('\t')
+            if len(tokens) <= annotation_column or not (annotation := tokens[annotation_column]):
+                continue
+
+            if annotation.startswith(APPRIS_SELECTED_CLASSES):
+                transcript_id = tokens[transcript_column]
+                assert transcript_id not in seen
+                seen.add(transcript_id)
+                index.add(transcript_id, appris=sys.intern(annotation))
+
+    return index
+
+
+def read_mane_select(fp, index=None):
+    # Adds MANE Select transcripts from a headerless NCBI gene ID and RefSeq transcript ID table
+    if index is None:
+        index = TranscriptIndex()
+
+    with tables.open_text(fp) as fh:
+        for line in fh:
+            gene_id, transcript_id = line.rstrip('\n').split('\t')
+            index.add(transcript_id, gene_id=gene_id, mane_select=True)
+
+    return index
+
+
+def read_gene_data_transcripts(fp, index=None):
+    # Adds the transcript of each gene in Ensembl or RefSeq gene data, where RefSeq gene data gives the
+    # MANE Select transcript
+    if index is None:
+        index = TranscriptIndex()
+
+    table = tables.read_gene_data(fp)
+    if 'ensembl_transcript_id' in table.columns:
+        transcript_column, gene_column, mane_select = 'ensembl_transcript_id', 'ensembl_gene_id', False
+    elif 'mane_transcript_id' in table.columns:
+        transcript_column, gene_column, mane_select = 'mane_transcript_id', 'ncbi_gene_id', True
+    else:
+        raise ValueError(f'No transcript ID column found in gene data: {fp}')
+
+    for record in table:
+        if (transcript_id := getattr(record, transcript_column)) in tables.MISSING_VALUES:
+            continue
+        attributes = {'gene_id': getattr(record, gene_column)}
+        if mane_select:
+            attributes['mane_select'] = True
+        index.add(transcript_id, **attributes)
+
+    return index
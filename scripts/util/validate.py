@@ -0,0 +1,174 @@
+import collections
+
+from . import panel_data
+from . import tables
+
+
+# Table kinds: gene data TSVs have one-based coordinates, region BEDs zero-based, and panels none
+TABLE_KINDS = ('gene_data', 'region_bed', 'panel')
+
+# Examples of each failed check retained for the report
+MAX_EXAMPLES = 5
+
+
+class ValidationReport:
+
+    # NOTE(SW): checks record failures rather than raising so that a single run reports every
+    # problem across all inputs. Errors fail validation while warnings, e.g. a symbol that differs
+    # between Ensembl and RefSeq, are reported only
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.examples = collections.defaultdict(list)
+        self.tables = dict()
+
+    def add(self, level, name, check, message):
+        key = (level, name, check)
+        self.counts[key] += 1
+        if len(self.examples[key]) < MAX_EXAMPLES:
+            self.examples[key].append(message)
+
+    def error(self, name, check, message):
+        self.add('error', name, check, message)
+
+    def warning(self, name, check, message):
+        self.add('warning', name, check, message)
+
+    def error_count(self):
+        return sum(n for (level, _, _), n in self.counts.items() if level == 'error')
+
+    def to_dict(self):
+        return {
+            'tables': self.tables,
+            'errors': self.error_count(),
+            'warnings': sum(n for (level, _, _), n in self.counts.items() if level == 'warning'),
+            'failures': [
+                {'level': level, 'table': name, 'check': check, 'count': n, 'examples': self.examples[(level, name, check)]}
+                for (level, name, check), n in sorted(self.counts.items())
+            ],
+        }
+
+
+def validate_table(name, fp, kind, id_columns, contig_order, report):
+    # Checks a table in a single pass, returning its rows for cross-table checks. Records are checked
+    # for exact duplicates by their full value tuple, and each ID column for repeated values
+    assert kind in TABLE_KINDS
+
+    rows = list()
+    records_seen = set()
+    ids_seen = {c: set() for c in id_columns}
+    previous_key = None
+    with tables.open_text(fp) as fh:
+        if kind == 'region_bed':
+            row_iterator = tables.parse_region_bed(fh)
+        else:
+            int_columns = ('start', 'end') if kind == 'gene_data' else ()
+            _, _, row_iterator = tables.parse_tsv(fh, int_columns)
+
+        for i, row in enumerate(row_iterator, 1):
+            rows.append(row)
+            location = f'line {i + (0 if kind == "region_bed" else 1)}'
+
+            if row in records_seen:
+                report.error(name, 'duplicate_record', f'{location}: {format_row(row)}')
+            records_seen.add(row)
+
+            # NOTE(SW): IDs of coordinate tables are unique within each contig, as RefSeq gives PAR genes
+            # the same ID on chrX and chrY
+            for column, values_seen in ids_seen.items():
+                if (value := getattr(row, column)) in tables.MISSING_VALUES:
+                    continue
+                key = value if kind == 'panel' else (row.contig, value)
+                if key in values_seen:
+                    report.error(name, f'duplicate_{column}', f'{location}: {value}')
+                values_seen.add(key)
+
+            if kind == 'panel':
+                continue
+
+            # Coordinates must be positive, non-empty, and in a known contig
+            first_base = 1 if kind == 'gene_data' else 0
+            if row.start < first_base or row.end < row.start or (kind == 'region_bed' and row.end == row.start):
+                report.error(name, 'invalid_coordinates', f'{location}: {row.contig}:{row.start}-{row.end}')
+            # Records on contigs outside the contig order are not used by the panel outputs and are reported
+            # without failing validation
+            if row.contig not in contig_order:
+                report.warning(name, 'unknown_contig', f'{location}: {row.contig}')
+                continue
+
+            # NOTE(SW): all compiled resources and panel outputs are written sorted by contig and start
+            key = contig_order.start_key(row.contig, row.start)
+            if previous_key is not None and key < previous_key:
+                report.error(name, 'unsorted', f'{location}: {row.contig}:{row.start}')
+            previous_key = key
+
+    report.tables[name] = {'fp': str(fp), 'kind': kind, 'records': len(rows)}
+    return rows
+
+
+def validate_gene_data(ensembl_genes, refseq_genes, report):
+    # Genes sharing an HGNC ID are expected to agree on symbol and contig across Ensembl and RefSeq
+    refseq_hgnc = {r.hgnc_id: r for r in refseq_genes if r.hgnc_id not in tables.MISSING_VALUES}
+    for record in ensembl_genes:
+        if (refseq_record := refseq_hgnc.get(record.hgnc_id)) is None:
+            continue
+        if record.symbol != refseq_record.symbol:
+            message = f'{record.hgnc_id}: {record.symbol} (Ensembl) vs {refseq_record.symbol} (RefSeq)'
+            report.warning('gene_data', 'symbol_mismatch', message)
+        if record.contig != refseq_record.contig:
+            message = f'{record.hgnc_id}: {record.contig} (Ensembl) vs {refseq_record.contig} (RefSeq)'
+            report.warning('gene_data', 'contig_mismatch', message)
+
+
+def validate_panel(name, panel, ensembl_genes, refseq_genes, report):
+    # Panel genes must be present in gene data with the same HGNC ID, where a gene is taken from RefSeq
+    # only when it has no Ensembl ID
+    ensembl_ids = {r.ensembl_gene_id: r for r in ensembl_genes}
+    refseq_ids = {r.ncbi_gene_id: r for r in refseq_genes}
+    for record in panel:
+        for gene_id, records, source in (
+            (record.ensembl_gene_id, ensembl_ids, 'ensembl'),
+            (record.ncbi_gene_id, refseq_ids, 'refseq'),
+        ):
+            if gene_id in tables.MISSING_VALUES:
+                continue
+            if (gene_record := records.get(gene_id)) is None:
+                required = source == 'ensembl' or record.ensembl_gene_id in tables.MISSING_VALUES
+                level = 'error' if required else 'warning'
+                report.add(level, name, f'missing_{source}_gene', f'{record.hgnc_id}: {gene_id}')
+            elif gene_record.hgnc_id != record.hgnc_id:
+                message = f'{gene_id}: {record.hgnc_id} (panel) vs {gene_record.hgnc_id} ({source})'
+                report.error(name, f'{source}_hgnc_id_mismatch', message)
+
+
+def validate_somatic_outputs(panel, gene_regions, cds_regions, report):
+    # Each somatic panel gene has one gene region and CDS regions unless listed as lacking CDS, and
+    # outputs have no genes absent from the panel
+    if gene_regions is not None:
+        symbols = {r.symbol for r in gene_regions}
+        if len(gene_regions) != len(panel):
+            message = f'{len(gene_regions)} gene regions for {len(panel)} panel genes'
+            report.error('gene_regions', 'gene_count_mismatch', message)
+        panel_symbols = {r.ensembl_gene_symbol for r in panel} | {r.hgnc_symbol for r in panel}
+        for symbol in sorted(symbols - panel_symbols):
+            report.error('gene_regions', 'gene_not_in_panel', symbol)
+
+    if cds_regions is not None:
+        hgnc_ids = {r.hgnc_id for r in cds_regions}
+        panel_hgnc_ids = {r.hgnc_id for r in panel}
+        for hgnc_id in sorted(hgnc_ids - panel_hgnc_ids):
+            report.error('cds_regions', 'gene_not_in_panel', hgnc_id)
+        for hgnc_id in sorted(panel_hgnc_ids - hgnc_ids - panel_data.CDS_SKIP_GENES):
+            report.error('cds_regions', 'panel_gene_missing', hgnc_id)
+
+
+def validate_germline_outputs(panel, transcript_regions, report):
+    gene_ids = {r.gene_id for r in transcript_regions}
+    panel_gene_ids = {r.ensembl_gene_id for r in panel} - tables.MISSING_VALUES
+    for gene_id in sorted(gene_ids - panel_gene_ids):
+        report.error('transcript_regions', 'gene_not_in_panel', gene_id)
+    for gene_id in sorted(panel_gene_ids - gene_ids):
+        report.error('transcript_regions', 'panel_gene_missing', gene_id)
+
+
+def format_row(row):
+    return '\t'.join('NA' if v is None else str(v) for v in row[:5])
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import pathlib
+import sys
+
+from util import contigs
+from util import validate
+
+
+REPO_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+# Input tables with their kind and the columns expected to hold unique values, where CDS regions and
+# gene data of genes spanning multiple transcripts share IDs across records
+VALIDATE_INPUTS = {
+    'ensembl_gene_data': ('gene_data', ('ensembl_gene_id',)),
+    'refseq_gene_data': ('gene_data', ('ncbi_gene_id',)),
+    'ensembl_genes': ('gene_data', ('gene_id',)),
+    'refseq_genes': ('gene_data', ('gene_id',)),
+    'ensembl_transcripts': ('region_bed', ('transcript_id',)),
+    'refseq_transcripts': ('region_bed', ('transcript_id',)),
+    'ensembl_cds': ('region_bed', ()),
+    'refseq_cds': ('region_bed', ()),
+    'somatic_panel': ('panel', ('hgnc_id', 'ensembl_gene_id', 'ncbi_gene_id')),
+    'germline_panel': ('panel', ('hgnc_id', 'ensembl_gene_id', 'ncbi_gene_id')),
+    'gene_regions': ('region_bed', ('symbol',)),
+    'cds_regions': ('region_bed', ()),
+    'transcript_regions': ('region_bed', ('transcript_id',)),
+}
+
+DEFAULT_INPUT_FPS = {
+    'ensembl_gene_data': REPO_DIR / 'resources/ensembl_gene_data.tsv',
+    'refseq_gene_data': REPO_DIR / 'resources/refseq_gene_data.tsv',
+    'ensembl_genes': REPO_DIR / 'resources/ensembl.genes.tsv',
+    'refseq_genes': REPO_DIR / 'resources/refseq.genes.tsv',
+    'ensembl_transcripts': REPO_DIR / 'resources/ensembl.transcripts.bed',
+    'refseq_transcripts': REPO_DIR / 'resources/refseq.transcripts.bed',
+    'ensembl_cds': REPO_DIR / 'resources/ensembl.cds.bed',
+    'refseq_cds': REPO_DIR / 'resources/refseq.cds.bed',
+    'somatic_panel': REPO_DIR / 'somatic_panel/3_final_panel/final_panel.tsv',
+    'germline_panel': REPO_DIR / 'germline_panel/2_final_panel/final_panel.tsv',
+    'gene_regions': REPO_DIR / 'somatic_panel/4_panel_data/output/umccr_cancer_genes.gene_regions.bed',
+    'cds_regions': REPO_DIR / 'somatic_panel/4_panel_data/output/umccr_cancer_genes.cds_regions.bed',
+    'transcript_regions': REPO_DIR / 'germline_panel/3_panel_data/output/umccr_predisposition_genes.transcript_regions.bed',
+}
+
+# Inputs required for cross-table checks
+REQUIRED_INPUTS = ('ensembl_gene_data', 'refseq_gene_data', 'somatic_panel', 'germline_panel')
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contig_order_fp', type=pathlib.Path)
+    parser.add_argument('--report_fp', type=pathlib.Path)
+    for name, fp in DEFAULT_INPUT_FPS.items():
+        parser.add_argument(f'--{name}_fp', default=fp, type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    if args.contig_order_fp and not args.contig_order_fp.exists():
+        parser.error(f'Input file {args.contig_order_fp} does not exist')
+    for name in VALIDATE_INPUTS:
+        fp = getattr(args, f'{name}_fp')
+        if fp.exists():
+            continue
+        if name in REQUIRED_INPUTS or fp != DEFAULT_INPUT_FPS[name]:
+            parser.error(f'Input file {fp} does not exist')
+        # NOTE(SW): CDS BEDs are not committed and panel outputs may not have been generated yet,
+        # these are skipped where absent
+        setattr(args, f'{name}_fp', None)
+
+    return args
+
+
+def main():
+    # Get command line arguments
+    args = get_arguments()
+
+    if args.contig_order_fp:
+        contig_order = contigs.ContigOrder.from_file(args.contig_order_fp)
+    else:
+        contig_order = contigs.ContigOrder()
+
+    # Check each table in a single pass, keeping rows for cross-table checks
+    report = validate.ValidationReport()
+    data = dict()
+    for name, (kind, id_columns) in VALIDATE_INPUTS.items():
+        if (fp := getattr(args, f'{name}_fp')) is None:
+            continue
+        data[name] = validate.validate_table(name, fp, kind, id_columns, contig_order, report)
+
+    # Check identifiers across gene data, panels, and panel outputs
+    validate.validate_gene_data(data['ensembl_gene_data'], data['refseq_gene_data'], report)
+    for name in ('somatic_panel', 'germline_panel'):
+        validate.validate_panel(name, data[name], data['ensembl_gene_data'], data['refseq_gene_data'], report)
+    validate.validate_somatic_outputs(
+        data['somatic_panel'],
+        data.get('gene_regions'),
+        data.get('cds_regions'),
+        report,
+    )
+    if 'transcript_regions' in data:
+        validate.validate_germline_outputs(data['germline_panel'], data['transcript_regions'], report)
+
+    # NOTE(SW): table paths are reported relative to the repository so that reports do not depend on
+    # the checkout location
+    for table in report.tables.values():
+        table['fp'] = get_report_path(table['fp'])
+
+    # Write summary to stderr and full report to file where given, otherwise to stdout. The report is
+    # written before exiting so that it is available for runs that fail validation
+    report_data = report.to_dict()
+    print_report(report_data)
+    if args.report_fp:
+        write_report(report_data, args.report_fp)
+    else:
+        json.dump(report_data, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if report_data['errors']:
+        sys.exit(1)
+
+
+def get_report_path(fp):
+    fp = pathlib.Path(fp).resolve()
+    return str(fp.relative_to(REPO_DIR)) if fp.is_relative_to(REPO_DIR) else str(fp)
+
+
+def write_report(report_data, fp):
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fp = fp.with_name(f'.{fp.name}.tmp')
+    with tmp_fp.open('w') as fh:
+        json.dump(report_data, fh, indent=2)
+        fh.write('\n')
+    tmp_fp.replace(fp)
+
+
+def print_report(report_data):
+    for name, table in report_data['tables'].items():
+        print(f'{name}\t{table["records"]} records\t{table["fp"]}', file=sys.stderr)
+    for failure in report_data['failures']:
+        level, name, check, count = (failure[k] for k in ('level', 'table', 'check', 'count'))
+        print(f'{level.upper()}: {name}: {check}: {count}', file=sys.stderr)
+        for example in failure['examples']:
+            print(f'    {example}', file=sys.stderr)
+    print(f'{report_data["errors"]} errors, {report_data["warnings"]} warnings', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()